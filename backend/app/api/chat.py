@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, Depends
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse, Response, FileResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import os
@@ -8,55 +8,74 @@ import asyncio
 
 # Dual-compatible imports for local and Render deployment
 try:
-    from backend.app.services.ai_service import simulate_debate_streaming
-    from backend.app.services.auth_service import get_current_user, supabase, supabase_admin
+    from backend.app.services.ai_service import simulate_debate_streaming, get_debaters
+    from backend.app.services.auth_service import get_current_user
+    from backend.app.services import admission, key_pool, report_service, embeddings, single_flight, batch_jobs, shared_state, profiling, decision_analytics, debate_search, personas, contradiction_filter, consensus, repository
 except ImportError:
-    from app.services.ai_service import simulate_debate_streaming
-    from app.services.auth_service import get_current_user, supabase, supabase_admin
+    from app.services.ai_service import simulate_debate_streaming, get_debaters
+    from app.services.auth_service import get_current_user
+    from app.services import admission, key_pool, report_service, embeddings, single_flight, batch_jobs, shared_state, profiling, decision_analytics, debate_search, personas, contradiction_filter, consensus, repository
 
 router = APIRouter()
 
+async def get_user_org_id(user_id):
+    """Returns the user's organization id, or None if the profile has no org yet."""
+    try:
+        return await repository.get_user_org_id(user_id)
+    except Exception as e:
+        print(f"Org Lookup Error: {e}")
+    return None
 
 
 class ChatRequest(BaseModel):
     message: str
     company_info: Dict[str, str]
-    history: Optional[List[Dict[str, str]]] = []
+    history: Optional[List[Dict[str, str]]] = []  # only used without conversation_id; the server keeps the context otherwise
     target_agent: Optional[str] = None 
     image: Optional[str] = None # Base64 encoded image
     conversation_id: Optional[str] = None
     language: Optional[str] = "tr" # Default to Turkish, can be "en" for English
     is_clarification_response: Optional[bool] = False  # Skip web search if true
+    profile: Optional[str] = "standard"  # execution profile: "fast", "standard" or "deep" (see debate_profiles.py)
+    debate_mode: Optional[str] = None  # "classic" (serial turns) or "parallel"; defaults to the profile's mode
+    client_pacing: Optional[bool] = None  # True: no server-side pauses, typing events carry pace_ms instead
+
+class BatchScenario(BaseModel):
+    name: Optional[str] = None
+    company_info: Optional[Dict[str, str]] = {}  # overrides on top of BatchRequest.company_info
+    message: Optional[str] = None  # defaults to BatchRequest.message
+
+class BatchRequest(BaseModel):
+    message: str
+    company_info: Dict[str, str]
+    scenarios: List[BatchScenario]
+    profile: Optional[str] = "standard"
+    language: Optional[str] = "tr"
+    include_report: Optional[bool] = False  # one extra (moderator) call per scenario
+
+class PersonaSpec(BaseModel):
+    name: str
+    provider: str
+    model_name: str
+    persona: str
+
+class BoardRequest(BaseModel):
+    members: List[str]  # in seat order; large boards are split into sub-committees in this order
+    custom: Optional[List[PersonaSpec]] = []
 
 @router.get("/history")
 async def get_chat_history(conversation_id: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Fetches chat history for the user's latest conversation"""
     try:
-        user_id = current_user.user.id
-        admin_client = supabase_admin if supabase_admin else supabase
-        
-        # If no conversation_id, get the most recent one
-        target_conv_id = conversation_id
+        # Profile -> organization -> (latest) conversation -> messages in one round-trip
+        history = await repository.load_history(current_user.user.id, conversation_id)
+        target_conv_id = history["conversation_id"]
         if not target_conv_id:
-            # 1. Get User's Organization
-            profile_resp = admin_client.table("profiles").select("organization_id").eq("id", user_id).single().execute()
-            if not profile_resp.data:
-                 return {"messages": []}
-            org_id = profile_resp.data["organization_id"]
-            
-            # 2. Get Latest Conversation
-            conv_resp = admin_client.table("conversations").select("id").eq("organization_id", org_id).order("created_at", desc=True).limit(1).execute()
-            if conv_resp.data:
-                target_conv_id = conv_resp.data[0]["id"]
-            else:
-                return {"messages": []}
-        
-        # 3. Fetch Messages
-        msg_resp = admin_client.table("messages").select("*").eq("conversation_id", target_conv_id).order("created_at", desc=False).execute()
+            return {"messages": []}
         
         # Transform for Frontend
         formatted_messages = []
-        for m in msg_resp.data:
+        for m in history["messages"]:
             role = m["role"]
             content = m["content"]
             metadata = m.get("metadata") or {}
@@ -88,82 +107,88 @@ async def get_chat_history(conversation_id: Optional[str] = None, current_user:
 async def get_conversations(current_user: dict = Depends(get_current_user)):
     """Fetches list of conversations for the sidebar"""
     try:
-        user_id = current_user.user.id
-        
-        # Get Org ID using Admin Client (Bypass RLS)
-        admin_client = supabase_admin if supabase_admin else supabase
-        profile_resp = admin_client.table("profiles").select("organization_id").eq("id", user_id).execute()
-        
-        if not profile_resp.data:
-             return []
-        org_id = profile_resp.data[0]["organization_id"]
-        
-        if not org_id:
-            return []
-        
-        # Fetch Conversations (Use Admin Client to ensure we can read them)
-        conv_resp = admin_client.table("conversations").select("*").eq("organization_id", org_id).order("created_at", desc=True).execute()
-        
-        return conv_resp.data if conv_resp.data else []
+        # The organization's conversations, newest first (one round-trip)
+        return await repository.list_conversations(current_user.user.id)
     except Exception as e:
         print(f"Conversations Fetch Error: {e}")
         return []
 
+@router.get("/board")
+async def get_board(current_user: dict = Depends(get_current_user)):
+    """The organization's board members and the personas that can be added"""
+    org_id = await get_user_org_id(current_user.user.id)
+    members = await personas.board_for_org(org_id)
+    return {
+        "members": [personas.describe(m) for m in members],
+        "committee_size": personas.COMMITTEE_SIZE,
+        "max_members": personas.MAX_BOARD_SIZE,
+        "catalog": [personas.describe(p) for p in personas.PERSONA_CATALOG.values()],
+    }
+
+
+@router.put("/board")
+async def update_board(request: BoardRequest, current_user: dict = Depends(get_current_user)):
+    """Sets the organization's board (organization admins only)"""
+    try:
+        profile = await repository.get_profile(current_user.user.id)
+    except Exception as e:
+        print(f"Board Profile Lookup Error: {e}")
+        raise HTTPException(status_code=500, detail="Profile lookup failed")
+    if not profile.get("organization_id") or profile.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Only organization admins can change the board")
+    try:
+        members = await personas.save_board(profile["organization_id"], request.model_dump())
+    except personas.BoardConfigError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"members": [personas.describe(m) for m in members]}
+
+
+@router.get("/search")
+async def search_debates(q: str, page: int = 1, page_size: int = 20, language: Optional[str] = "tr", current_user: dict = Depends(get_current_user)):
+    """Full-text search over the organization's conversation titles and messages (ranked, highlighted)"""
+    org_id = await get_user_org_id(current_user.user.id)
+    if not org_id:
+        raise HTTPException(status_code=403, detail="No organization")
+    try:
+        return await debate_search.search(org_id, q, page, page_size, language or "tr")
+    except Exception as e:
+        print(f"Search Error: {e}")
+        raise HTTPException(status_code=500, detail="Search failed")
+
 @router.post("/chat-stream")
-async def chat_stream(request: ChatRequest, current_user: dict = Depends(get_current_user)):
+async def chat_stream(request: ChatRequest, http_request: Request, debug_profile: Optional[str] = None, current_user: dict = Depends(get_current_user)):
     """Streaming endpoint - messages arrive one by one in real-time"""
+
+    # Opt-in profiling of this run (X-Debug-Profile header or ?debug_profile=, admins only)
+    profile_clock = profiling.requested_clock(http_request.headers.get("x-debug-profile"), debug_profile)
+    if profile_clock and not profiling.is_profiling_admin(current_user.user):
+        raise HTTPException(status_code=403, detail="Profiling is only available to admins")
     
     # 1. Ensure Conversation Exists
     conversation_id = request.conversation_id
-    if not conversation_id:
+    org_id = None
+    if conversation_id:
+        # The conversation's summary, turns and research go into the prompts: only its own organization may continue it
+        try:
+            org_id, conversation_org_id = await asyncio.gather(
+                repository.get_user_org_id(current_user.user.id),
+                repository.get_conversation_org_id(conversation_id),
+            )
+        except Exception as e:
+            print(f"Conversation Lookup Error: {e}")
+            raise HTTPException(status_code=500, detail="Conversation lookup failed")
+        if not org_id or conversation_org_id != org_id:
+            raise HTTPException(status_code=404, detail="Conversation not found")
+    else:
         try:
             user_id = current_user.user.id
-            
-            # Use Admin Client for EVERYTHING in this sensitive block to bypass RLS
-            admin_client = supabase_admin if supabase_admin else supabase
-            
-            # Get Org ID
-            profile_resp = admin_client.table("profiles").select("organization_id").eq("id", user_id).execute()
-            
-            org_id = None
-            profile_exists = len(profile_resp.data) > 0
-            existing_org_id = profile_resp.data[0].get("organization_id") if profile_exists else None
-            
-            if not profile_exists or not existing_org_id:
-                # JIT Provisioning: User has no profile OR no Organization
+            # Profile lookup, JIT provisioning (user without profile or organization)
+            # and the new conversation in one round-trip
+            started = await repository.start_conversation(user_id, request.message[:50] or "New Debate")
+            if started.get("provisioned"):
                 print(f"JIT Provisioning for User {user_id}")
-                
-                # 1. Create Organization (if needed)
-                org_data = {"name": "My Company", "industry": "General"}
-                
-                org_resp = admin_client.table("organizations").insert(org_data).execute()
-                if org_resp.data:
-                    org_id = org_resp.data[0]["id"]
-                    
-                    # 2. Link Profile
-                    prof_data = {
-                        "id": user_id,
-                        "organization_id": org_id,
-                        "role": "admin"
-                    }
-                    # Upsert ensures we update if profile existed (but was hidden/unlinked)
-                    admin_client.table("profiles").upsert(prof_data).execute()
-                else:
-                     raise Exception("Failed to create Organization during JIT provisioning")
-            else:
-                org_id = existing_org_id
-            
-            # Create New Conversation
-            conv_data = {
-                "organization_id": org_id,
-                "title": request.message[:50] or "New Debate",
-                "status": "active"
-            } 
-            
-            conv_resp = admin_client.table("conversations").insert(conv_data).execute()
-            
-            if conv_resp.data:
-                conversation_id = conv_resp.data[0]["id"]
+            org_id = started["organization_id"]
+            conversation_id = started["conversation_id"]
         except Exception as e:
             # Fallback (won't save history properly but wont crash stream)
             print(f"Conversation Creation Error: {e}")
@@ -180,9 +205,35 @@ async def chat_stream(request: ChatRequest, current_user: dict = Depends(get_cur
             # Send Conversation ID to frontend first
             yield f"data: {json.dumps({'type': 'meta', 'conversation_id': conversation_id}, ensure_ascii=False)}\n\n"
 
-            # Use async generator to stream messages
-            async for message in simulate_debate_streaming(request.message, request.history, c_info, image_base64=request.image, conversation_id=conversation_id, language=request.language or "tr", is_clarification_response=request.is_clarification_response or False):
-                yield f"data: {json.dumps(message, ensure_ascii=False)}\n\n"
+            # Wait for a debate slot (per-org + global limits, fair queue)
+            ticket = admission.admission_controller.enqueue(org_id or current_user.user.id)
+            try:
+                async for position in ticket.wait():
+                    yield f"data: {json.dumps({'type': 'queued', 'position': position})}\n\n"
+
+                session = None
+                if profile_clock:
+                    try:
+                        session = profiling.ProfileSession(profile_clock, {
+                            "user_id": current_user.user.id, "conversation_id": conversation_id,
+                            "profile": request.profile, "query": request.message[:200],
+                        })
+                    except profiling.ProfilingUnavailable as e:
+                        yield f"data: {json.dumps({'type': 'profile', 'error': str(e)})}\n\n"
+
+                try:
+                    # Use async generator to stream messages
+                    async for message in simulate_debate_streaming(request.message, request.history, c_info, image_base64=request.image, conversation_id=conversation_id, language=request.language or "tr", is_clarification_response=request.is_clarification_response or False, debate_mode=request.debate_mode, profile=request.profile, client_pacing=request.client_pacing, target_agent=request.target_agent, org_id=org_id):
+                        yield f"data: {json.dumps(message, ensure_ascii=False)}\n\n"
+                    if session:
+                        summary = session.finish()
+                        if summary:
+                            yield f"data: {json.dumps({'type': 'profile', 'profile_id': summary['id'], 'wall_seconds': summary['wall_seconds']})}\n\n"
+                finally:
+                    if session:
+                        session.finish()  # no-op after a normal end; saves the partial profile on disconnect
+            finally:
+                ticket.release()
                 
         except Exception as e:
             error_msg = {"error": str(e)}
@@ -190,3 +241,139 @@ async def chat_stream(request: ChatRequest, current_user: dict = Depends(get_cur
     
     return StreamingResponse(generate(), media_type="text/event-stream")
 
+
+@router.get("/report")
+async def get_report(conversation_id: str, language: Optional[str] = "tr", current_user: dict = Depends(get_current_user)):
+    """Final decision report of the conversation's latest debate (generated on first request, then cached)"""
+    try:
+        org_id, conversation_org_id = await asyncio.gather(
+            repository.get_user_org_id(current_user.user.id),
+            repository.get_conversation_org_id(conversation_id),
+        )
+    except Exception as e:
+        print(f"Report Conversation Lookup Error: {e}")
+        raise HTTPException(status_code=500, detail="Conversation lookup failed")
+    if not org_id or conversation_org_id != org_id:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+
+    try:
+        transcript = await report_service.load_debate_transcript(conversation_id)
+    except report_service.NoDebateError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    # The moderator writes the report, as it did at the end of the stream before
+    reporter = get_debaters({}, language or "tr")[1]
+    try:
+        report, transcript_hash, cached = await report_service.get_report(transcript, language or "tr", reporter, conversation_id)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Rapor oluşturulamadı: {e}")
+    return {"report": report, "transcript_hash": transcript_hash, "cached": cached}
+
+
+@router.get("/analytics")
+async def get_analytics(days: int = 90, bucket: str = "day", current_user: dict = Depends(get_current_user)):
+    """Decision analytics of the user's organization: votes per member, agreement matrix, decisions over time"""
+    org_id = await get_user_org_id(current_user.user.id)
+    if not org_id:
+        raise HTTPException(status_code=403, detail="No organization")
+    if bucket not in decision_analytics.BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of {', '.join(decision_analytics.BUCKETS)}")
+    try:
+        return await decision_analytics.get_analytics(org_id, days, bucket)
+    except Exception as e:
+        print(f"Analytics Error: {e}")
+        raise HTTPException(status_code=500, detail="Analytics lookup failed")
+
+
+@router.post("/batch")
+async def create_batch(request: BatchRequest, current_user: dict = Depends(get_current_user)):
+    """Starts a scenario sweep (one debate per scenario, in the background) and returns its job id"""
+    org_id = await get_user_org_id(current_user.user.id)
+    if not org_id:
+        raise HTTPException(status_code=403, detail="No organization")
+    try:
+        job = batch_jobs.create_job(
+            org_id, request.message, request.company_info,
+            [s.model_dump() for s in request.scenarios],
+            profile=request.profile, language=request.language or "tr", include_report=request.include_report or False,
+        )
+    except batch_jobs.BatchLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return job.summary()
+
+
+async def _get_batch_job(job_id, current_user):
+    job = batch_jobs.get_job(job_id, await get_user_org_id(current_user.user.id))
+    if not job:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
+
+
+@router.get("/batch/{job_id}")
+async def get_batch(job_id: str, since: int = 0, current_user: dict = Depends(get_current_user)):
+    """Job status plus the scenario results finished after the first `since` ones (poll with since=next)"""
+    return batch_jobs.results_page(await _get_batch_job(job_id, current_user), max(since, 0))
+
+
+@router.get("/batch/{job_id}/export")
+async def export_batch(job_id: str, format: str = "json", current_user: dict = Depends(get_current_user)):
+    """All results so far as a CSV or JSON download"""
+    job = await _get_batch_job(job_id, current_user)
+    if format == "csv":
+        content, media_type = batch_jobs.export_csv(job), "text/csv"
+    elif format == "json":
+        content, media_type = batch_jobs.export_json(job), "application/json"
+    else:
+        raise HTTPException(status_code=400, detail="format must be csv or json")
+    headers = {"Content-Disposition": f'attachment; filename="batch_{job_id}.{format}"'}
+    return Response(content, media_type=media_type, headers=headers)
+
+
+@router.delete("/batch/{job_id}")
+async def cancel_batch(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Stops a running job; finished results stay available"""
+    job = await _get_batch_job(job_id, current_user)
+    if job["finished_at"] is None:
+        batch_jobs.cancel_job(job_id)
+    return batch_jobs.job_summary(job)
+
+
+def _require_profiling_admin(current_user):
+    if not profiling.is_profiling_admin(current_user.user):
+        raise HTTPException(status_code=403, detail="Profiling is only available to admins")
+
+
+@router.get("/profiles")
+async def list_profiles(current_user: dict = Depends(get_current_user)):
+    """Stored debate profiles of this machine, newest first (admins only)"""
+    _require_profiling_admin(current_user)
+    return await asyncio.to_thread(profiling.list_profiles)
+
+
+@router.get("/profiles/{profile_id}")
+async def download_profile(profile_id: str, format: str = "json", current_user: dict = Depends(get_current_user)):
+    """One profile: json (summary + top functions) or pstat (snakeviz / pstats) (admins only)"""
+    _require_profiling_admin(current_user)
+    path = profiling.profile_path(profile_id, format)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    media_type = "application/json" if format == "json" else "application/octet-stream"
+    return FileResponse(path, media_type=media_type, filename=path.name)
+
+
+@router.get("/metrics")
+async def get_metrics(current_user: dict = Depends(get_current_user)):
+    """Runtime metrics of this worker: debate queue, provider budgets, key pools, caches, coalescing, batch jobs, contradiction pre-filter, early stops, database (admins only)"""
+    # Holds every tenant's organization ids and key fingerprints
+    _require_profiling_admin(current_user)
+    return {
+        "admission": admission.get_stats(),
+        "key_pools": key_pool.get_stats(),
+        "embeddings": embeddings.get_stats(),
+        "single_flight": single_flight.get_stats(),
+        "batch": batch_jobs.get_stats(),
+        "shared_state": shared_state.get_stats(),
+        "contradiction_prefilter": contradiction_filter.get_stats(),
+        "consensus": consensus.get_stats(),
+        "db": repository.get_stats(),
+    }
@@ -1,13 +1,34 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
 # Dual-compatible import for local and Render deployment
 try:
     from backend.app.api import chat  # Local development
+    from backend.app.services import lifecycle, repository
 except ImportError:
     from app.api import chat  # Render deployment
+    from app.services import lifecycle, repository
 
-app = FastAPI(title="KVP Konsey API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Provider / Supabase calls run via asyncio.to_thread and mostly wait on the network;
+    # the default pool (cpu count + 4 threads) would serialize the concurrent calls of
+    # large boards and parallel votes on small instances
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("IO_THREADS", "64")), thread_name_prefix="io")
+    )
+    # Returns immediately; heavy clients warm up on a background thread
+    lifecycle.startup()
+    yield
+    # Pending message writes, then the database connection pool
+    await repository.close()
+
+app = FastAPI(title="KVP Konsey API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -23,3 +44,9 @@ app.include_router(chat.router, prefix="/api")
 @app.get("/")
 async def root():
     return {"message": "KVP Konsey API is running 🚀"}
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once background warm-up has finished, 503 before."""
+    status = lifecycle.get_status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,328 @@
+"""
+Admission control for debates.
+
+One debate makes ~20-30 LLM calls, so the number of debates running at the same
+time is what really loads the providers. This module:
+
+- limits concurrent debates globally (ADMISSION_GLOBAL_LIMIT) and per organization
+  (ADMISSION_ORG_LIMIT),
+- queues everything else in a weighted fair queue, so one busy organization cannot
+  starve the others (ADMISSION_ORG_WEIGHTS="org_id:2,other_org:0.5"),
+- shares one request budget (token bucket) per provider across all debates
+  (PROVIDER_RPM_OPENAI, PROVIDER_RPM_GROQ, ... ; 0 = unlimited).
+
+The provider budgets and the global / per-org debate limits live in shared_state,
+so they hold for the whole deployment, not per uvicorn worker. A running debate
+holds a lease on a global slot and an org slot; its worker renews them every
+ADMISSION_LEASE_TTL / 3 seconds, so after a crash or restart mid-debate the slots
+free themselves within ADMISSION_LEASE_TTL. A worker that frees one announces it
+so the others re-check their queues. The weighted fair queue itself is per worker.
+"""
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from collections import defaultdict, deque
+
+try:
+    from backend.app.services.shared_state import get_state
+except ImportError:
+    from app.services.shared_state import get_state
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _parse_weights(raw):
+    weights = {}
+    for item in (raw or "").split(","):
+        if ":" in item:
+            org, weight = item.rsplit(":", 1)
+            try:
+                weights[org.strip()] = max(float(weight), 0.01)
+            except ValueError:
+                continue
+    return weights
+
+
+LEASE_TTL = max(_env_int("ADMISSION_LEASE_TTL", 60), 3)
+RELEASE_CHANNEL = "admission.released"
+
+
+class QueueFull(Exception):
+    """Raised when the waiting queue is already at ADMISSION_MAX_QUEUE."""
+
+
+class Ticket:
+    """One debate waiting for (or holding) a slot."""
+
+    def __init__(self, controller, org_id, start_tag, finish_tag, seq):
+        self.controller = controller
+        self.org_id = org_id
+        self.start_tag = start_tag
+        self.finish_tag = finish_tag
+        self.seq = seq
+        self.enqueued_at = time.monotonic()
+        self.admitted = asyncio.Event()
+        self.released = False
+        self.leases = []
+
+    def __lt__(self, other):
+        return (self.finish_tag, self.seq) < (other.finish_tag, other.seq)
+
+    async def wait(self, update_interval=2.0):
+        """
+        Async generator: yields the queue position (1-based) every time it changes
+        while waiting, and returns once the debate is admitted.
+        """
+        last_position = None
+        while not self.admitted.is_set():
+            position = self.controller.position(self)
+            if position and position != last_position:
+                last_position = position
+                yield position
+            try:
+                await asyncio.wait_for(self.admitted.wait(), timeout=update_interval)
+            except asyncio.TimeoutError:
+                # Picks up slots freed by expired leases or missed release messages
+                self.controller._dispatch()
+
+    def release(self):
+        """Frees the slot (or leaves the queue). Safe to call more than once."""
+        if not self.released:
+            self.released = True
+            self.controller._release(self)
+
+
+class AdmissionController:
+    def __init__(self, global_limit, org_limit, org_weights=None, max_queue=0, shared=True):
+        self.global_limit = global_limit
+        self.org_limit = org_limit
+        self.org_weights = org_weights or {}
+        self.max_queue = max_queue
+        self.shared = shared  # enforce the limits across workers (shared_state leases)
+        self._loop = None
+        self._heartbeat = None
+        self._held = set()  # admitted tickets holding shared leases
+
+        self._queue = []  # heap of Tickets ordered by virtual finish tag
+        self._active = 0
+        self._active_by_org = defaultdict(int)
+        self._virtual_time = 0.0
+        self._last_finish = {}
+        self._seq = itertools.count()
+
+        self._waits = deque(maxlen=500)  # recent queue wait times (seconds)
+        self._admitted_total = 0
+        self._rejected_total = 0
+
+    def weight(self, org_id):
+        return self.org_weights.get(str(org_id), 1.0)
+
+    def enqueue(self, org_id, weight=None):
+        """Registers a debate. The returned ticket is admitted immediately if there is room."""
+        if self.max_queue and len(self._queue) >= self.max_queue:
+            self._rejected_total += 1
+            raise QueueFull("Too many debates are waiting. Please try again shortly.")
+
+        # Weighted fair queueing: each org advances its own virtual clock by 1/weight
+        # per debate, the queue is served in order of these finish tags.
+        weight = weight or self.weight(org_id)
+        start = max(self._virtual_time, self._last_finish.get(org_id, 0.0))
+        finish_tag = start + 1.0 / weight
+        self._last_finish[org_id] = finish_tag
+
+        ticket = Ticket(self, org_id, start, finish_tag, next(self._seq))
+        self._listen()
+        heapq.heappush(self._queue, ticket)
+        self._dispatch()
+        return ticket
+
+    def position(self, ticket):
+        if ticket.admitted.is_set() or ticket.released:
+            return 0
+        return sum(1 for t in self._queue if t < ticket) + 1
+
+    def _can_run(self, org_id):
+        return self._active < self.global_limit and self._active_by_org[org_id] < self.org_limit
+
+    def _listen(self):
+        """Re-dispatches when another worker frees a slot (subscribed once, on the server's loop)."""
+        if not self.shared or self._loop is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        try:
+            get_state().subscribe(RELEASE_CHANNEL, lambda _: self._loop.call_soon_threadsafe(self._dispatch))
+        except Exception as e:
+            print(f"Shared admission unavailable, limits are per worker: {e}")
+
+    def _take_shared_slots(self, ticket):
+        """Takes a deployment-wide global slot and org slot. Returns "ok", "global_full" or "org_full"."""
+        if not self.shared:
+            return "ok"
+        try:
+            state = get_state()
+            global_lease = state.acquire_lease("debates", self.global_limit, LEASE_TTL)
+            if global_lease is None:
+                return "global_full"
+            org_lease = state.acquire_lease(f"debates:{ticket.org_id}", self.org_limit, LEASE_TTL)
+            if org_lease is None:
+                state.release_lease(global_lease)
+                return "org_full"
+            ticket.leases = [global_lease, org_lease]
+            self._held.add(ticket)
+            self._start_heartbeat()
+        except Exception as e:
+            # Fail open: a broken state backend must not stop every debate
+            print(f"Shared admission unavailable, using per-worker limits: {e}")
+        return "ok"
+
+    def _start_heartbeat(self):
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = asyncio.get_running_loop().create_task(self._renew_leases())
+
+    async def _renew_leases(self):
+        """Keeps the leases of running debates alive; stops when none are held."""
+        while self._held:
+            await asyncio.sleep(LEASE_TTL / 3)
+            leases = [lease for ticket in list(self._held) for lease in ticket.leases]
+            try:
+                state = get_state()
+                lost = await asyncio.to_thread(lambda: sum(not state.renew_lease(l, LEASE_TTL) for l in leases))
+            except Exception as e:
+                print(f"Shared admission lease renewal failed: {e}")
+                continue
+            if lost:
+                # Expired before renewal (e.g. a long stall): the debate keeps running, the slot may be over-used once
+                print(f"Shared admission: {lost} debate lease(s) expired before renewal")
+
+    def _free_shared_slots(self, ticket):
+        self._held.discard(ticket)
+        if not ticket.leases:
+            return
+        try:
+            state = get_state()
+            for lease in ticket.leases:
+                state.release_lease(lease)
+            state.publish(RELEASE_CHANNEL, {"org_id": str(ticket.org_id)})
+        except Exception as e:
+            print(f"Shared admission release failed (slots expire after {LEASE_TTL}s): {e}")
+        ticket.leases = []
+
+    def _dispatch(self):
+        if self._active >= self.global_limit:
+            return
+        # Serve the smallest finish tag whose org still has room; orgs at their own
+        # limit are skipped without losing their place in the queue.
+        skipped = []
+        while self._queue and self._active < self.global_limit:
+            ticket = heapq.heappop(self._queue)
+            if not self._can_run(ticket.org_id):
+                skipped.append(ticket)
+                continue
+            slots = self._take_shared_slots(ticket)
+            if slots != "ok":
+                skipped.append(ticket)
+                if slots == "global_full":
+                    break  # other workers hold every slot; nobody else can start either
+                continue
+            self._active += 1
+            self._active_by_org[ticket.org_id] += 1
+            self._virtual_time = max(self._virtual_time, ticket.start_tag)
+            self._waits.append(time.monotonic() - ticket.enqueued_at)
+            self._admitted_total += 1
+            ticket.admitted.set()
+        for ticket in skipped:
+            heapq.heappush(self._queue, ticket)
+
+    def _release(self, ticket):
+        if ticket.admitted.is_set():
+            self._free_shared_slots(ticket)
+            self._active -= 1
+            self._active_by_org[ticket.org_id] -= 1
+            if self._active_by_org[ticket.org_id] <= 0:
+                del self._active_by_org[ticket.org_id]
+        else:
+            # Client went away while still queued
+            self._queue.remove(ticket)
+            heapq.heapify(self._queue)
+        self._dispatch()
+
+    def get_stats(self):
+        waits = sorted(self._waits)
+        return {
+            "active": self._active,
+            "queue_depth": len(self._queue),
+            "active_by_org": dict(self._active_by_org),
+            "global_limit": self.global_limit,
+            "org_limit": self.org_limit,
+            "shared": self.shared,
+            "admitted_total": self._admitted_total,
+            "rejected_total": self._rejected_total,
+            "wait_seconds_avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+            "wait_seconds_p95": round(waits[int(len(waits) * 0.95) - 1], 3) if waits else 0.0,
+            "wait_seconds_max": round(waits[-1], 3) if waits else 0.0,
+        }
+
+
+# --- PROVIDER RATE BUDGET ---
+
+# Requests per minute per provider, shared by every debate of every worker
+DEFAULT_PROVIDER_RPM = {"openai": 500, "anthropic": 50, "groq": 30, "gemini": 15}
+
+_provider_rpm = {}
+_provider_waited = defaultdict(float)
+
+
+def provider_rpm(provider):
+    if provider not in _provider_rpm:
+        _provider_rpm[provider] = _env_int(f"PROVIDER_RPM_{provider.upper()}", DEFAULT_PROVIDER_RPM.get(provider, 0))
+    return _provider_rpm[provider]
+
+
+def acquire_provider_budget(provider):
+    """
+    Blocks until the provider's budget allows one more request. Provider calls
+    are synchronous and must run off the event loop (asyncio.to_thread): the
+    wait sleeps the calling thread.
+    """
+    rpm = provider_rpm(provider)
+    if rpm <= 0:
+        return
+    while True:
+        try:
+            wait = get_state().take_token(f"rpm:{provider}", rpm / 60.0, max(1, rpm // 6))
+        except Exception as e:
+            print(f"Provider budget unavailable, not pacing {provider}: {e}")
+            return
+        if not wait:
+            return
+        _provider_waited[provider] += wait
+        time.sleep(wait)
+
+
+def get_provider_budget_stats():
+    return {
+        provider: {"rpm": rpm, "capacity": max(1, rpm // 6), "waited_seconds": round(_provider_waited[provider], 2)}
+        for provider, rpm in _provider_rpm.items() if rpm > 0
+    }
+
+
+admission_controller = AdmissionController(
+    global_limit=_env_int("ADMISSION_GLOBAL_LIMIT", 8),
+    org_limit=_env_int("ADMISSION_ORG_LIMIT", 2),
+    org_weights=_parse_weights(os.getenv("ADMISSION_ORG_WEIGHTS")),
+    max_queue=_env_int("ADMISSION_MAX_QUEUE", 50),
+    shared=os.getenv("ADMISSION_SHARED", "1") != "0",
+)
+
+
+def get_stats():
+    stats = admission_controller.get_stats()
+    stats["provider_budgets"] = get_provider_budget_stats()
+    return stats
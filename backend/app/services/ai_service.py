@@ -4,18 +4,15 @@ import os
 import re
 import json
 import base64
-import chromadb
+import hashlib
+import time
 from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-import google.generativeai as genai
-from groq import Groq
-from duckduckgo_search import DDGS
-import requests
-import requests
-from bs4 import BeautifulSoup
 from datetime import datetime
 
+# NOTE: Provider SDKs, chromadb and duckduckgo_search are imported inside the
+# functions that use them. Importing them here added seconds to every cold start.
+
 # Explicitly load .env from the project root (choice_foods_council/.env)
 # Current file is in backend/app/services/ai_service.py
 # We need to go up 3 levels: services -> app -> backend -> choice_foods_council
@@ -25,22 +22,53 @@ load_dotenv(dotenv_path=env_path)
 # Import Supabase Client from auth_service
 # Dual-compatible imports for local and Render deployment
 try:
-    from backend.app.services.auth_service import supabase, supabase_admin
+    from backend.app.services.auth_service import get_db_client
 except ImportError:
     try:
-        from app.services.auth_service import supabase, supabase_admin
+        from app.services.auth_service import get_db_client
     except ImportError:
-        supabase = None
-        supabase_admin = None
+        get_db_client = None
         print("WARNING: auth_service could not be imported")
 
+try:
+    from backend.app.services import lifecycle
+    from backend.app.services.cassette import get_cassette
+    from backend.app.services.crawler import crawl_company_site, build_site_digest
+    from backend.app.services.admission import acquire_provider_budget
+    from backend.app.services.key_pool import get_key_pool, mask_key, is_rate_limit_error, error_headers
+    from backend.app.services.debate_profiles import get_profile, MODEL_TIERS
+    from backend.app.services.personas import split_committees
+    from backend.app.services import research_cache, conversation_memory, single_flight, decision_analytics, personas, contradiction_filter, consensus, repository
+    from backend.app.services.embeddings import get_engine as get_embedding_engine
+    from backend.app.services.vector_memory import (
+        get_memory_collection, save_memory_vector, search_memory_vector, tally_votes, vote_reason,
+    )
+except ImportError:
+    from app.services import lifecycle
+    from app.services.cassette import get_cassette
+    from app.services.crawler import crawl_company_site, build_site_digest
+    from app.services.admission import acquire_provider_budget
+    from app.services.key_pool import get_key_pool, mask_key, is_rate_limit_error, error_headers
+    from app.services.debate_profiles import get_profile, MODEL_TIERS
+    from app.services.personas import split_committees
+    from app.services import research_cache, conversation_memory, single_flight, decision_analytics, personas, contradiction_filter, consensus, repository
+    from app.services.embeddings import get_engine as get_embedding_engine
+    from app.services.vector_memory import (
+        get_memory_collection, save_memory_vector, search_memory_vector, tally_votes, vote_reason,
+    )
+
 # --- HELPER FUNCTIONS ---
 
-def perform_web_search(query):
-    """Performs a web search using DuckDuckGo and returns a summary."""
+def perform_web_search(query, max_results=3):
+    """Performs a web search using DuckDuckGo and returns a summary (concurrent identical searches share one request)."""
+    key = single_flight.flight_key("search", " ".join(query.split()).lower(), max_results)
+    return single_flight.do("search", key, lambda: _web_search(query, max_results))
+
+def _web_search(query, max_results):
     try:
+        from duckduckgo_search import DDGS
         with DDGS() as ddgs:
-            results = list(ddgs.text(query, max_results=3))
+            results = list(ddgs.text(query, max_results=max_results))
             if not results:
                 return "İnternette güncel bir bilgi bulunamadı."
             
@@ -51,72 +79,32 @@ def perform_web_search(query):
     except Exception as e:
         return f"İnternet araması yapılamadı: {str(e)}"
 
-def scrape_website(url):
-    """Scrapes the given URL for text content."""
+async def scrape_website(url):
+    """Reads the company website: landing page plus a few about/products/pricing pages (see crawler.py)."""
+    # Debates starting at the same time for the same company share one crawl
+    return await single_flight.ado("scrape", single_flight.flight_key("scrape", url.strip()), lambda: _scrape_website(url))
+
+async def _scrape_website(url):
     try:
-        if not url.startswith('http'):
-            url = 'https://' + url
-            
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(url, headers=headers, timeout=10)
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        
-        # Remove script, style, nav, footer, header elements
-        for element in soup(["script", "style", "nav", "footer", "header", "noscript"]):
-            element.decompose()
-            
-        text = soup.get_text()
-        
-        # Break into lines and remove leading/trailing space on each
-        lines = (line.strip() for line in text.splitlines())
-        # Break multi-headlines into a line each
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        # Drop blank lines
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        return text[:4000] # Increase limit for better context
+        pages = await crawl_company_site(url)
+        return build_site_digest(pages, max_chars=4000)
     except Exception as e:
         return f"Web sitesi okunamadı: {str(e)}"
 
-# --- VECTOR MEMORY (ChromaDB) ---
-chroma_client = chromadb.Client()
-collection = chroma_client.get_or_create_collection(name="debate_memory")
+# --- WARM-UP (runs in the background after startup, see lifecycle.py) ---
+def _warm_provider_sdks():
+    import openai, groq, anthropic  # noqa: F401
+    import google.generativeai  # noqa: F401
 
-def save_memory_vector(topic, decision, reason):
-    """Saves the final decision to Vector DB."""
-    try:
-        collection.add(
-            documents=[f"Konu: {topic}. Karar: {decision}. Gerekçe: {reason}"],
-            metadatas=[{"topic": topic, "decision": decision, "reason": reason, "date": "2025-12-05"}],
-            ids=[f"{topic}_{random.randint(1000,9999)}"]
-        )
-    except Exception as e:
-        print(f"Vector memory save error: {e}")
+def _warm_vector_memory():
+    # Loads the embedding model (downloads it only if the build step didn't provision it)
+    get_embedding_engine().warm()
+    get_memory_collection()
 
-def search_memory_vector(query):
-    """Searches past debates semantically."""
-    try:
-        results = collection.query(
-            query_texts=[query],
-            n_results=3
-        )
-        
-        if not results['documents'][0]:
-            return []
-            
-        memory_list = []
-        for i, doc in enumerate(results['documents'][0]):
-            meta = results['metadatas'][0][i]
-            memory_list.append({
-                "topic": meta['topic'],
-                "decision": meta['decision'],
-                "reason": meta['reason']
-            })
-        return memory_list
-    except Exception:
-        return []
+if get_db_client:
+    lifecycle.register_warmup("supabase", get_db_client)
+lifecycle.register_warmup("provider_sdks", _warm_provider_sdks)
+lifecycle.register_warmup("vector_memory", _warm_vector_memory)
 
 # --- CLARIFICATION REQUEST PARSER ---
 def parse_clarification(response):
@@ -137,29 +125,44 @@ def parse_clarification(response):
 def analyze_image(image_base64, api_key=None):
     """Analyzes an image using GPT-4o-mini."""
     try:
-        client = OpenAI(api_key=api_key or os.getenv("OPENAI_API_KEY"))
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {"type": "text", "text": "Bu görseli bir iş toplantısı bağlamında detaylıca analiz et. Ne görüyorsun? (Ofis planı, ürün, grafik vb.)"},
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{image_base64}"
-                            },
-                        },
-                    ],
-                }
-            ],
-            max_tokens=300,
-        )
-        return response.choices[0].message.content
+        pool = None if api_key else get_key_pool("openai")
+        if pool:
+            with pool.lease() as key:
+                return _describe_image(image_base64, key.value)
+        return _describe_image(image_base64, api_key or os.getenv("OPENAI_API_KEY"))
     except Exception as e:
         return f"Görsel analiz edilemedi: {str(e)}"
 
+def _describe_image(image_base64, api_key):
+    from openai import OpenAI
+    client = OpenAI(api_key=api_key)
+    response = client.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": "Bu görseli bir iş toplantısı bağlamında detaylıca analiz et. Ne görüyorsun? (Ofis planı, ürün, grafik vb.)"},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{image_base64}"
+                        },
+                    },
+                ],
+            }
+        ],
+        max_tokens=300,
+    )
+    return response.choices[0].message.content
+
+def _openai_usage(response):
+    """Extracts token usage from an OpenAI-compatible (OpenAI/Groq) response."""
+    usage = getattr(response, "usage", None)
+    if not usage:
+        return {}
+    return {"prompt_tokens": usage.prompt_tokens, "completion_tokens": usage.completion_tokens}
+
 class AIModel:
     def __init__(self, name, provider, model_name, persona, api_key=None):
         self.name = name
@@ -167,108 +170,179 @@ class AIModel:
         self.model_name = model_name
         self.persona = persona
         
-        if provider == "openai":
-            self.api_key = api_key or os.getenv("OPENAI_API_KEY", "").strip()
-            self.base_url = None
-        elif provider == "groq":
-            self.api_key = api_key or os.getenv("GROQ_API_KEY", "").strip()
-        elif provider == "gemini":
-            self.api_key = api_key or os.getenv("GEMINI_API_KEY", "").strip()
-            if self.api_key:
-                genai.configure(api_key=self.api_key)
-        elif provider == "anthropic":
-            self.api_key = api_key or os.getenv("ANTHROPIC_API_KEY", "").strip()
-
-    def generate_response(self, messages):
+        # Explicit api_key -> that key only. Otherwise every call leases a key from
+        # the provider's pool (OPENAI_API_KEY + OPENAI_API_KEYS, ...)
+        self.key_pool = None if api_key else get_key_pool(provider)
+        if api_key:
+            self.api_key = api_key.strip()
+        elif self.key_pool:
+            self.api_key = self.key_pool.keys[0].value
+        else:
+            self.api_key = ""
+
+        # Token usage of the last call (prompt_tokens / completion_tokens)
+        self.last_usage = {}
+
+    def generate_response(self, messages, coalesce=False):
+        """
+        coalesce=True is for deterministic utility calls (search query, research
+        and website summaries): concurrent calls with the same provider, model and
+        prompt share one request (see single_flight.py). Debater turns never do.
+        """
+        if coalesce:
+            key = single_flight.llm_key(self.provider, self.model_name, messages)
+            return single_flight.do(f"llm:{self.provider}", key, lambda: self.generate_response(messages))
+
+        # Single choke point for every provider call -> record/replay hooks in here
+        cassette = get_cassette()
+        if cassette is None:
+            return self._call_provider(messages)
+
+        if cassette.mode == "replay":
+            return cassette.replay(self.provider, self.model_name, messages)
+
+        started = time.perf_counter()
+        content = self._call_provider(messages)
+        cassette.record(
+            self.provider, self.model_name, messages,
+            chunks=[(time.perf_counter() - started, content)],
+            usage=self.last_usage
+        )
+        return content
+
+    def _call_provider(self, messages):
+        self.last_usage = {}
+        # Shared per-provider request budget (all debates in this process)
+        acquire_provider_budget(self.provider)
+
+        if self.key_pool is None:
+            return self._call_with_key(messages, self.api_key)[0]
+
+        # On a 429 the key is parked and the call is retried once per other key
+        for _ in range(len(self.key_pool)):
+            with self.key_pool.lease() as key:
+                content, rate_limited = self._call_with_key(messages, key.value, pooled_key=key)
+            if not rate_limited:
+                break
+        return content
+
+    def _call_with_key(self, messages, api_key, pooled_key=None):
+        """Returns (content, rate_limited). Errors are returned as 'Error (...)' strings."""
         try:
-            content = ""
-            if self.provider == "openai":
-                client = OpenAI(api_key=self.api_key)
-                # GPT-5 models only support temperature=1
-                temp = 1.0 if "gpt-5" in self.model_name else 0.8
-                response = client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    temperature=temp
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "groq":
-                client = Groq(api_key=self.api_key)
-                response = client.chat.completions.create(
-                    model=self.model_name,
-                    messages=messages,
-                    temperature=0.8
-                )
-                content = response.choices[0].message.content
-            
-            elif self.provider == "gemini":
-                model = genai.GenerativeModel(self.model_name)
-                # Convert OpenAI format to Gemini format (simplified)
-                prompt = ""
-                for msg in messages:
-                    role = "User" if msg["role"] == "user" else "Model"
-                    if msg["role"] == "system":
-                        prompt += f"System Instruction: {msg['content']}\n\n"
-                    else:
-                        prompt += f"{role}: {msg['content']}\n"
-                
-                response = model.generate_content(prompt)
-                
-                # Check for valid parts (Gemini safety filter blocks content sometimes)
-                if not response.parts:
-                     return "Error: İçerik güvenlik filtresine takıldı veya boş döndü. (Safety Block)"
-                     
-                content = response.text
-            
-            elif self.provider == "anthropic":
-                import anthropic
-                client = anthropic.Anthropic(api_key=self.api_key)
-                
-                # Extract system message and convert to Claude format
-                system_msg = ""
-                user_messages = []
-                for msg in messages:
-                    if msg["role"] == "system":
-                        system_msg = msg["content"]
-                    else:
-                        user_messages.append({"role": msg["role"], "content": msg["content"]})
-                
-                response = client.messages.create(
-                    model=self.model_name,
-                    max_tokens=1024,
-                    system=system_msg,
-                    messages=user_messages
-                )
-                content = response.content[0].text
+            content, headers = self._request(messages, api_key)
+            if pooled_key:
+                self.key_pool.report_headers(pooled_key, headers)
 
             # Clean <think> blocks (common in some models like DeepSeek/Qwen)
             content = re.sub(r'<think>.*?</think>', '', content, flags=re.DOTALL).strip()
-            return content
+            return content, False
                 
         except Exception as e:
-            masked_key = f"{self.api_key[:15]}..." if self.api_key else "None"
-            return f"Error ({self.name}): [Key: {masked_key}] {str(e)}"
-
-def get_debaters(company_info, language="tr"):
-    c_name = company_info.get("name", "Şirket")
-    c_industry = company_info.get("industry", "Genel")
-    c_employees = company_info.get("employee_count", "Bilinmiyor")
-    c_revenue = company_info.get("annual_revenue", "Bilinmiyor")
-    c_budget = company_info.get("monthly_budget", "Bilinmiyor")
-    c_target = company_info.get("target_market", "Belirtilmemiş")
-    c_challenges = company_info.get("challenges", "Belirtilmemiş")
-    c_description = company_info.get("description", "")
-    
-    # Shared context about the company
-    CONTEXT = f"""
+            rate_limited = is_rate_limit_error(e)
+            if pooled_key and rate_limited:
+                self.key_pool.report_rate_limited(pooled_key, error_headers(e))
+            masked_key = mask_key(api_key)
+            return f"Error ({self.name}): [Key: {masked_key}] {str(e)}", rate_limited
+
+    def _request(self, messages, api_key):
+        """Calls the provider with the given key. Returns (content, rate-limit headers)."""
+        content = ""
+        headers = None
+        if self.provider == "openai":
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key)
+            # GPT-5 models only support temperature=1
+            temp = 1.0 if "gpt-5" in self.model_name else 0.8
+            raw = client.chat.completions.with_raw_response.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=temp
+            )
+            headers = raw.headers
+            response = raw.parse()
+            content = response.choices[0].message.content
+            self.last_usage = _openai_usage(response)
+        
+        elif self.provider == "groq":
+            from groq import Groq
+            client = Groq(api_key=api_key)
+            raw = client.chat.completions.with_raw_response.create(
+                model=self.model_name,
+                messages=messages,
+                temperature=0.8
+            )
+            headers = raw.headers
+            response = raw.parse()
+            content = response.choices[0].message.content
+            self.last_usage = _openai_usage(response)
+        
+        elif self.provider == "gemini":
+            import google.generativeai as genai
+            # genai keeps one global key; switch to the leased one
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel(self.model_name)
+            # Convert OpenAI format to Gemini format (simplified)
+            prompt = ""
+            for msg in messages:
+                role = "User" if msg["role"] == "user" else "Model"
+                if msg["role"] == "system":
+                    prompt += f"System Instruction: {msg['content']}\n\n"
+                else:
+                    prompt += f"{role}: {msg['content']}\n"
+            
+            response = model.generate_content(prompt)
+            
+            # Check for valid parts (Gemini safety filter blocks content sometimes)
+            if not response.parts:
+                 return "Error: İçerik güvenlik filtresine takıldı veya boş döndü. (Safety Block)", None
+                 
+            content = response.text
+            usage = getattr(response, "usage_metadata", None)
+            if usage:
+                self.last_usage = {
+                    "prompt_tokens": getattr(usage, "prompt_token_count", 0),
+                    "completion_tokens": getattr(usage, "candidates_token_count", 0)
+                }
+        
+        elif self.provider == "anthropic":
+            import anthropic
+            client = anthropic.Anthropic(api_key=api_key)
+            
+            # Extract system message and convert to Claude format
+            system_msg = ""
+            user_messages = []
+            for msg in messages:
+                if msg["role"] == "system":
+                    system_msg = msg["content"]
+                else:
+                    user_messages.append({"role": msg["role"], "content": msg["content"]})
+            
+            raw = client.messages.with_raw_response.create(
+                model=self.model_name,
+                max_tokens=1024,
+                system=system_msg,
+                messages=user_messages
+            )
+            headers = raw.headers
+            response = raw.parse()
+            content = response.content[0].text
+            if getattr(response, "usage", None):
+                self.last_usage = {
+                    "prompt_tokens": response.usage.input_tokens,
+                    "completion_tokens": response.usage.output_tokens
+                }
+
+        return content, headers
+
+# Shared context about the company (same for every member; formatted per request)
+BOARD_CONTEXT = """
     BAĞLAM - ŞİRKET PROFİLİ:
-    Şirket Adı: {c_name}
-    Sektör: {c_industry}
-    Çalışan Sayısı: {c_employees}
-    Hedef Kitle: {c_target}
-    Mevcut Zorluklar: {c_challenges}
-    Açıklama: {c_description}
+    Şirket Adı: {name}
+    Sektör: {industry}
+    Çalışan Sayısı: {employees}
+    Hedef Kitle: {target}
+    Mevcut Zorluklar: {challenges}
+    Açıklama: {description}
     
     Sen Pocket Board'un (Cebindeki Yönetim Kurulu) bir üyesisin. Rakiplerinle bu konuyu tartışacaksın.
     
@@ -289,96 +363,484 @@ def get_debaters(company_info, language="tr"):
     🌐 DİL KURALI: Kullanıcının sorusu hangi dildeyse, MUTLAKA O DİLDE cevap ver.
     """
 
-    debaters = [
-        AIModel(
-            name="Atlas",
-            provider="openai",
-            model_name="gpt-4o-mini",
-            persona="""Stratejist (The Strategist): Büyük resmi gör. Rakipler ne yapıyor? Pazar nereye gidiyor? 
-            ÖNCELİKLİ KONULAR: Rekabet avantajı, pazar payı, uzun vadeli strateji.
-            DÜŞÜK ÖNCELİK: Kısa vadeli maliyet detayları - stratejik bağlamda değinebilirsin.
-            KONUŞMA TARZI: Soğukkanlı, analitik, 'Rakipler bize karşı ne yapar?' perspektifinden bak."""
-        ),
-        AIModel(
-            name="Nova",
-            provider="anthropic",
-            model_name="claude-3-5-haiku-20241022",
-            persona="""Vizyoner (The Visionary): Büyük düşün! İnovasyon, disruption ve 'Wow' faktörü senin alanın.
-            ÖNCELİKLİ KONULAR: Gelecek trendler, inovasyon, marka prestiji, 'Ya büyük düşünseydik?'
-            DÜŞÜK ÖNCELİK: Bütçe ve maliyet senin önceliğin değil, ama farkındaysan kısaca not edebilirsin.
-            KONUŞMA TARZI: Heyecanlı, iddialı, ilham verici. 'Neden olmasın?' diye meydan oku."""
-        ),
-        AIModel(
-            name="Marcus",
-            provider="groq",
-            model_name="llama-3.3-70b-versatile",
-            persona="""Şüpheci (The Skeptic): Eleştirel düşün. Her iddianın kanıtını iste. Murphy Kanunları senin rehberin.
-            ÖNCELİKLİ KONULAR: Riskler, belirsizlikler, 'Nereden biliyorsunuz?', 'Ya işe yaramazsa?'
-            DÜŞÜK ÖNCELİK: Aşırı iyimser tahminlere karşı ol, ama yapıcı eleştiri sun.
-            KONUŞMA TARZI: Sorgulayıcı ama yapıcı, 'Bu veriyi nereden çıkardın?' diye sor."""
-        ),
-        AIModel(
-            name="Sterling",
-            provider="openai",
-            model_name="gpt-5-nano",
-            persona="""CFO (The Finance Guy): Rakamlar ve finansal metrikler senin uzmanlık alanın.
-            ÖNCELİKLİ KONULAR: ROI, nakit akışı, maliyet, geri ödeme süresi, bilanço etkisi.
-            DÜŞÜK ÖNCELİK: Vizyon ve marka değeri - finansal etkisini analiz edebilirsin.
-            KONUŞMA TARZI: Analitik, rakam odaklı, 'Yatırımın geri dönüşü ne olacak?' diye sor."""
-        ),
-        AIModel(
-            name="Maya",
-            provider="anthropic",
-            model_name="claude-3-haiku-20240307",
-            persona="""Kullanıcı Savunucusu (The User Advocate): Müşteri deneyimi senin önceliğin.
-            ÖNCELİKLİ KONULAR: Müşteri deneyimi (UX), kullanıcı memnuniyeti, 'Müşteri ne hisseder?'
-            DÜŞÜK ÖNCELİK: Teknik ve finansal detaylar - müşteri etkisi bağlamında değinebilirsin.
-            KONUŞMA TARZI: Empatik, kullanıcı odaklı, 'Müşterinin gözünden bak' perspektifini sun."""
-        )
+
+def get_debaters(company_info, language="tr", model_tier="standard", members=None):
+    """
+    Builds the board for one debate: members are persona specs from the registry
+    (personas.board_for_org; the default five when None) plus the moderator.
+    """
+    context = BOARD_CONTEXT.format(
+        name=company_info.get("name", "Şirket"),
+        industry=company_info.get("industry", "Genel"),
+        employees=company_info.get("employee_count", "Bilinmiyor"),
+        target=company_info.get("target_market", "Belirtilmemiş"),
+        challenges=company_info.get("challenges", "Belirtilmemiş"),
+        description=company_info.get("description", ""),
+    )
+
+    debaters = [AIModel(**spec) for spec in (members or personas.default_board())]
+    # Moderator Agent (The Chairman) - Uses the BEST model for critical oversight
+    moderator = AIModel(**personas.MODERATOR)
+
+    # Execution profile model tier (see debate_profiles.MODEL_TIERS)
+    for agent in debaters + [moderator]:
+        override = MODEL_TIERS.get(model_tier, {}).get(agent.name)
+        if override and override[0] == agent.provider:
+            agent.model_name = override[1]
+    
+    return debaters, moderator, context
+
+def build_turn_messages(debater, context, query, last_speaker_name, last_message, research_block, prev_args_text, language="tr"):
+    """Builds the system + user messages for one debater turn."""
+    current_date_str = datetime.now().strftime("%Y-%m-%d")
+
+    # Language instruction - MUST be at TOP of prompt for maximum effect
+    lang_instruction = ""
+    if language == "en":
+        lang_instruction = """
+    🚨 CRITICAL LANGUAGE RULE: YOU MUST RESPOND IN ENGLISH ONLY! 
+    The user asked their question in English. Your entire response MUST be in English.
+    Do NOT use Turkish. Do NOT mix languages. ENGLISH ONLY!
+    """
+    else:
+        lang_instruction = """
+    🚨 KRİTİK DİL KURALI: TÜRKÇE CEVAP VER!
+    Kullanıcı sorusunu Türkçe sordu. Tüm cevabın Türkçe olmalı.
+    """
+
+    # System Prompt Construction
+    system_prompt = f"""
+    {lang_instruction}
+    
+    {context}
+    
+    TODAY'S DATE: {current_date_str}
+    
+    {research_block}
+    
+    PREVIOUS ARGUMENTS (DO NOT REPEAT!):
+    {prev_args_text}
+    
+    YOU ARE: {debater.name}
+    YOUR ROLE: {debater.persona}
+    TOPIC: {query}
+    
+    RULES:
+    1. Respond to the last speaker ({last_speaker_name}): {last_message}
+    2. Prefer concrete data with sources [Source: X] when available.
+    3. If no source, say "Based on my analysis..." or "Industry trends suggest..."
+    4. Avoid making up specific numbers, but you can discuss ranges or trends.
+    5. Don't repeat previous arguments.
+    6. Stay in character but be flexible.
+    7. Be thorough but focused (3-5 impactful sentences).
+    8. Current year: {current_date_str.split('-')[0]}.
+    
+    OUTPUT FORMAT:
+    Share your argument naturally. Optionally include [CONFIDENCE:X%] if you want to express certainty level.
+    """
+    
+    user_msg_content = f"{last_speaker_name} said: {last_message}" if language == "en" else f"{last_speaker_name} dedi ki: {last_message}"
+    
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_msg_content}
     ]
+
+def parse_confidence(response):
+    """Splits a [CONFIDENCE:X%] / [GÜVEN:X%] tag off a response. Returns (confidence, clean_response)."""
+    # Parse confidence from response (supports both Turkish and English)
+    confidence = 50 # Default confidence
+    clean_response = response
     
-    # Moderator Agent (The Chairman) - Uses the BEST model for critical oversight
-    moderator = AIModel(
-        name="Orion (Moderatör)",
-        provider="openai",
-        model_name="gpt-5-mini",
-        persona="""Başkan (The Chairman): Tartışmayı yöneten ve karara varmayı sağlayan lidersin.
-        GÖREVİN: Tartışma tıkandığında yeni perspektifler sun, konudan sapıldığında geri yönlendir.
-        KONUŞMA TARZI: Profesyonel, kararlı ve çözüm odaklı. Tartışmayı ileriye taşı."""
-    )
+    confidence_match = re.search(r'\[(GÜVEN|CONFIDENCE):?\s*(\d+)%\]', response, re.IGNORECASE)
+    if confidence_match:
+        confidence = int(confidence_match.group(2))
+        clean_response = re.sub(r'\[(GÜVEN|CONFIDENCE):?\s*\d+%\]\s*', '', response, flags=re.IGNORECASE).strip()
+    return confidence, clean_response
+
+async def run_parallel_rounds(debaters, moderator, context, query, research_block, language,
+                              messages, agent_history, agent_speak_count, all_arguments_so_far, save_to_db,
+                              max_rebuttal_pairs=2):
+    """
+    Parallel debate mode. Every debater writes an opening statement at the same time
+    (streamed in the order they finish), then the moderator picks the most conflicting
+    pairs for a short serial rebuttal round. Updates the shared debate state
+    (messages, agent_history, ...) the same way the classic turn loop does.
+    """
+    user_label = "User" if language == "en" else "Kullanıcı"
+
+    def record(d, clean_response):
+        save_to_db("assistant", clean_response, agent_name=d.name)
+        messages.append({"role": "assistant", "content": clean_response})
+        agent_speak_count[d.name] += 1
+        agent_history[d.name].append(clean_response)
+        all_arguments_so_far.append(f"{d.name}: {clean_response[:100]}")
+
+    # --- 1. OPENING STATEMENTS (concurrent) ---
+    yield {"type": "phase", "phase": "AŞAMA 1: Opening Statements" if language == "en" else "AŞAMA 1: Açılış Konuşmaları"}
+    for d in debaters:
+        yield {"type": "typing", "agent": d.name}
+
+    async def opening(d):
+        payload = build_turn_messages(d, context, query, user_label, query, research_block, "", language)
+        return d, await asyncio.to_thread(d.generate_response, payload)
+
+    openings = {}
+    confidences = {}
+    for next_done in asyncio.as_completed([opening(d) for d in debaters]):
+        d, response = await next_done
+        if response.startswith("Error"):
+            yield {"type": "message", "role": d.name, "content": f"⚠️ {d.name} Devre Dışı: {response}", "is_agent": True}
+            continue
+        confidence, clean_response = parse_confidence(response)
+        openings[d.name] = clean_response
+        confidences[d.name] = confidence
+        yield {"type": "message", "role": d.name, "content": clean_response, "is_agent": True, "confidence": confidence}
+        record(d, clean_response)
+
+    if len(openings) < 2 or max_rebuttal_pairs <= 0:
+        return
+
+    # --- 2. MODERATOR PICKS THE MOST CONFLICTING PAIRS ---
+    yield {"type": "phase", "phase": "AŞAMA 2: Rebuttals" if language == "en" else "AŞAMA 2: Karşılıklı Yanıtlar"}
+    yield {"type": "typing", "agent": moderator.name}
+    statements = "\n".join([f"- {name}: {text[:300]}" for name, text in openings.items()])
+    pair_prompt = f"""
+    GÖREV: Aşağıdaki açılış konuşmalarında birbiriyle EN ÇOK çelişen üye çiftlerini belirle.
+    
+    KONU: {query}
     
-    return debaters, moderator, CONTEXT
+    AÇILIŞ KONUŞMALARI:
+    {statements}
+    
+    Çıktı SADECE JSON olsun, en fazla {max_rebuttal_pairs} çift. İlk isim ikinciye cevap verecek:
+    [["İsim1", "İsim2"], ...]
+    """
+    pairs = []
+    try:
+        pair_response = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": pair_prompt}])
+        for pair in json.loads(pair_response.replace("```json", "").replace("```", "").strip()):
+            if (len(pair) == 2 and pair[0] != pair[1]
+                    and pair[0] in openings and pair[1] in openings):
+                pairs.append((pair[0], pair[1]))
+    except Exception:
+        pairs = []
+    if not pairs:
+        # Fallback: least confident member answers the most confident one
+        ranked = sorted(confidences, key=confidences.get)
+        pairs = [(ranked[0], ranked[-1])]
+    pairs = pairs[:max_rebuttal_pairs]
+
+    # --- 3. SHORT SERIAL REBUTTALS ---
+    by_name = {d.name: d for d in debaters}
+    for speaker_name, target_name in pairs:
+        d = by_name[speaker_name]
+        yield {"type": "typing", "agent": d.name}
+        prev_args_text = "\n".join([f"- {arg}" for arg in all_arguments_so_far])
+        payload = build_turn_messages(d, context, query, target_name, openings[target_name], research_block, prev_args_text, language)
+        response = await asyncio.to_thread(d.generate_response, payload)
+        if response.startswith("Error"):
+            yield {"type": "message", "role": d.name, "content": f"⚠️ {d.name} Devre Dışı: {response}", "is_agent": True}
+            continue
+        confidence, clean_response = parse_confidence(response)
+        yield {"type": "message", "role": d.name, "content": clean_response, "is_agent": True, "confidence": confidence}
+        record(d, clean_response)
+
+    yield {"type": "phase", "phase": "AŞAMA 3: Voting" if language == "en" else "AŞAMA 3: Oylama"}
+
+async def run_committee_rounds(debaters, moderator, context, query, research_block, language,
+                               messages, agent_history, agent_speak_count, all_arguments_so_far, save_to_db,
+                               committee_size=personas.COMMITTEE_SIZE, rebuttals=True):
+    """
+    Sub-committee mode for boards larger than committee_size. The board is split
+    into committees that debate at the same time (concurrent openings, then one
+    concurrent round of answers to the own committee). Each committee's chair (its
+    first member) summarizes the committee's position; while there are more
+    positions than committee_size, groups of them are merged by one of their
+    chairs. The moderator then holds the plenary over the remaining positions and
+    the regular vote follows. Wall-clock time grows with the number of merge
+    levels (logarithmic in the board size), not with the number of members.
+    """
+    en = language == "en"
+    user_label = "User" if en else "Kullanıcı"
+    committees = split_committees(debaters, committee_size)
+    committee_of = {d.name: i for i, members in enumerate(committees) for d in members}
+    statements = [{} for _ in committees]  # latest statement of every member, per committee
+
+    def committee_label(i):
+        return f"Committee {i + 1}" if en else f"Alt Komite {i + 1}"
+
+    def record(d, clean_response):
+        save_to_db("assistant", clean_response, agent_name=d.name)
+        messages.append({"role": "assistant", "content": clean_response})
+        agent_speak_count[d.name] += 1
+        agent_history[d.name].append(clean_response)
+        all_arguments_so_far.append(f"{d.name}: {clean_response[:100]}")
+
+    async def speak(d, payload):
+        return d, await asyncio.to_thread(d.generate_response, payload)
+
+    async def concurrent_round(calls):
+        # Statements are streamed in the order they finish, whichever committee they belong to
+        for next_done in asyncio.as_completed([speak(d, payload) for d, payload in calls]):
+            d, response = await next_done
+            if response.startswith("Error"):
+                yield {"type": "message", "role": d.name, "content": f"⚠️ {d.name} Devre Dışı: {response}", "is_agent": True}
+                continue
+            confidence, clean_response = parse_confidence(response)
+            statements[committee_of[d.name]][d.name] = clean_response
+            yield {"type": "message", "role": d.name, "content": clean_response, "is_agent": True,
+                   "confidence": confidence, "committee": committee_of[d.name] + 1}
+            record(d, clean_response)
+
+    # --- 1. COMMITTEES: OPENING STATEMENTS (all committees at once) ---
+    yield {"type": "phase", "phase": "AŞAMA 1: Sub-committees" if en else "AŞAMA 1: Alt Komiteler",
+           "committees": [[d.name for d in members] for members in committees]}
+    for d in debaters:
+        yield {"type": "typing", "agent": d.name}
+    openings = [(d, build_turn_messages(d, context, query, user_label, query, research_block, "", language)) for d in debaters]
+    async for event in concurrent_round(openings):
+        yield event
+
+    # --- 2. COMMITTEES: ANSWERS WITHIN THE COMMITTEE ---
+    if rebuttals:
+        calls = []
+        for i, members in enumerate(committees):
+            for d in members:
+                others = "\n".join(f"- {name}: {text[:300]}" for name, text in statements[i].items() if name != d.name)
+                if d.name in statements[i] and others:
+                    yield {"type": "typing", "agent": d.name}
+                    calls.append((d, build_turn_messages(d, context, query, committee_label(i), others, research_block, "", language)))
+        async for event in concurrent_round(calls):
+            yield event
+
+    # --- 3. CHAIRS SUMMARIZE, MERGED LEVEL BY LEVEL ---
+    def position_summary(chair, title, positions_text):
+        prompt = f"""
+        SEN: {chair.name} ({chair.persona.split(":")[0]}) - {title} başkanı
+        KONU: {query}
+
+        GÖRÜŞLER:
+        {positions_text}
+
+        GÖREVİN: Bu görüşlerin ORTAK POZİSYONUNU 3-4 cümle ile özetle:
+        ağırlıklı görüş, önemli itirazlar (kimden geldiği ile) ve önerilen karar.
+        Yeni argüman ekleme. {"Write in English." if en else "Türkçe yaz."}
+        """
+        response = chair.generate_response([{"role": "user", "content": prompt}])
+        if response.startswith("Error"):
+            # Keep the plenary going with the raw statements
+            return positions_text[:800]
+        return response
+
+    # (title, chair, text) per committee with at least one statement
+    positions = [
+        (committee_label(i), members[0], "\n".join(f"- {name}: {text[:300]}" for name, text in statements[i].items()))
+        for i, members in enumerate(committees) if statements[i]
+    ]
+    if not positions:
+        return
+
+    yield {"type": "phase", "phase": "AŞAMA 2: Committee Positions" if en else "AŞAMA 2: Komite Pozisyonları"}
+    level = 0
+    while True:
+        for _, chair, _ in positions:
+            yield {"type": "typing", "agent": chair.name}
+        summaries = await asyncio.gather(*[
+            asyncio.to_thread(position_summary, chair, title, text) for title, chair, text in positions
+        ])
+        positions = [(title, chair, summary) for (title, chair, _), summary in zip(positions, summaries)]
+        for title, chair, summary in positions:
+            content = f"📋 **{title}:** {summary}"
+            save_to_db("assistant", content, agent_name=chair.name)
+            messages.append({"role": "assistant", "content": f"[{title} - {chair.name}]: {summary}"})
+            yield {"type": "message", "role": chair.name, "content": content, "is_agent": True, "committee_summary": level}
+        if len(positions) <= committee_size:
+            break
+        # Too many positions for one plenary: merge them in groups (one more level)
+        level += 1
+        positions = [
+            (" + ".join(title for title, _, _ in group), group[0][1], "\n".join(f"- {title}: {text}" for title, _, text in group))
+            for group in split_committees(positions, committee_size)
+        ]
+
+    # --- 4. PLENARY ---
+    yield {"type": "phase", "phase": "AŞAMA 3: Plenary" if en else "AŞAMA 3: Genel Kurul"}
+    yield {"type": "typing", "agent": moderator.name}
+    positions_text = "\n".join(f"- {title} ({chair.name}): {text}" for title, chair, text in positions)
+    plenary_prompt = f"""
+    SEN: {moderator.name} ({moderator.persona})
+    ANA KONU: {query}
+
+    KOMİTE POZİSYONLARI:
+    {positions_text}
 
-async def simulate_debate_streaming(query, history, company_info, image_base64=None, api_key=None, conversation_id=None, language="tr", is_clarification_response=False):
-    debaters, moderator, context = get_debaters(company_info, language)
+    GÖREVİN:
+    1. Komitelerin uzlaştığı noktaları belirt.
+    2. Ayrıştıkları noktaları ve gerekçelerini netleştir.
+    3. Kurulun oylaması gereken somut seçenekleri ortaya koy.
+
+    FORMAT: 4-6 cümle. {"Write in English." if en else "Türkçe yaz."}
+    """
+    plenary = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": plenary_prompt}])
+    if not plenary.startswith("Error"):
+        save_to_db("assistant", plenary, agent_name=moderator.name)
+        yield {"type": "message", "role": moderator.name, "content": f"⚖️ {plenary}", "is_agent": True}
+        messages.append({"role": "assistant", "content": f"[Moderatör]: {plenary}"})
+
+_background_tasks = set()
+
+def schedule_summary_refresh(conversation_id, summarizer):
+    """Updates the conversation's rolling summary in the background, off the stream."""
+    if not conversation_id:
+        return
+    task = asyncio.get_running_loop().create_task(
+        asyncio.to_thread(conversation_memory.refresh_summary, conversation_id, summarizer)
+    )
+    _background_tasks.add(task)  # keep a reference until it finishes
+    task.add_done_callback(_background_tasks.discard)
+
+def schedule_decision_records(*writes):
+    """Runs the post-vote memory / analytics writes in the background (failures are logged by each write)."""
+    task = asyncio.gather(*writes, return_exceptions=True)
+    _background_tasks.add(task)  # keep a reference until it finishes
+    task.add_done_callback(_background_tasks.discard)
+
+def is_failed_research(text):
+    """Error placeholders from vision / scraping / search / summaries, which must not be cached."""
+    return not text or text.startswith((
+        "Error", "Görsel analiz edilemedi", "Web sitesi okunamadı", "İnternet araması yapılamadı",
+        "Could not", "Site analiz edilemedi", "Araştırma tamamlanamadı",
+    ))
+
+def find_agent(agents, target_agent):
+    """Matches ChatRequest.target_agent ("Sterling", "@orion", ...) to an agent by (first) name."""
+    wanted = (target_agent or "").strip().lstrip("@").lower()
+    if not wanted:
+        return None
+    for agent in agents:
+        if agent.name.lower() == wanted or agent.name.split(" ")[0].lower() == wanted:
+            return agent
+    return None
+
+def load_cached_research(conversation_id, max_chars=3000):
+    """Website / market research summaries already stored as system messages of this conversation."""
+    if not conversation_id:
+        return ""
+    try:
+        res = get_db_client().table("messages").select("content").eq("conversation_id", conversation_id) \
+            .eq("role", "system").order("created_at", desc=True).limit(10).execute()
+    except Exception as e:
+        print(f"Cached research lookup failed: {e}")
+        return ""
+    # Skip contradiction notices, voting option lists and reports, keep chronological order
+    notes = [m["content"] for m in res.data or [] if not m["content"].lstrip().startswith(("🔍", "🎯", "#"))]
+    return "\n".join(reversed(notes[:3]))[:max_chars]
+
+async def run_direct_question(agent, moderator, context, query, history, research_block, language, save_to_db, moderator_note=False):
+    """
+    Direct question to one board member (ChatRequest.target_agent): no research,
+    no debate and no voting - one answer from the named persona, optionally
+    followed by a short moderator note.
+    """
+    user_label = "User" if language == "en" else "Kullanıcı"
+    yield {"type": "typing", "agent": agent.name}
+
+    # Rolling summary (system) + recent board turns of this conversation
+    recent = [m["content"][:150 if m["role"] == "assistant" else 1500] for m in history[-7:] if m.get("role") in ("assistant", "system")]
+    prev_args_text = "\n".join([f"- {arg}" for arg in recent])
+    payload = build_turn_messages(agent, context, query, user_label, query, research_block, prev_args_text, language)
+    payload[0]["content"] += (
+        "\n    The user is asking YOU directly. Answer the question from your own role; do not simulate the other members."
+        if language == "en" else
+        "\n    Kullanıcı soruyu DOĞRUDAN SANA soruyor. Kendi rolünden cevap ver; diğer üyeler adına konuşma."
+    )
+    response = await asyncio.to_thread(agent.generate_response, payload)
+    if response.startswith("Error"):
+        yield {"type": "message", "role": agent.name, "content": f"⚠️ {agent.name} Devre Dışı: {response}", "is_agent": True}
+        return
+
+    confidence, clean_response = parse_confidence(response)
+    save_to_db("assistant", clean_response, agent_name=agent.name)
+    yield {"type": "message", "role": agent.name, "content": clean_response, "is_agent": True, "confidence": confidence}
+
+    if moderator_note and agent is not moderator:
+        yield {"type": "typing", "agent": moderator.name}
+        note_prompt = f"""
+        SEN: {moderator.name} ({moderator.persona})
+        SORU ({user_label}): {query}
+        {agent.name} CEVABI: {clean_response[:800]}
+        
+        GÖREVİN: Bu cevaba 1-2 cümlelik kısa bir moderatör notu ekle (eksik kalan risk veya bakış açısı).
+        Kullanıcının dilinde yaz.
+        """
+        note = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": note_prompt}])
+        if not note.startswith("Error"):
+            save_to_db("assistant", note, agent_name=moderator.name)
+            yield {"type": "message", "role": moderator.name, "content": f"⚖️ {note}", "is_agent": True}
+
+async def simulate_debate_streaming(query, history, company_info, image_base64=None, api_key=None, conversation_id=None, language="tr", is_clarification_response=False, debate_mode=None, profile=None, client_pacing=None, target_agent=None, org_id=None, shared_research=None, save_memory=True):
+    # shared_research: research artifact dict used (and filled) instead of a conversation's
+    # own, e.g. by all scenarios of a batch job. save_memory=False keeps hypothetical
+    # runs out of the organization's decision memory and analytics.
+
+    # Execution profile (fast / standard / deep); explicit request fields win
+    profile = get_profile(profile, debate_mode=debate_mode, client_pacing=client_pacing)
+    # The organization's board (persona registry, cached per worker)
+    members = await personas.board_for_org(org_id) if org_id else None
+    debaters, moderator, context = get_debaters(company_info, language, profile["model_tier"], members)
+
+    def typing(agent, delay=0.0):
+        event = {"type": "typing", "agent": agent}
+        if delay and profile["client_pacing"]:
+            event["pace_ms"] = int(delay * 1000)
+        return event
+
+    async def pause(delay):
+        # Suspense pause between turns; with client pacing the client waits instead
+        if delay and not profile["client_pacing"]:
+            await asyncio.sleep(delay)
     
-    # Helper to save to DB asynchronously
+    # Messages are stored in the background, in order (repository.MessageWriter);
+    # flush before anything reads the conversation back
+    message_writer = repository.MessageWriter(conversation_id)
+
     def save_to_db(role, content, agent_name=None):
-        if conversation_id:
-            try:
-                msg_data = {
-                    "conversation_id": conversation_id,
-                    "role": role,
-                    "content": content,
-                    "metadata": {"agent_name": agent_name} if agent_name else {}
-                }
-                
-                # Use Admin Client if available to bypass RLS (since backend is acting as system)
-                client = supabase_admin if supabase_admin else supabase
-                client.table("messages").insert(msg_data).execute()
-            except Exception as e:
-                print(f"DB Save Error: {e}")
+        message_writer.add(role, content, agent_name)
+
+    if conversation_id:
+        # Prompt history comes from the server (rolling summary + recent turns, see
+        # conversation_memory.py) together with earlier research artifacts (research_cache.py)
+        history, research = await asyncio.gather(
+            asyncio.to_thread(conversation_memory.load_context, conversation_id),
+            asyncio.to_thread(research_cache.load, conversation_id),
+        )
+    else:
+        history = (history or [])[-conversation_memory.RECENT_TURNS:]
+        research = {} if shared_research is None else shared_research
+    research_changed = False
 
     # Save User Message First
     save_to_db("user", query)
 
+    # A question addressed to one member skips research, debate and voting
+    direct_agent = find_agent(debaters + [moderator], target_agent)
+
     # --- 0. VISION ANALYSIS ---
     image_description = ""
     if image_base64:
         yield {"type": "typing", "agent": "System" if language == "en" else "Sistem"}
         analyzing_vision_msg = "👁️ **Analyzing Image...**" if language == "en" else "👁️ **Görsel Analiz Ediliyor...**"
         yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": analyzing_vision_msg, "is_agent": False}
-        image_description = analyze_image(image_base64, api_key)
+        image_key = hashlib.sha256(image_base64.encode()).hexdigest()
+        cached_image = research_cache.find(research, "image", key=image_key)
+        if cached_image:
+            image_description = cached_image["content"]
+        else:
+            image_description = await asyncio.to_thread(analyze_image, image_base64, api_key)
+            if not is_failed_research(image_description):
+                research_cache.put(research, "image", image_description, key=image_key)
+                research_changed = True
         vision_label = "📸 **Image Analysis:**" if language == "en" else "📸 **Görsel Analizi:**"
         yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": f"{vision_label}\n{image_description}", "is_agent": False}
 
@@ -387,7 +849,7 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
     website_content = ""
     search_results = ""
     
-    if not is_clarification_response:
+    if not is_clarification_response and not direct_agent:
         # --- 0.5 WEB SEARCH & OPTION EXTRACTION ---
         yield {"type": "typing", "agent": "System" if language == "en" else "Sistem"}
         
@@ -396,14 +858,48 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
         # This prevents "tunnel vision" on open-ended questions.
     
 
-        # --- 1. WEBSITE ANALYSIS ---
+        # --- 1. START WEB SEARCH ---
+        # Query optimisation + search run in a worker thread while the website is
+        # crawled and analysed, so the extra crawled pages add no wall-clock time.
+        search_optimizer = debaters[0] # Use the first agent (usually GPT-4o-mini) for optimization
+        if language == "en":
+            opt_prompt = [
+                {"role": "system", "content": f"You are a search engine expert. TODAY'S DATE: {datetime.now().strftime('%Y-%m-%d')}. Analyze the user's discussion topic and write the BEST Google search query to find CURRENT concrete data (costs, statistics, news, trends).\n\nRULES:\n1. Write only the query, nothing else.\n2. Search in the language of the user's question and INCLUDE THE YEAR (e.g., '2025 trends')."},
+                {"role": "user", "content": f"Topic: {query}\nCompany: {company_info.get('name')} ({company_info.get('industry')})"}
+            ]
+        else:
+            opt_prompt = [
+                {"role": "system", "content": f"Sen bir arama motoru uzmanısın. BUGÜNÜN TARİHİ: {datetime.now().strftime('%Y-%m-%d')}. Kullanıcının tartışma konusunu analiz et ve bu konuda GÜNCEL somut veriler (maliyet, istatistik, haber, trendler) bulmak için EN İYİ Google arama sorgusunu yaz.\n\nKURALLAR:\n1. Sadece sorguyu yaz, başka hiçbir şey yazma.\n2. Kullanıcının sorusu hangi dildeyse, aramayı O DİLDE yap ve YILI BELİRT (Örn: '2025 trends')."},
+                {"role": "user", "content": f"Konu: {query}\nŞirket: {company_info.get('name')} ({company_info.get('industry')})"}
+            ]
+
+        # A follow-up on a similar topic reuses the stored search summary;
+        # a topic shift only runs a new (incremental) search. Summaries are keyed by
+        # the company name / industry the query was built from (batch scenarios
+        # share one research dict but may vary the industry)
+        search_key = research_cache.search_key(company_info)
+        cached_search = research_cache.find(research, "search", key=search_key, topic=query)
+
+        def run_search():
+            if profile["search_optimizer"]:
+                search_query = search_optimizer.generate_response(opt_prompt, coalesce=True).strip().replace('"', '')
+            else:
+                search_query = f"{query} {company_info.get('industry') or ''} {datetime.now().year}".strip()
+            return perform_web_search(search_query, max_results=profile["search_max_results"])
+
+        search_task = None if cached_search else asyncio.create_task(asyncio.to_thread(run_search))
+
+        # --- 1.5 WEBSITE ANALYSIS ---
         website_url = company_info.get('website_url')
         website_content = ""
-        if website_url:
+        cached_site = research_cache.find(research, "website", key=website_url) if website_url else None
+        if cached_site:
+            website_content = cached_site["content"]
+        elif website_url:
             yield {"type": "typing", "agent": "System" if language == "en" else "Sistem"}
             analyzing_msg = f"🌐 **Analyzing Website:** {website_url}" if language == "en" else f"🌐 **Web Sitesi Analiz Ediliyor:** {website_url}"
             yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": analyzing_msg, "is_agent": False}
-            raw_website_content = scrape_website(website_url)
+            raw_website_content = await scrape_website(website_url)
         
             # Use Moderator (or first agent) to summarize the website content
             # We use a temporary prompt to the moderator model
@@ -411,7 +907,7 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
                 analysis_prompt = f"""Analyze this website and give a SHORT summary (max 5 bullet points).
 
     RAW TEXT:
-    {raw_website_content[:2500]}
+    {raw_website_content[:4000]}
 
     FORMAT (use simple bullets, NO markdown symbols):
     • Company: [name - industry]
@@ -425,7 +921,7 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
                 analysis_prompt = f"""Bu web sitesini analiz et ve KISA bir özet ver (max 5 madde).
 
     HAM METİN:
-    {raw_website_content[:2500]}
+    {raw_website_content[:4000]}
 
     FORMAT (basit maddeler kullan, markdown KULLANMA):
     • Şirket: [isim - sektör]
@@ -436,73 +932,95 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
 
     KISA ve TEMİZ tut. Uzun paragraflar yazma."""
         
-            try:
-                website_content = moderator.generate_response([{"role": "user", "content": analysis_prompt}])
-            except:
-                error_msg = "Could not analyze website." if language == "en" else "Site analiz edilemedi."
-                website_content = error_msg
+            if not profile["website_analysis"]:
+                website_content = raw_website_content[:1500]
+            else:
+                try:
+                    website_content = await asyncio.to_thread(
+                        moderator.generate_response, [{"role": "user", "content": analysis_prompt}], True
+                    )
+                except:
+                    error_msg = "Could not analyze website." if language == "en" else "Site analiz edilemedi."
+                    website_content = error_msg
 
             save_to_db("system", website_content)
             yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": website_content, "is_agent": False}
+            if not is_failed_research(raw_website_content) and not is_failed_research(website_content):
+                research_cache.put(research, "website", website_content, key=website_url)
+                research_changed = True
 
-        # --- 1. PERFORM WEB SEARCH ---
-        yield {"type": "typing", "agent": "System" if language == "en" else "Sistem"}
-    
-        # Optimize Search Query
-        search_optimizer = debaters[0] # Use the first agent (usually GPT-4o-mini) for optimization
-        if language == "en":
-            opt_prompt = [
-                {"role": "system", "content": f"You are a search engine expert. TODAY'S DATE: {datetime.now().strftime('%Y-%m-%d')}. Analyze the user's discussion topic and write the BEST Google search query to find CURRENT concrete data (costs, statistics, news, trends).\n\nRULES:\n1. Write only the query, nothing else.\n2. Search in the language of the user's question and INCLUDE THE YEAR (e.g., '2025 trends')."},
-                {"role": "user", "content": f"Topic: {query}\nCompany: {company_info.get('name')} ({company_info.get('industry')})"}
-            ]
+        # --- 2. WEB SEARCH RESULTS ---
+        if cached_search:
+            search_results = cached_search["content"]
         else:
-            opt_prompt = [
-                {"role": "system", "content": f"Sen bir arama motoru uzmanısın. BUGÜNÜN TARİHİ: {datetime.now().strftime('%Y-%m-%d')}. Kullanıcının tartışma konusunu analiz et ve bu konuda GÜNCEL somut veriler (maliyet, istatistik, haber, trendler) bulmak için EN İYİ Google arama sorgusunu yaz.\n\nKURALLAR:\n1. Sadece sorguyu yaz, başka hiçbir şey yazma.\n2. Kullanıcının sorusu hangi dildeyse, aramayı O DİLDE yap ve YILI BELİRT (Örn: '2025 trends')."},
-                {"role": "user", "content": f"Konu: {query}\nŞirket: {company_info.get('name')} ({company_info.get('industry')})"}
-            ]
-        optimized_query = search_optimizer.generate_response(opt_prompt).strip().replace('"', '')
+            yield {"type": "typing", "agent": "System" if language == "en" else "Sistem"}
     
-        raw_search_results = perform_web_search(optimized_query)
+            raw_search_results = await search_task
     
-        # Use Moderator to summarize the search results
-        if language == "en":
-            research_prompt = f"""Give a SHORT market research summary about: {query}
+            # Use Moderator to summarize the search results
+            if language == "en":
+                research_prompt = f"""Give a SHORT market research summary about: {query}
 
-    SEARCH RESULTS:
-    {raw_search_results[:2000]}
+        SEARCH RESULTS:
+        {raw_search_results[:2000]}
 
-    FORMAT (max 4 bullet points, NO markdown, keep each point SHORT):
-    • Trends: [1-2 key trends]
-    • Stats: [any numbers found, or "No data"]
-    • News: [1-2 recent headlines if any]
-    • Recommendation: [1 sentence advice]
+        FORMAT (max 4 bullet points, NO markdown, keep each point SHORT):
+        • Trends: [1-2 key trends]
+        • Stats: [any numbers found, or "No data"]
+        • News: [1-2 recent headlines if any]
+        • Recommendation: [1 sentence advice]
 
-    Filter out irrelevant info. If no good data found, just say "No significant data found." Keep it under 100 words total."""
-        else:
-            research_prompt = f"""Şu konu hakkında KISA bir pazar araştırması özeti ver: {query}
+        Filter out irrelevant info. If no good data found, just say "No significant data found." Keep it under 100 words total."""
+            else:
+                research_prompt = f"""Şu konu hakkında KISA bir pazar araştırması özeti ver: {query}
 
-    ARAMA SONUÇLARI:
-    {raw_search_results[:2000]}
+        ARAMA SONUÇLARI:
+        {raw_search_results[:2000]}
 
-    FORMAT (max 4 madde, markdown KULLANMA, her madde KISA olsun):
-    • Trendler: [1-2 ana trend]
-    • İstatistik: [bulunan rakamlar, yoksa "Veri yok"]
-    • Haberler: [varsa 1-2 güncel başlık]
-    • Tavsiye: [1 cümle öneri]
+        FORMAT (max 4 madde, markdown KULLANMA, her madde KISA olsun):
+        • Trendler: [1-2 ana trend]
+        • İstatistik: [bulunan rakamlar, yoksa "Veri yok"]
+        • Haberler: [varsa 1-2 güncel başlık]
+        • Tavsiye: [1 cümle öneri]
 
-    Alakasız bilgileri filtrele. İyi veri yoksa sadece "Kayda değer veri bulunamadı" de. Toplam 100 kelimeyi geçme."""
+        Alakasız bilgileri filtrele. İyi veri yoksa sadece "Kayda değer veri bulunamadı" de. Toplam 100 kelimeyi geçme."""
     
-        try:
-            search_results = moderator.generate_response([{"role": "user", "content": research_prompt}])
-        except:
-            error_msg = "Could not complete research." if language == "en" else "Araştırma tamamlanamadı."
-            search_results = error_msg
+            if not profile["research_summary"]:
+                search_results = raw_search_results[:2000]
+            else:
+                try:
+                    search_results = await asyncio.to_thread(
+                        moderator.generate_response, [{"role": "user", "content": research_prompt}], True
+                    )
+                except:
+                    error_msg = "Could not complete research." if language == "en" else "Araştırma tamamlanamadı."
+                    search_results = error_msg
 
-        save_to_db("system", search_results)
-        yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": search_results, "is_agent": False}
+            save_to_db("system", search_results)
+            yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": search_results, "is_agent": False}
+            if not is_failed_research(raw_search_results) and not is_failed_research(search_results):
+                research_cache.put(research, "search", search_results, key=search_key, topic=query)
+                research_changed = True
+    else:
+        # Clarification answers and direct questions reuse what is already known
+        cached_site = research_cache.latest(research, "website")
+        cached_search = (
+            research_cache.find(research, "search", key=research_cache.search_key(company_info), topic=query)
+            or research_cache.latest(research, "search")
+        )
+        website_content = cached_site["content"] if cached_site else ""
+        search_results = cached_search["content"] if cached_search else ""
     
     # --- 2. LOAD MEMORY (VECTOR) ---
-    past_decisions = search_memory_vector(query)
+    cached_memory = research_cache.find(research, "memory", topic=query)
+    if cached_memory:
+        past_decisions = cached_memory["content"]
+    else:
+        past_decisions = await asyncio.to_thread(search_memory_vector, query, org_id)
+        research_cache.put(research, "memory", past_decisions, topic=query)
+        research_changed = True
+    if research_changed:
+        await asyncio.to_thread(research_cache.save, conversation_id, research)
     memory_context = ""
     if past_decisions:
         memory_header = "PAST BOARD DECISIONS (Similar Topics):\n" if language == "en" else "GEÇMİŞ KONSEY KARARLARI (Benzer Konular):\n"
@@ -513,15 +1031,40 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
             else:
                 memory_context += f"- Konu: {p['topic']} -> Karar: {p['decision']} ({p['reason']})\n"
     
+    if direct_agent and not (website_content or search_results):
+        # Conversations from before the research cache: read the stored summary messages
+        search_results = await asyncio.to_thread(load_cached_research, conversation_id)
+
     # Initial setup
     messages = history + [{"role": "user", "content": query}]
     
+    # Shared research context for every debater prompt
+    research_block = f"""IMAGE CONTEXT: {image_description}
+    WEBSITE CONTENT: {website_content}
+    {search_results}
+    {memory_context}"""
+
+    if direct_agent:
+        async for event in run_direct_question(
+            direct_agent, moderator, context, query, history, research_block, language, save_to_db,
+            moderator_note=profile["direct_moderator_note"]
+        ):
+            yield event
+        await message_writer.flush()
+        schedule_summary_refresh(conversation_id, debaters[0])
+        yield {"type": "end", "reason": "direct_answer"}
+        return
+    
     # Track each agent's statements for contradiction detection
     agent_history = {d.name: [] for d in debaters}
+
+    # [CONFIDENCE:X%] of every turn, for the organization's decision analytics
+    agent_confidences = {d.name: [] for d in debaters}
     
-    # Track how many times each agent has spoken (max 2 per agent)
+    # Track how many times each agent has spoken (max 2 per agent in the standard profile)
     agent_speak_count = {d.name: 0 for d in debaters}
-    MAX_SPEAKS_PER_AGENT = 2  # Reduced from 3
+    MAX_SPEAKS_PER_AGENT = profile["max_speaks_per_agent"]
+    VOTE_AFTER_TURNS = profile["vote_after_turns"]  # once everyone has spoken (5 turns in the standard profile)
     
     # Global summary of all arguments made so far to prevent repetition
     all_arguments_so_far = []
@@ -529,248 +1072,229 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
     # Start with random debater
     current_debater_idx = 0
     
-    # Very short debates - quick to the point
-    max_turns = 5  # Reduced from 8 - each agent speaks 1-2 times max
-    
-    for turn in range(max_turns):
-        debater = debaters[current_debater_idx]
-        
-        # Check if this agent has reached their speaking limit
-        if agent_speak_count[debater.name] >= MAX_SPEAKS_PER_AGENT:
-            # Find next agent who hasn't reached limit
-            found_available = False
-            for i in range(len(debaters)):
-                candidate_idx = (current_debater_idx + i + 1) % len(debaters)
-                if agent_speak_count[debaters[candidate_idx].name] < MAX_SPEAKS_PER_AGENT:
-                    current_debater_idx = candidate_idx
-                    debater = debaters[current_debater_idx]
-                    found_available = True
-                    break
+    # Very short debates - quick to the point (5 turns in the standard profile)
+    max_turns = profile["max_turns"]
+    end_reason = "max_turns"
+    
+    if len(debaters) > personas.COMMITTEE_SIZE:
+        # --- LARGE BOARD: concurrent sub-committees, chair summaries, plenary ---
+        async for event in run_committee_rounds(
+            debaters, moderator, context, query, research_block, language,
+            messages, agent_history, agent_speak_count, all_arguments_so_far, save_to_db,
+            rebuttals=profile["max_speaks_per_agent"] > 1
+        ):
+            if event.get("confidence") is not None:
+                agent_confidences[event["role"]].append(event["confidence"])
+            yield event
+    elif profile["debate_mode"] == "parallel":
+        # --- PARALLEL MODE: all opening statements at once, then short rebuttals ---
+        async for event in run_parallel_rounds(
+            debaters, moderator, context, query, research_block, language,
+            messages, agent_history, agent_speak_count, all_arguments_so_far, save_to_db,
+            max_rebuttal_pairs=profile["max_rebuttal_pairs"]
+        ):
+            if event.get("confidence") is not None:
+                agent_confidences[event["role"]].append(event["confidence"])
+            yield event
+    else:
+        detector = consensus.ConsensusDetector(profile) if profile["early_stop"] else None
+        for turn in range(max_turns):
+            debater = debaters[current_debater_idx]
+        
+            # Check if this agent has reached their speaking limit
+            if agent_speak_count[debater.name] >= MAX_SPEAKS_PER_AGENT:
+                # Find next agent who hasn't reached limit
+                found_available = False
+                for i in range(len(debaters)):
+                    candidate_idx = (current_debater_idx + i + 1) % len(debaters)
+                    if agent_speak_count[debaters[candidate_idx].name] < MAX_SPEAKS_PER_AGENT:
+                        current_debater_idx = candidate_idx
+                        debater = debaters[current_debater_idx]
+                        found_available = True
+                        break
             
-            # If all agents reached limit, go to voting
-            if not found_available:
-                break
+                # If all agents reached limit, go to voting
+                if not found_available:
+                    break
         
-        # Check if all agents have spoken at least once - can trigger early voting
-        all_spoke_once = all(count >= 1 for count in agent_speak_count.values())
-        if all_spoke_once and turn >= 5:  # After 5 turns, if all spoke, start voting
-            break
+            # Check if all agents have spoken at least once - can trigger early voting
+            all_spoke_once = all(count >= 1 for count in agent_speak_count.values())
+            if all_spoke_once and turn >= VOTE_AFTER_TURNS:  # if all spoke, start voting
+                break
         
-        # Pick an opponent (the previous speaker, or random if first turn)
-        # In a multi-agent setup, we usually address the group or the last speaker.
-        # Let's find who spoke last.
-        last_speaker_name = "Kullanıcı"
-        if messages and messages[-1]['role'] == "assistant":
-             # We need to track who sent the last message. 
-             # Since 'messages' list just has 'assistant', we rely on the loop context or parse content.
-             # Better: pass explicit agent name in history if possible, but for now let's assume the previous turn's agent.
-             prev_idx = (current_debater_idx - 1) % len(debaters)
-             last_speaker_name = debaters[prev_idx].name
+            # Pick an opponent (the previous speaker, or random if first turn)
+            # In a multi-agent setup, we usually address the group or the last speaker.
+            # Let's find who spoke last.
+            last_speaker_name = "Kullanıcı"
+            if messages and messages[-1]['role'] == "assistant":
+                 # We need to track who sent the last message. 
+                 # Since 'messages' list just has 'assistant', we rely on the loop context or parse content.
+                 # Better: pass explicit agent name in history if possible, but for now let's assume the previous turn's agent.
+                 prev_idx = (current_debater_idx - 1) % len(debaters)
+                 last_speaker_name = debaters[prev_idx].name
 
-        yield {"type": "typing", "agent": debater.name}
-        await asyncio.sleep(1.5) # Suspense
+            yield typing(debater.name, profile["turn_delay"])
+            await pause(profile["turn_delay"]) # Suspense
         
-        # Construct Prompt
-        last_message = messages[-1]['content'] if messages else query
+            # Construct Prompt
+            last_message = messages[-1]['content'] if messages else query
         
-        # Summarize previous arguments
-        prev_args_text = "\n".join([f"- {arg}" for arg in all_arguments_so_far])
+            # Summarize previous arguments
+            prev_args_text = "\n".join([f"- {arg}" for arg in all_arguments_so_far])
         
-        current_date_str = datetime.now().strftime("%Y-%m-%d")
-
-        # Language instruction - MUST be at TOP of prompt for maximum effect
-        lang_instruction = ""
-        if language == "en":
-            lang_instruction = """
-        🚨 CRITICAL LANGUAGE RULE: YOU MUST RESPOND IN ENGLISH ONLY! 
-        The user asked their question in English. Your entire response MUST be in English.
-        Do NOT use Turkish. Do NOT mix languages. ENGLISH ONLY!
-        """
-        else:
-            lang_instruction = """
-        🚨 KRİTİK DİL KURALI: TÜRKÇE CEVAP VER!
-        Kullanıcı sorusunu Türkçe sordu. Tüm cevabın Türkçe olmalı.
-        """
-
-        # System Prompt Construction
-        system_prompt = f"""
-        {lang_instruction}
-        
-        {context}
-        
-        TODAY'S DATE: {current_date_str}
-        
-        IMAGE CONTEXT: {image_description}
-        WEBSITE CONTENT: {website_content}
-        {search_results}
-        {memory_context}
+            msg_payload = build_turn_messages(debater, context, query, last_speaker_name, last_message, research_block, prev_args_text, language)
         
-        PREVIOUS ARGUMENTS (DO NOT REPEAT!):
-        {prev_args_text}
-        
-        YOU ARE: {debater.name}
-        YOUR ROLE: {debater.persona}
-        TOPIC: {query}
-        
-        RULES:
-        1. Respond to the last speaker ({last_speaker_name}): {last_message}
-        2. Prefer concrete data with sources [Source: X] when available.
-        3. If no source, say "Based on my analysis..." or "Industry trends suggest..."
-        4. Avoid making up specific numbers, but you can discuss ranges or trends.
-        5. Don't repeat previous arguments.
-        6. Stay in character but be flexible.
-        7. Be thorough but focused (3-5 impactful sentences).
-        8. Current year: {current_date_str.split('-')[0]}.
-        
-        OUTPUT FORMAT:
-        Share your argument naturally. Optionally include [CONFIDENCE:X%] if you want to express certainty level.
-        """
+            response = await asyncio.to_thread(debater.generate_response, msg_payload)
         
-        user_msg_content = f"{last_speaker_name} said: {last_message}" if language == "en" else f"{last_speaker_name} dedi ki: {last_message}"
-        
-        msg_payload = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_msg_content}
-        ]
-        
-        response = debater.generate_response(msg_payload)
-        
-        # Error Handling: Log error but continue
-        if response.startswith("Error"):
-            yield {"type": "message", "role": debater.name, "content": f"⚠️ {debater.name} Devre Dışı: {response}", "is_agent": True}
-            messages.append({"role": "assistant", "content": f"{debater.name} teknik bir sorun nedeniyle bu turu pas geçti."})
+            # Error Handling: Log error but continue
+            if response.startswith("Error"):
+                yield {"type": "message", "role": debater.name, "content": f"⚠️ {debater.name} Devre Dışı: {response}", "is_agent": True}
+                messages.append({"role": "assistant", "content": f"{debater.name} teknik bir sorun nedeniyle bu turu pas geçti."})
             
-            # Switch turn and continue
-            current_debater_idx = (current_debater_idx + 1) % len(debaters)
-            continue
+                # Switch turn and continue
+                current_debater_idx = (current_debater_idx + 1) % len(debaters)
+                continue
         
-        # Parse confidence from response (supports both Turkish and English)
-        confidence = 50 # Default confidence
-        clean_response = response
+            confidence, clean_response = parse_confidence(response)
+            agent_confidences[debater.name].append(confidence)
         
-        confidence_match = re.search(r'\[(GÜVEN|CONFIDENCE):?\s*(\d+)%\]', response, re.IGNORECASE)
-        if confidence_match:
-            confidence = int(confidence_match.group(2))
-            clean_response = re.sub(r'\[(GÜVEN|CONFIDENCE):?\s*\d+%\]\s*', '', response, flags=re.IGNORECASE).strip()
+            # NOTE: Clarification feature disabled - agents no longer ask questions
         
-        # NOTE: Clarification feature disabled - agents no longer ask questions
+            yield {"type": "message", "role": debater.name, "content": clean_response, "is_agent": True, "confidence": confidence}
+            save_to_db("assistant", clean_response, agent_name=debater.name)
         
-        yield {"type": "message", "role": debater.name, "content": clean_response, "is_agent": True, "confidence": confidence}
-        save_to_db("assistant", clean_response, agent_name=debater.name)
+            messages.append({"role": "assistant", "content": clean_response})
         
-        messages.append({"role": "assistant", "content": clean_response})
+            # Increment agent speak count
+            agent_speak_count[debater.name] += 1
         
-        # Increment agent speak count
-        agent_speak_count[debater.name] += 1
         
-        
-        # --- CONTRADICTION DETECTION ---
-        if len(agent_history[debater.name]) >= 1:
-            # Check for contradictions with previous statements
-            prev_statements = " | ".join(agent_history[debater.name][-3:])  # Last 3 statements
+            # --- CONTRADICTION DETECTION ---
+            # The LLM check only runs when the local pre-filter sees a likely reversal
+            if (profile["contradiction_check"] and len(agent_history[debater.name]) >= 1
+                    and await contradiction_filter.likely_reversal(agent_history[debater.name][-3:], clean_response)):
+                # Check for contradictions with previous statements
+                prev_statements = " | ".join(agent_history[debater.name][-3:])  # Last 3 statements
             
-            contradiction_prompt = f"""
-            GÖREV: Aşağıdaki iki metni karşılaştır ve çelişki var mı kontrol et.
+                contradiction_prompt = f"""
+                GÖREV: Aşağıdaki iki metni karşılaştır ve çelişki var mı kontrol et.
             
-            ÖNCEKİ SÖZLER ({debater.name}):
-            {prev_statements}
+                ÖNCEKİ SÖZLER ({debater.name}):
+                {prev_statements}
             
-            YENİ SÖZ:
-            {clean_response}
+                YENİ SÖZ:
+                {clean_response}
             
-            SORU: Bu yeni söz, önceki sözlerle TEMEL BİR ÇELİŞKİ (A vs A değil) içeriyor mu?
+                SORU: Bu yeni söz, önceki sözlerle TEMEL BİR ÇELİŞKİ (A vs A değil) içeriyor mu?
             
-            DİKKAT:
-            - Eğer ajan "Yeni veriye dayanarak fikrimi değiştirdim" diyorsa bu ÇELİŞKİ DEĞİLDİR, stratejik bir manevradır.
-            - Eğer ajan "Risk var ama fırsat da var" diyorsa bu ÇELİŞKİ DEĞİLDİR, bir ikilemdir.
-            - Sadece bariz tutarsızlıkları (Örn: "Paramız yok" deyip sonra "Bütçemiz bol" demek) bildir.
+                DİKKAT:
+                - Eğer ajan "Yeni veriye dayanarak fikrimi değiştirdim" diyorsa bu ÇELİŞKİ DEĞİLDİR, stratejik bir manevradır.
+                - Eğer ajan "Risk var ama fırsat da var" diyorsa bu ÇELİŞKİ DEĞİLDİR, bir ikilemdir.
+                - Sadece bariz tutarsızlıkları (Örn: "Paramız yok" deyip sonra "Bütçemiz bol" demek) bildir.
             
-            CEVAP FORMATI (SADECE BİRİ):
-            - EĞER TEMEL ÇELİŞKİ VARSA: "ÇELİŞKİ: [kısa açıklama]"
-            - EĞER YOKSA: "YOK"
-            """
+                CEVAP FORMATI (SADECE BİRİ):
+                - EĞER TEMEL ÇELİŞKİ VARSA: "ÇELİŞKİ: [kısa açıklama]"
+                - EĞER YOKSA: "YOK"
+                """
             
-            try:
-                check_result = moderator.generate_response([{"role": "user", "content": contradiction_prompt}])
+                try:
+                    check_result = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": contradiction_prompt}])
                 
-                if check_result.startswith("ÇELİŞKİ:"):
-                    contradiction_msg = check_result.replace("ÇELİŞKİ:", "").strip()
-                    contradiction_text = f"🔍 **Çelişki Tespit Edildi!** {debater.name}: {contradiction_msg}"
-                    save_to_db("system", contradiction_text)
-                    yield {"type": "message", "role": "Sistem", "content": contradiction_text, "is_agent": False}
-            except:
-                pass  # Silent fail
+                    if check_result.startswith("ÇELİŞKİ:"):
+                        contradiction_msg = check_result.replace("ÇELİŞKİ:", "").strip()
+                        contradiction_text = f"🔍 **Çelişki Tespit Edildi!** {debater.name}: {contradiction_msg}"
+                        save_to_db("system", contradiction_text)
+                        yield {"type": "message", "role": "Sistem", "content": contradiction_text, "is_agent": False}
+                except:
+                    pass  # Silent fail
         
-        # Add current statement to history
-        agent_history[debater.name].append(clean_response)
-        
-        # Extract core argument (1 sentence summary) to prevent prompt bloat
-        try:
-            summary_prompt = f"Bu argümanı TEK CÜMLE ile özetle (sadece ana fikir): {clean_response[:200]}"
-            core_arg = moderator.generate_response([{"role": "user", "content": summary_prompt}])
-            all_arguments_so_far.append(f"{debater.name}: {core_arg[:100]}")
-        except:
-            all_arguments_so_far.append(f"{debater.name}: {clean_response[:80]}...")
+            # Add current statement to history
+            agent_history[debater.name].append(clean_response)
         
+            # Extract core argument (1 sentence summary) to prevent prompt bloat
+            if not profile["argument_summaries"]:
+                all_arguments_so_far.append(f"{debater.name}: {clean_response[:80]}...")
+            else:
+                try:
+                    summary_prompt = f"Bu argümanı TEK CÜMLE ile özetle (sadece ana fikir): {clean_response[:200]}"
+                    core_arg = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": summary_prompt}])
+                    all_arguments_so_far.append(f"{debater.name}: {core_arg[:100]}")
+                except:
+                    all_arguments_so_far.append(f"{debater.name}: {clean_response[:80]}...")
+
+            # --- CONSENSUS: vote as soon as the board agrees ---
+            if detector:
+                signals = await detector.observe(debater.name, clean_response, confidence, all_arguments_so_far[-1])
+                turns_saved = consensus.turns_left(turn, max_turns, agent_speak_count, MAX_SPEAKS_PER_AGENT, VOTE_AFTER_TURNS)
+                if signals["consensus"] and turns_saved:
+                    detector.record_stop(turn, max_turns, turns_saved, signals)
+                    consensus_text = "🤝 Board has reached consensus, moving to the vote." if language == "en" else "🤝 Kurul uzlaştı, oylamaya geçiliyor."
+                    save_to_db("system", consensus_text)
+                    yield {"type": "message", "role": "System" if language == "en" else "Sistem", "content": consensus_text, "is_agent": False}
+                    yield {"type": "consensus", "turn": turn + 1, "turns_saved": turns_saved,
+                           "signals": signals, "thresholds": detector.thresholds()}
+                    end_reason = "consensus"
+                    break
         
-        # --- MODERATOR INTERVENTION (Every 3 turns) ---
-        if (turn + 1) % 3 == 0 and turn < max_turns - 1:
-            yield {"type": "typing", "agent": moderator.name}
-            await asyncio.sleep(1)
+            # --- MODERATOR INTERVENTION (Every 3 turns in the standard profile) ---
+            moderator_every = profile["moderator_every"]
+            if moderator_every and (turn + 1) % moderator_every == 0 and turn < max_turns - 1:
+                yield typing(moderator.name, profile["moderator_delay"])
+                await pause(profile["moderator_delay"])
             
-            # Build context for moderator
-            recent_messages = messages[-6:] if len(messages) >= 6 else messages
-            recent_summary = "\n".join([f"- {m['content'][:100]}..." for m in recent_messages])
+                # Build context for moderator
+                recent_messages = messages[-6:] if len(messages) >= 6 else messages
+                recent_summary = "\n".join([f"- {m['content'][:100]}..." for m in recent_messages])
             
-            mod_prompt = f"""
-            SEN: {moderator.name} ({moderator.persona})
-            ANA KONU: {query}
-            ŞİRKET: {company_info.get('name')} ({company_info.get('industry')})
+                mod_prompt = f"""
+                SEN: {moderator.name} ({moderator.persona})
+                ANA KONU: {query}
+                ŞİRKET: {company_info.get('name')} ({company_info.get('industry')})
             
-            SON KONUŞMALAR:
-            {recent_summary}
+                SON KONUŞMALAR:
+                {recent_summary}
             
-            GÖREVİN:
-            1. Tartışmayı KARARA götürmek.
-            2. Tartışma tıkandıysa: Yeni bir perspektif sun veya farklı bir açıdan düşünmeye davet et.
-            3. Konudan sapıldıysa: Nazikçe ama kararlı bir şekilde ANA KONUYA ({query}) geri yönlendir.
-            4. Konuyla alakasız öneriler sunma.
+                GÖREVİN:
+                1. Tartışmayı KARARA götürmek.
+                2. Tartışma tıkandıysa: Yeni bir perspektif sun veya farklı bir açıdan düşünmeye davet et.
+                3. Konudan sapıldıysa: Nazikçe ama kararlı bir şekilde ANA KONUYA ({query}) geri yönlendir.
+                4. Konuyla alakasız öneriler sunma.
             
-            ÜSLUBUN: 
-            - Profesyonel, kararlı ve çözüm odaklı.
-            - Tartışmayı ileriye taşı, taraflar arasında köprü kur.
-            - Saygılı ama otoriter ol.
+                ÜSLUBUN: 
+                - Profesyonel, kararlı ve çözüm odaklı.
+                - Tartışmayı ileriye taşı, taraflar arasında köprü kur.
+                - Saygılı ama otoriter ol.
             
-            FORMAT: 3-4 cümle ile özetle ve yönlendir.
-            """
+                FORMAT: 3-4 cümle ile özetle ve yönlendir.
+                """
             
-            mod_response = moderator.generate_response([{"role": "user", "content": mod_prompt}])
+                mod_response = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": mod_prompt}])
             
-            if not mod_response.startswith("Error"):
-                mod_msg = f"⚖️ {mod_response}"
-                save_to_db("assistant", mod_response, agent_name=moderator.name)
-                yield {"type": "message", "role": moderator.name, "content": mod_msg, "is_agent": True}
-                messages.append({"role": "assistant", "content": f"[Moderatör]: {mod_response}"})
-        
-        # Smart Turn Taking Logic
-        # 1. Check if specific agent was mentioned in the last response
-        next_idx = -1
-        for i, d in enumerate(debaters):
-            if i != current_debater_idx and d.name in response:
-                next_idx = i
-                break
+                if not mod_response.startswith("Error"):
+                    mod_msg = f"⚖️ {mod_response}"
+                    save_to_db("assistant", mod_response, agent_name=moderator.name)
+                    yield {"type": "message", "role": moderator.name, "content": mod_msg, "is_agent": True}
+                    messages.append({"role": "assistant", "content": f"[Moderatör]: {mod_response}"})
         
-        # 2. If no direct mention, pick random opponent (Chaos Mode)
-        if next_idx == -1:
-            candidates = [i for i in range(len(debaters)) if i != current_debater_idx]
-            next_idx = random.choice(candidates)
+            # Smart Turn Taking Logic
+            # 1. Check if specific agent was mentioned in the last response
+            next_idx = -1
+            for i, d in enumerate(debaters):
+                if i != current_debater_idx and d.name in response:
+                    next_idx = i
+                    break
+        
+            # 2. If no direct mention, pick random opponent (Chaos Mode)
+            if next_idx == -1:
+                candidates = [i for i in range(len(debaters)) if i != current_debater_idx]
+                next_idx = random.choice(candidates)
             
-        current_debater_idx = next_idx
+            current_debater_idx = next_idx
     
     # --- VOTING ROUND (always runs after debate ends) ---
     # --- VOTING ROUND ---
-    yield {"type": "typing", "agent": "Sistem"}
-    await asyncio.sleep(1)
+    yield typing("Sistem", profile["vote_delay"])
+    await pause(profile["vote_delay"])
     yield {"type": "message", "role": "Sistem", "content": "🏁 Tartışma Sona Erdi. Seçenekler Belirleniyor...", "is_agent": False}
             
     # --- EXTRACT VOTING OPTIONS FROM DEBATE ---
@@ -797,7 +1321,7 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
     """
     
     try:
-        opt_response = moderator.generate_response([{"role": "user", "content": option_extract_prompt}])
+        opt_response = await asyncio.to_thread(moderator.generate_response, [{"role": "user", "content": option_extract_prompt}])
         voting_options = json.loads(opt_response.replace("```json", "").replace("```", "").strip())
         
         # Validate
@@ -811,9 +1335,8 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
     save_to_db("system", system_msg_content)
     yield {"type": "message", "role": "Sistem", "content": system_msg_content, "is_agent": False}
     
-    votes = []
-    
-    for d in debaters:
+    def cast_vote(d):
+        """Asks one debater for a vote and normalises it to one of the options."""
         vote_prompt = f"""
         {context}
         KONU: {query}
@@ -875,77 +1398,28 @@ async def simulate_debate_streaming(query, history, company_info, image_base64=N
         else:
             final_decision = decision # Keep original if NO match found
         
-        votes.append({
+        return {
             "agent": d.name,
             "persona": d.persona.split(":")[0],
             "decision": final_decision,
             "reason": vote_data.get("reason", "...")
-        })
+        }
     
-    # Determine Final Result
-    vote_counts = {}
-    for v in votes:
-        decision = v['decision']
-        vote_counts[decision] = vote_counts.get(decision, 0) + 1
+    # Votes are independent of each other -> cast them concurrently (order is kept)
+    votes = list(await asyncio.gather(*[asyncio.to_thread(cast_vote, d) for d in debaters]))
     
-    final_decision = max(vote_counts, key=vote_counts.get) if votes else "ÇEKİMSER"
+    # Determine Final Result (same tally as scripts/backfill_memory.py)
+    final_decision, vote_counts = tally_votes(votes)
 
-    # --- 3. SAVE MEMORY (VECTOR) ---
-    save_memory_vector(query, final_decision, f"Votes: {json.dumps(vote_counts, ensure_ascii=False)}")
-    
     save_to_db("vote_results", json.dumps(votes, ensure_ascii=False))
+    # --- 3. SAVE MEMORY (VECTOR) + DECISION ANALYTICS (background, the votes do not wait) ---
+    if save_memory:
+        schedule_decision_records(
+            asyncio.to_thread(save_memory_vector, query, final_decision, vote_reason(vote_counts), org_id, conversation_id),
+            decision_analytics.record_debate(org_id, votes, final_decision, agent_confidences),
+        )
     yield {"type": "vote_results", "votes": votes}
-    # --- END OF DEBATE: DECISION REPORT ---
-    yield {"type": "typing", "agent": "Sistem"}
-    yield {"type": "message", "role": "Sistem", "content": "📋 **Nihai Karar Raporu Hazırlanıyor...**", "is_agent": False}
-    
-    full_history_text = "\n".join([f"{m['role']}: {m['content']}" for m in messages if m['role'] != "system"])
-    
-    report_prompt = f"""
-    GÖREV: Bu yönetim kurulu toplantısının "Nihai Karar Tutanağı"nı hazırla.
-    
-    TARTIŞMA GEÇMİŞİ:
-    {full_history_text}
-    
-    TALİMATLAR:
-    - Profesyonel, resmi ve net bir dil kullan.
-    - Markdown formatını kusursuz uygula (Başlıklar, Listeler, Kalın Yazı).
-    - Her ana başlık öncesinde ve sonrasında MUTLAKA bir boş satır bırak.
-    
-    ÇIKTI FORMATI (TAM OLARAK BU ŞABLONU KULLAN):
-    
-    # 📋 [Konu Başlığı] - Karar Raporu
-    
-    ## 1. Yönetici Özeti
-    (Buraya 2-3 cümlelik net bir özet gelecek. Ne konuşuldu, hangi engeller çıktı, sonuç ne oldu?)
-    
-    ## 2. Temel Bulgular (SWOT Analizi)
-    ### ✅ Fırsatlar & Artılar
-    - (Madde 1)
-    - (Madde 2)
-    
-    ### ⚠️ Riskler & Tehditler
-    - (Madde 1)
-    - (Madde 2)
-    
-    ## 3. Nihai Karar
-    **(Karar: ONAY / RED / ERTELEME / REVİZYON)**
-    (Kararın gerekçesini buraya yaz.)
-    
-    ## 4. Aksiyon Planı
-    1. **[Hemen]:** (İlk adım)
-    2. **[Orta Vade]:** (Sonraki adım)
-    3. **[Kritik Uyarı]:** (Varsa dikkat edilmesi gereken nokta)
-    
-    ---
-    *Rapor Tarihi: {current_date_str} | Raportör: Pocket Board AI*
-    """
-    
-    try:
-        report_content = moderator.generate_response([{"role": "user", "content": report_prompt}])
-        yield {"type": "message", "role": "Sistem", "content": report_content, "is_agent": False}
-        save_to_db("system", report_content)
-    except Exception as e:
-        yield {"type": "message", "role": "Sistem", "content": f"Rapor oluşturulamadı: {str(e)}", "is_agent": False}
-
-    yield {"type": "end", "reason": "max_turns"}
+    # The decision report is generated on demand (GET /api/report, see report_service.py)
+    await message_writer.flush()
+    schedule_summary_refresh(conversation_id, debaters[0])
+    yield {"type": "end", "reason": end_reason, "report_available": bool(conversation_id)}
@@ -1,28 +1,49 @@
-
 import os
+import threading
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 load_dotenv()
 
-# Initialize Supabase Client
-url: str = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
-key: str = os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+# Supabase clients are created on first use instead of at import time:
+# supabase-py is slow to import and a missing env var should not stop the API from booting.
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_supabase():
+    """Anon Supabase client (respects RLS)."""
+    with _clients_lock:
+        if "anon" not in _clients:
+            from supabase import create_client
+
+            url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+            key = os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+            if not url or not key:
+                raise ValueError("Supabase URL or Key missing in environment variables.")
+            _clients["anon"] = create_client(url, key)
+        return _clients["anon"]
+
 
-if not url or not key:
-    raise ValueError("Supabase URL or Key missing in environment variables.")
+def get_supabase_admin():
+    """Supabase Admin Client (Bypasses RLS) - FOR BACKEND USE ONLY. None if the service key is missing."""
+    with _clients_lock:
+        if "admin" not in _clients:
+            url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+            service_key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
+            if url and service_key:
+                from supabase import create_client
+                _clients["admin"] = create_client(url, service_key)
+            else:
+                print("WARNING: SUPABASE_SERVICE_ROLE_KEY missing. Backend RLS bypass will fail.")
+                _clients["admin"] = None
+        return _clients["admin"]
 
-supabase: Client = create_client(url, key)
 
-# Initialize Supabase Admin Client (Bypasses RLS) - FOR BACKEND USE ONLY
-service_key: str = os.environ.get("SUPABASE_SERVICE_ROLE_KEY")
-supabase_admin: Client = None
-if service_key:
-    supabase_admin = create_client(url, service_key)
-else:
-    print("WARNING: SUPABASE_SERVICE_ROLE_KEY missing. Backend RLS bypass will fail.")
+def get_db_client():
+    """Admin client if configured, otherwise the anon client."""
+    return get_supabase_admin() or get_supabase()
 
 
 security = HTTPBearer()
@@ -35,7 +56,7 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Security(securi
     token = credentials.credentials
     try:
         # Verify user token with Supabase
-        user = supabase.auth.get_user(token)
+        user = get_supabase().auth.get_user(token)
         if not user:
              raise HTTPException(status_code=401, detail="Invalid token")
         return user
@@ -0,0 +1,319 @@
+"""
+Batch scenario sweeps: one decision, many variants of company_info.
+
+POST /api/batch creates a job and returns its id; the debates run in the
+background and GET /api/batch/{id} returns the results that are done so far
+(incrementally with ?since=N), /export returns them as CSV or JSON.
+
+- Each job runs its scenarios on a small worker pool (BATCH_WORKERS).
+- All scenarios of a job share one research dict (website digest, search
+  summary, memory lookup are done once) and identical concurrent calls are
+  coalesced (single_flight.py).
+- Batch debates go through the same admission controller as interactive ones,
+  under a separate "batch:<org>" queue key with a low weight
+  (BATCH_ADMISSION_WEIGHT), and at most BATCH_GLOBAL_LIMIT of them hold a slot
+  at once - the remaining debate slots are always left to interactive users.
+  A batch slot is renewed every ADMISSION_LEASE_TTL / 3 seconds while its
+  debate runs, like the admission leases.
+- Scenarios run without server-side pauses, are not stored as conversations and
+  are not saved to the organization's decision memory.
+
+A job runs on the worker that accepted it. Its status and results are written
+to shared_state after every scenario, so any worker can serve the GET / export
+requests; a cancel request is broadcast to the worker running the job. Job
+records expire BATCH_JOB_TTL seconds after their last update.
+"""
+import asyncio
+import csv
+import io
+import json
+import os
+import time
+import uuid
+
+try:
+    from backend.app.services import admission, report_service
+    from backend.app.services.ai_service import simulate_debate_streaming, get_debaters
+    from backend.app.services.conversation_memory import as_prompt_turn
+    from backend.app.services.shared_state import get_state
+    from backend.app.services.vector_memory import tally_votes
+except ImportError:
+    from app.services import admission, report_service
+    from app.services.ai_service import simulate_debate_streaming, get_debaters
+    from app.services.conversation_memory import as_prompt_turn
+    from app.services.shared_state import get_state
+    from app.services.vector_memory import tally_votes
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+BATCH_WORKERS = _env_int("BATCH_WORKERS", 2)
+BATCH_GLOBAL_LIMIT = _env_int("BATCH_GLOBAL_LIMIT", max(1, admission.admission_controller.global_limit // 4))
+BATCH_ADMISSION_WEIGHT = float(os.getenv("BATCH_ADMISSION_WEIGHT", "0.25"))
+BATCH_MAX_SCENARIOS = _env_int("BATCH_MAX_SCENARIOS", 50)
+BATCH_MAX_ACTIVE_PER_ORG = _env_int("BATCH_MAX_ACTIVE_PER_ORG", 2)
+BATCH_JOB_TTL = _env_int("BATCH_JOB_TTL", 6 * 3600)
+LEASE_POLL_SECONDS = 1.0
+CANCEL_CHANNEL = "batch.cancel"
+
+CSV_FIELDS = ["index", "name", "status", "decision", "vote_counts", "votes", "company_info",
+              "duration_seconds", "error", "report"]
+
+
+class BatchLimitError(Exception):
+    """Too many scenarios, or too many running jobs for the organization."""
+
+
+class BatchJob:
+    def __init__(self, org_id, query, base_company_info, scenarios, profile, language, include_report):
+        self.id = uuid.uuid4().hex
+        self.org_id = org_id
+        self.query = query
+        self.base_company_info = base_company_info
+        self.scenarios = scenarios
+        self.profile = profile
+        self.language = language
+        self.include_report = include_report
+        self.research = {}  # shared by every scenario of the job
+        self.results = []  # in completion order
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at = None
+        self.task = None
+
+    def scenario_input(self, index):
+        scenario = self.scenarios[index]
+        company_info = {**self.base_company_info, **(scenario.get("company_info") or {})}
+        return scenario.get("name") or f"#{index + 1}", scenario.get("message") or self.query, company_info
+
+    def to_record(self):
+        return {
+            "job_id": self.id,
+            "org_id": self.org_id,
+            "query": self.query,
+            "status": self.status,
+            "total": len(self.scenarios),
+            "profile": self.profile,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "results": self.results,
+        }
+
+    def save(self):
+        try:
+            get_state().set(f"batch:{self.id}", self.to_record(), ttl=BATCH_JOB_TTL)
+        except Exception as e:
+            print(f"Batch job {self.id} not saved: {e}")
+
+    def summary(self):
+        return job_summary(self.to_record())
+
+
+# Jobs running on this worker (for cancellation)
+_running = {}
+_listening = False
+
+
+def job_summary(record):
+    results = record["results"]
+    return {
+        "job_id": record["job_id"],
+        "status": record["status"],
+        "total": record["total"],
+        "completed": len(results),
+        "failed": sum(1 for r in results if r["status"] == "error"),
+        "profile": record["profile"],
+        "created_at": record["created_at"],
+        "finished_at": record["finished_at"],
+    }
+
+
+def _listen(loop):
+    """Cancels local jobs when any worker receives DELETE /api/batch/{id}."""
+    global _listening
+    if _listening:
+        return
+    _listening = True
+
+    def on_cancel(job_id):
+        job = _running.get(job_id)
+        if job and job.task:
+            loop.call_soon_threadsafe(job.task.cancel)
+
+    try:
+        get_state().subscribe(CANCEL_CHANNEL, on_cancel)
+    except Exception as e:
+        print(f"Batch cancellation only works on the job's own worker: {e}")
+
+
+async def _batch_slot():
+    """One of BATCH_GLOBAL_LIMIT deployment-wide batch slots (None if shared state is unavailable)."""
+    while True:
+        try:
+            lease = get_state().acquire_lease("batch", BATCH_GLOBAL_LIMIT, admission.LEASE_TTL)
+        except Exception as e:
+            print(f"Batch slots unavailable, not limiting: {e}")
+            return None
+        if lease:
+            return lease
+        await asyncio.sleep(LEASE_POLL_SECONDS)
+
+
+async def _renew_batch_slot(lease):
+    """Keeps a batch slot alive while its debate runs (cancelled before release_lease)."""
+    while True:
+        await asyncio.sleep(admission.LEASE_TTL / 3)
+        try:
+            if not await asyncio.to_thread(get_state().renew_lease, lease, admission.LEASE_TTL):
+                print("Batch slot lease expired before renewal")
+        except Exception as e:
+            print(f"Batch slot lease renewal failed: {e}")
+
+
+async def _run_scenario(job, index):
+    name, query, company_info = job.scenario_input(index)
+    result = {"index": index, "name": name, "company_info": company_info, "status": "ok",
+              "decision": None, "vote_counts": {}, "votes": [], "report": None, "error": None}
+    started = time.perf_counter()
+    # Transcript rows in the shape report_service expects (like messages in the DB)
+    rows = [{"role": "user", "content": query}]
+    try:
+        slot = await _batch_slot()
+        heartbeat = asyncio.get_running_loop().create_task(_renew_batch_slot(slot)) if slot else None
+        try:
+            ticket = admission.admission_controller.enqueue(f"batch:{job.org_id}", weight=BATCH_ADMISSION_WEIGHT)
+            try:
+                async for _ in ticket.wait():
+                    pass
+                async for event in simulate_debate_streaming(
+                    query, [], company_info, language=job.language, profile=job.profile,
+                    client_pacing=True, org_id=job.org_id, shared_research=job.research, save_memory=False,
+                ):
+                    if event.get("type") == "message" and event.get("is_agent"):
+                        rows.append({"role": "assistant", "content": event["content"], "metadata": {"agent_name": event["role"]}})
+                    elif event.get("type") == "vote_results":
+                        result["votes"] = event["votes"]
+                        rows.append({"role": "vote_results", "content": json.dumps(event["votes"], ensure_ascii=False)})
+            finally:
+                ticket.release()
+        finally:
+            if heartbeat:
+                heartbeat.cancel()
+            if slot:
+                get_state().release_lease(slot)
+
+        if not result["votes"]:
+            raise RuntimeError("debate ended without a vote")
+        result["decision"], result["vote_counts"] = tally_votes(result["votes"])
+        if job.include_report:
+            reporter = get_debaters({}, job.language)[1]
+            transcript = [as_prompt_turn(r) for r in rows]
+            result["report"] = (await report_service.get_report(transcript, job.language, reporter))[0]
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)[:500]
+    result["duration_seconds"] = round(time.perf_counter() - started, 2)
+    return result
+
+
+async def _run_job(job):
+    job.status = "running"
+    job.save()
+    pending = iter(range(len(job.scenarios)))
+
+    async def worker():
+        # Scenarios are pulled one at a time, so a job never holds more than BATCH_WORKERS debates
+        for index in pending:
+            job.results.append(await _run_scenario(job, index))
+            job.save()
+
+    try:
+        await asyncio.gather(*[worker() for _ in range(min(BATCH_WORKERS, len(job.scenarios)))])
+        job.status = "done"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+    except Exception as e:
+        print(f"Batch job {job.id} failed: {e}")
+        job.status = "error"
+    finally:
+        job.finished_at = time.time()
+        job.save()
+        _running.pop(job.id, None)
+        try:
+            get_state().incr(f"batch_active:{job.org_id}", -1)
+        except Exception as e:
+            print(f"Batch active counter not updated: {e}")
+
+
+def create_job(org_id, query, base_company_info, scenarios, profile="standard", language="tr", include_report=False):
+    """Registers a job and starts it in the background on this worker (call from the event loop)."""
+    if not scenarios:
+        raise BatchLimitError("No scenarios given")
+    if len(scenarios) > BATCH_MAX_SCENARIOS:
+        raise BatchLimitError(f"At most {BATCH_MAX_SCENARIOS} scenarios per job")
+    state = get_state()
+    # Running jobs of the org on all workers (the counter expires if a worker dies mid-job)
+    if state.incr(f"batch_active:{org_id}", 1, ttl=BATCH_JOB_TTL) > BATCH_MAX_ACTIVE_PER_ORG:
+        state.incr(f"batch_active:{org_id}", -1)
+        raise BatchLimitError(f"At most {BATCH_MAX_ACTIVE_PER_ORG} batch jobs can run at once")
+
+    loop = asyncio.get_running_loop()
+    _listen(loop)
+    job = BatchJob(org_id, query, base_company_info, scenarios, profile, language, include_report)
+    job.save()
+    _running[job.id] = job
+    job.task = loop.create_task(_run_job(job))
+    return job
+
+
+def get_job(job_id, org_id):
+    """The organization's job record (readable from any worker), or None."""
+    record = get_state().get(f"batch:{job_id}")
+    return record if record and record["org_id"] == org_id else None
+
+
+def cancel_job(job_id):
+    """Stops the job on whichever worker runs it; finished results are kept."""
+    job = _running.get(job_id)
+    if job and job.task:
+        job.task.cancel()
+    else:
+        get_state().publish(CANCEL_CHANNEL, job_id)
+
+
+def results_page(record, since=0):
+    """Job summary plus the results completed after the first `since` ones."""
+    return {**job_summary(record), "results": record["results"][since:], "next": len(record["results"])}
+
+
+def export_json(record):
+    return json.dumps({**job_summary(record), "query": record["query"], "results": record["results"]}, ensure_ascii=False, indent=2)
+
+
+def export_csv(record):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction="ignore")
+    writer.writeheader()
+    for result in sorted(record["results"], key=lambda r: r["index"]):
+        row = dict(result)
+        for field in ("vote_counts", "votes", "company_info"):
+            row[field] = json.dumps(row.get(field), ensure_ascii=False)
+        writer.writerow(row)
+    return buffer.getvalue()
+
+
+def get_stats():
+    jobs = list(_running.values())
+    return {
+        "running_here": len(jobs),
+        "scenarios_done_here": sum(len(j.results) for j in jobs),
+        "global_limit": BATCH_GLOBAL_LIMIT,
+        "workers_per_job": BATCH_WORKERS,
+    }
@@ -0,0 +1,181 @@
+"""
+Record/replay cassettes for LLM provider calls.
+
+Every provider call goes through AIModel.generate_response, so that is where the
+cassette hooks in. Configure it with environment variables:
+
+    LLM_CASSETTE_MODE=record|replay   (unset = off, real calls only)
+    LLM_CASSETTE_PATH=cassettes/debate.jsonl.gz
+    LLM_CASSETTE_LATENCY_SCALE=1.0    (0 = instant, 0.5 = twice as fast)
+    LLM_CASSETTE_STRICT=1             (replay: fail on unknown prompts instead of
+                                       falling back to the next recording of that model)
+
+A cassette is a JSON-lines file (gzip if the path ends with .gz). Each line is one
+call: provider, model, a hash of the prompt, the response split into timed chunks
+and the token usage reported by the provider. Prompts themselves are not stored,
+only a short preview for debugging, so cassettes stay small.
+"""
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import defaultdict, deque
+
+# Dates change every day, so they are removed before hashing a prompt.
+# Otherwise a cassette recorded yesterday would never match today's prompts.
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+
+def prompt_key(provider, model_name, messages):
+    """Stable hash of a provider call (provider, model, normalised messages)."""
+    normalised = [
+        {"role": m.get("role"), "content": _DATE_RE.sub("<DATE>", str(m.get("content", "")))}
+        for m in messages
+    ]
+    payload = json.dumps([provider, model_name, normalised], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+def _open(path, mode):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class CassetteMiss(Exception):
+    """Raised in strict replay mode when a call has no recording."""
+
+
+class Cassette:
+    def __init__(self, path, mode, latency_scale=1.0, strict=False):
+        self.path = path
+        self.mode = mode
+        self.latency_scale = latency_scale
+        self.strict = strict
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "misses": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency": 0.0}
+
+        # Replay indexes: exact prompt matches first, then recorded order per model
+        self._by_key = defaultdict(deque)
+        self._by_model = defaultdict(deque)
+        if mode == "replay":
+            self._load()
+        elif mode == "record":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Start a fresh cassette; appending to an old one would mix runs
+            with _open(path, "w"):
+                pass
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with _open(self.path, "r") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                entry = json.loads(line)
+                self._by_key[entry["key"]].append(entry)
+                self._by_model[(entry["provider"], entry["model"])].append(entry)
+
+    # --- RECORD ---
+
+    def record(self, provider, model_name, messages, chunks, usage=None):
+        """
+        Appends one call to the cassette.
+        chunks: list of (seconds_since_request_start, text) pairs. Non-streamed calls
+        pass a single chunk holding the whole response.
+        """
+        last_content = str(messages[-1].get("content", "")) if messages else ""
+        entry = {
+            "key": prompt_key(provider, model_name, messages),
+            "provider": provider,
+            "model": model_name,
+            "preview": last_content[:120],
+            "chunks": [[round(t, 4), text] for t, text in chunks],
+            "usage": usage or {},
+        }
+        line = json.dumps(entry, ensure_ascii=False)
+        with self._lock:
+            with _open(self.path, "a") as f:
+                f.write(line + "\n")
+            self._count(entry)
+
+    # --- REPLAY ---
+
+    def _take(self, provider, model_name, messages):
+        key = prompt_key(provider, model_name, messages)
+        with self._lock:
+            entry = None
+            if self._by_key[key]:
+                entry = self._by_key[key].popleft()
+                self._by_model[(provider, model_name)].remove(entry)
+            elif not self.strict and self._by_model[(provider, model_name)]:
+                # Prompt changed (code change, random turn order...) -> serve the
+                # next recording of the same model so the run still completes
+                self._stats["misses"] += 1
+                entry = self._by_model[(provider, model_name)].popleft()
+                self._by_key[entry["key"]].remove(entry)
+            if entry is None:
+                raise CassetteMiss(f"No recording for {provider}/{model_name} (key {key})")
+            self._count(entry)
+            return entry
+
+    def iter_chunks(self, provider, model_name, messages):
+        """Yields recorded chunks, sleeping the original (scaled) gap before each one."""
+        entry = self._take(provider, model_name, messages)
+        elapsed = 0.0
+        for offset, text in entry["chunks"]:
+            delay = (offset - elapsed) * self.latency_scale
+            if delay > 0:
+                time.sleep(delay)
+            elapsed = offset
+            yield text
+
+    def replay(self, provider, model_name, messages):
+        """Returns the full recorded response for a non-streamed call."""
+        return "".join(self.iter_chunks(provider, model_name, messages))
+
+    # --- STATS ---
+
+    def _count(self, entry):
+        usage = entry.get("usage") or {}
+        self._stats["calls"] += 1
+        self._stats["prompt_tokens"] += usage.get("prompt_tokens", 0) or 0
+        self._stats["completion_tokens"] += usage.get("completion_tokens", 0) or 0
+        if entry["chunks"]:
+            self._stats["latency"] += entry["chunks"][-1][0]
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["mode"] = self.mode
+        stats["path"] = self.path
+        stats["latency"] = round(stats["latency"], 3)
+        return stats
+
+
+_cassette = None
+_cassette_lock = threading.Lock()
+
+
+def get_cassette():
+    """Returns the active cassette, or None when LLM_CASSETTE_MODE is not set."""
+    global _cassette
+    mode = os.getenv("LLM_CASSETTE_MODE", "").strip().lower()
+    if mode not in ("record", "replay"):
+        return None
+    with _cassette_lock:
+        if _cassette is None or _cassette.mode != mode:
+            _cassette = Cassette(
+                path=os.getenv("LLM_CASSETTE_PATH", "cassettes/debate.jsonl.gz"),
+                mode=mode,
+                latency_scale=float(os.getenv("LLM_CASSETTE_LATENCY_SCALE", "1.0")),
+                strict=os.getenv("LLM_CASSETTE_STRICT", "") == "1",
+            )
+        return _cassette
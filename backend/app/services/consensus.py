@@ -0,0 +1,138 @@
+"""
+Early termination of classic debates once the board agrees.
+
+The serial debate used to run until max_turns even when every member already
+agreed. After each turn the detector looks at the last `consensus_window` turns
+(profile settings, see debate_profiles.py) and moves to the vote when all hold:
+
+- no turn argues against what was said (explicit disagree markers),
+- the turns lean the same way (support / oppose markers, or explicit agreement),
+- their mean [CONFIDENCE:X%] is at least consensus_min_confidence,
+- the turn summaries (all_arguments_so_far) are close in meaning: mean pairwise
+  embedding similarity of at least consensus_similarity (skipped if embedding
+  is unavailable).
+
+Every early stop is logged with the thresholds and the turns it saved.
+"""
+import itertools
+from collections import Counter
+
+try:
+    from backend.app.services.contradiction_filter import stance
+    from backend.app.services.embeddings import get_engine as get_embedding_engine
+except ImportError:
+    from app.services.contradiction_filter import stance
+    from app.services.embeddings import get_engine as get_embedding_engine
+
+AGREE_MARKERS = (
+    "katılıyorum", "hemfikirim", "aynı fikirdeyim", "haklı", "yerinde bir", "destekliyorum",
+    "i agree", "agree with", "good point", "exactly", "i second", "i also support", "fully support",
+)
+DISAGREE_MARKERS = (
+    "katılmıyorum", "aynı fikirde değilim", "hemfikir değilim", "itiraz", "yanılıyor", "hatalı",
+    "i disagree", "disagree", "i don't agree", "i do not agree", "that ignores", "i'm not convinced",
+    "not convinced", "i object",
+)
+
+_stats = Counter()
+
+
+def _count(text, markers):
+    lowered = text.lower()
+    return sum(lowered.count(m) for m in markers)
+
+
+def _cosine(u, v):
+    dot = sum(a * b for a, b in zip(u, v))
+    norm = (sum(a * a for a in u) ** 0.5) * (sum(b * b for b in v) ** 0.5)
+    return dot / norm if norm else 0.0
+
+
+class ConsensusDetector:
+    """Per-debate state; observe() after every debater turn."""
+
+    def __init__(self, profile):
+        self.window = max(2, profile["consensus_window"])
+        self.min_confidence = profile["consensus_min_confidence"]
+        self.min_similarity = profile["consensus_similarity"]
+        self.turns = []
+        _stats["debates"] += 1
+
+    def thresholds(self):
+        return {"window": self.window, "min_confidence": self.min_confidence, "min_similarity": self.min_similarity}
+
+    async def observe(self, agent, text, confidence, summary):
+        """Records one turn. Returns the signals over the current window ("consensus": True = go to the vote)."""
+        turn = {
+            "agent": agent,
+            "stance": stance(text),
+            "agree": _count(text, AGREE_MARKERS),
+            "disagree": _count(text, DISAGREE_MARKERS),
+            "confidence": confidence,
+            "vector": None,
+        }
+        try:
+            turn["vector"] = (await get_embedding_engine().aembed([summary]))[0]
+        except Exception as e:
+            print(f"Consensus detector without summary similarity: {e}")
+        self.turns.append(turn)
+        return self.signals()
+
+    def signals(self):
+        window = self.turns[-self.window:]
+        signals = {"turns": len(self.turns), "consensus": False}
+        if len(window) < self.window:
+            return signals
+
+        stances = {t["stance"] for t in window if t["stance"]}
+        agreeing_turns = sum(1 for t in window if t["agree"] > t["disagree"])
+        vectors = [t["vector"] for t in window if t["vector"] is not None]
+        pairs = list(itertools.combinations(vectors, 2))
+        similarity = sum(_cosine(u, v) for u, v in pairs) / len(pairs) if len(vectors) == len(window) else None
+
+        signals.update({
+            "speakers": len({t["agent"] for t in window}),
+            "disagreements": sum(1 for t in window if t["disagree"] > t["agree"]),
+            "stances": sorted(stances),
+            "agreeing_turns": agreeing_turns,
+            "mean_confidence": round(sum(t["confidence"] for t in window) / len(window), 1),
+            "summary_similarity": round(similarity, 3) if similarity is not None else None,
+        })
+        signals["consensus"] = (
+            signals["speakers"] > 1
+            and signals["disagreements"] == 0
+            and len(stances) <= 1
+            and (bool(stances) or agreeing_turns >= len(window) - 1)
+            and signals["mean_confidence"] >= self.min_confidence
+            and (similarity is None or similarity >= self.min_similarity)
+        )
+        return signals
+
+    def record_stop(self, turn, max_turns, saved, signals):
+        """Logs an early stop that skipped `saved` turns (see turns_left)."""
+        _stats["early_stops"] += 1
+        _stats["turns_saved"] += saved
+        print(f"Consensus after turn {turn + 1}/{max_turns}, {saved} turns saved "
+              f"(thresholds {self.thresholds()}, signals {signals})")
+
+
+def turns_left(turn, max_turns, speak_counts, max_speaks, vote_after):
+    """
+    Turns the classic loop would still have run after `turn` without the early
+    stop. It ends at max_turns, when every member has used its max_speaks, or
+    once every member has spoken and at least `vote_after` turns (the profile's
+    vote_after_turns) are done. Members that have not spoken yet need one turn
+    each. The speaker order depends on the replies, so this is a lower bound and
+    never overstates the saving.
+    """
+    done = turn + 1
+    silent = sum(1 for count in speak_counts.values() if count < 1)
+    speaks_left = sum(max(0, max_speaks - count) for count in speak_counts.values())
+    all_spoke_at = max(vote_after, done + silent)
+    return max(0, min(max_turns - done, speaks_left, all_spoke_at - done))
+
+
+def get_stats():
+    stats = dict(_stats)
+    stats["early_stop_rate"] = round(_stats["early_stops"] / _stats["debates"], 3) if _stats["debates"] else None
+    return stats
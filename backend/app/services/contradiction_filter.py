@@ -0,0 +1,178 @@
+"""
+Local pre-filter for the LLM contradiction check.
+
+Every repeat turn of a debater used to send a contradiction prompt to the
+moderator model, which almost always answered "YOK". The LLM check now only
+runs when this filter sees a likely reversal between the new statement and the
+member's last statements:
+
+- stance flip: the statements lean opposite ways (support / oppose markers,
+  Turkish + English) while still being about the same thing (embedding
+  similarity >= TOPIC_SIMILARITY),
+- negation mismatch: a new sentence is nearly the same as an earlier one
+  (>= PAIR_SIMILARITY) but exactly one of them is negated,
+- opposite claims: similar sentences (>= ANTONYM_SIMILARITY) use opposite
+  words (yeterli / yetersiz, high / low, ...).
+
+Sentences are embedded with the shared local engine (embeddings.py, cached).
+If embedding fails the filter lets the LLM check run, as before. Precision and
+recall against labelled turns: scripts/eval_contradiction_filter.py.
+
+Off by default (CONTRADICTION_PREFILTER=1 turns it on): the thresholds were only
+fitted on the synthetic seed set, and a miss silently skips the LLM check. The
+default embedding model (all-MiniLM-L6-v2) is English-only, while most debates
+are in Turkish. Turn it on once the eval script reports acceptable recall on
+exported past turns with the provisioned model.
+"""
+import math
+import os
+import re
+from collections import Counter
+
+try:
+    from backend.app.services.embeddings import get_engine as get_embedding_engine
+except ImportError:
+    from app.services.embeddings import get_engine as get_embedding_engine
+
+PREFILTER_ENABLED = os.getenv("CONTRADICTION_PREFILTER", "0") == "1"
+TOPIC_SIMILARITY = float(os.getenv("CONTRADICTION_TOPIC_SIMILARITY", "0.45"))
+PAIR_SIMILARITY = float(os.getenv("CONTRADICTION_PAIR_SIMILARITY", "0.75"))
+ANTONYM_SIMILARITY = float(os.getenv("CONTRADICTION_ANTONYM_SIMILARITY", "0.6"))
+MIN_SENTENCE_CHARS = 12
+
+# Substrings of the lower-cased text; Turkish suffixes make prefix matching the cheap option
+SUPPORT_MARKERS = (
+    "destekl", "öner", "mantıklı", "doğru karar", "kesinlikle yap", "yapmalıyız", "atılmalı", "fırsat",
+    "kabul", "onayl", "yatırım yapmalı", "support", "recommend", "should do", "we should", "go ahead", "approve",
+    "worth it", "agree",
+)
+# Opposing phrases that contain a support marker ("desteklemiyorum" contains "destekl")
+NEGATED_SUPPORT = (
+    "desteklemiyorum", "önermiyorum", "onaylamıyorum", "kabul edilemez", "mantıklı değil", "don't recommend",
+    "do not recommend", "don't support", "do not support", "don't agree", "disagree", "should not do",
+)
+OPPOSE_MARKERS = NEGATED_SUPPORT + (
+    "karşıyım", "karşı çık", "yapmamalı", "yapmayalım", "vazgeç", "erteleme", "ertelen", "mantıksız",
+    "hata olur", "reddet", "oppose", "against", "should not", "shouldn't", "reject", "postpone", "too risky",
+    "mistake",
+)
+NEGATION_WORDS = {"değil", "yok", "asla", "hiç", "hiçbir", "not", "no", "never", "none", "nothing", "cannot", "can't",
+                  "won't", "don't", "doesn't", "isn't", "aren't", "without"}
+# Turkish negative verb forms: yap-ma-malı, gel-mi-yor, ol-ma-yacak, yap-ma-z, yap-ma-dı ...
+NEGATIVE_VERB = re.compile(r"\w+(mamal|memel|mıyor|miyor|muyor|müyor|mayac|meyec|mayız|meyiz|madı|medi|maz\b|mez\b)\w*")
+ANTONYMS = [
+    ("yüksek", "düşük"), ("bol", "kıt"), ("yeterli", "yetersiz"), ("artır", "azalt"), ("artış", "düşüş"),
+    ("kâr", "zarar"), ("güvenli", "riskli"), ("ucuz", "pahalı"), ("hızlı", "yavaş"), ("büyü", "küçül"),
+    ("high", "low"), ("increase", "decrease"), ("enough", "insufficient"), ("profit", "loss"), ("safe", "risky"),
+    ("cheap", "expensive"), ("fast", "slow"), ("grow", "shrink"), ("more", "less"),
+]
+
+_stats = Counter()
+
+
+def split_sentences(text):
+    parts = re.split(r"(?<=[.!?])\s+|\n+", text or "")
+    return [p.strip() for p in parts if len(p.strip()) >= MIN_SENTENCE_CHARS]
+
+
+def _words(text):
+    return re.findall(r"[\w']+", text.lower())
+
+
+def is_negated(sentence):
+    words = _words(sentence)
+    return (sum(1 for w in words if w in NEGATION_WORDS) + sum(1 for w in words if NEGATIVE_VERB.fullmatch(w))) % 2 == 1
+
+
+def stance(text):
+    """> 0 leans towards doing it, < 0 against, 0 neutral / mixed."""
+    lowered = f" {text.lower()} "
+    pro = sum(lowered.count(m) for m in SUPPORT_MARKERS)
+    con = sum(lowered.count(m) for m in OPPOSE_MARKERS)
+    pro -= sum(lowered.count(m) for m in NEGATED_SUPPORT)
+    return (pro > con) - (pro < con)
+
+
+def _has(words, prefix):
+    return any(w.startswith(prefix) for w in words)
+
+
+def opposite_words(a, b):
+    wa, wb = _words(a), _words(b)
+    for x, y in ANTONYMS:
+        if (_has(wa, x) and _has(wb, y) and not _has(wa, y)) or (_has(wa, y) and _has(wb, x) and not _has(wa, x)):
+            return f"{x}/{y}"
+    return None
+
+
+def _cosine(u, v):
+    dot = sum(a * b for a, b in zip(u, v))
+    norm = math.sqrt(sum(a * a for a in u)) * math.sqrt(sum(b * b for b in v))
+    return dot / norm if norm else 0.0
+
+
+def _mean(vectors):
+    return [sum(column) / len(vectors) for column in zip(*vectors)]
+
+
+def sentences(previous, statement):
+    """(new statement's sentences, earlier statements' sentences) - embed them in this order for assess()."""
+    return split_sentences(statement) or [statement], [s for p in previous for s in (split_sentences(p) or [p])]
+
+
+def assess(previous, statement, vectors):
+    """
+    previous: the member's earlier statements, statement: the new one, vectors:
+    embeddings of sentences(previous, statement). Returns {"flag": bool, "reason": ..., ...}.
+    """
+    new_sentences, prev_sentences = sentences(previous, statement)
+    new_vectors, prev_vectors = vectors[:len(new_sentences)], vectors[len(new_sentences):]
+
+    topic_similarity = _cosine(_mean(new_vectors), _mean(prev_vectors)) if prev_vectors else 0.0
+    result = {"flag": False, "reason": None, "topic_similarity": round(topic_similarity, 3)}
+
+    new_stance = stance(statement)
+    if new_stance and topic_similarity >= TOPIC_SIMILARITY and any(stance(p) == -new_stance for p in previous):
+        return {**result, "flag": True, "reason": "stance_flip"}
+
+    best = 0.0
+    for sentence, u in zip(new_sentences, new_vectors):
+        for earlier, v in zip(prev_sentences, prev_vectors):
+            similarity = _cosine(u, v)
+            best = max(best, similarity)
+            if similarity >= PAIR_SIMILARITY and is_negated(sentence) != is_negated(earlier):
+                return {**result, "flag": True, "reason": "negation", "pair_similarity": round(similarity, 3)}
+            if similarity >= ANTONYM_SIMILARITY and opposite_words(sentence, earlier):
+                return {**result, "flag": True, "reason": f"antonym:{opposite_words(sentence, earlier)}",
+                        "pair_similarity": round(similarity, 3)}
+    return {**result, "pair_similarity": round(best, 3)}
+
+
+async def likely_reversal(previous, statement):
+    """True when the LLM contradiction check should run for this turn."""
+    if not PREFILTER_ENABLED:
+        return True
+    _stats["checked"] += 1
+    try:
+        new_sentences, prev_sentences = sentences(previous, statement)
+        vectors = await get_embedding_engine().aembed(new_sentences + prev_sentences)
+        result = assess(previous, statement, vectors)
+    except Exception as e:
+        print(f"Contradiction pre-filter unavailable, asking the LLM: {e}")
+        _stats["errors"] += 1
+        _stats["llm_checks"] += 1
+        return True
+    if result["flag"]:
+        _stats["flagged"] += 1
+        _stats["llm_checks"] += 1
+        _stats[f"reason:{result['reason'].split(':')[0]}"] += 1
+    else:
+        _stats["llm_calls_saved"] += 1
+    return result["flag"]
+
+
+def get_stats():
+    stats = dict(_stats)
+    stats["enabled"] = PREFILTER_ENABLED
+    stats["flag_rate"] = round(_stats["flagged"] / _stats["checked"], 3) if _stats["checked"] else None
+    return stats
@@ -0,0 +1,141 @@
+"""
+Server-side conversation context: a rolling summary plus the last N raw turns.
+
+The client used to resend the whole history with every request. Now the server
+builds the prompt history itself from the conversation row and its messages:
+
+    conversations.summary       everything up to summary_upto, condensed
+    conversations.summary_upto  created_at of the newest message folded into it
+    messages after summary_upto the raw recent turns
+
+After each debate the turns older than the last RECENT_TURNS are folded into the
+summary with one short LLM call (in the background, off the stream). Only the new
+turns are sent to the summariser, so old history is never re-tokenised. Run
+migrations/add_conversation_summary.sql first; without the columns every request
+falls back to the raw recent turns.
+"""
+import json
+import os
+
+try:
+    from backend.app.services.auth_service import get_db_client
+    from backend.app.services.shared_state import get_state
+except ImportError:
+    from app.services.auth_service import get_db_client
+    from app.services.shared_state import get_state
+
+RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", "6"))
+SUMMARY_MAX_CHARS = int(os.getenv("CONTEXT_SUMMARY_MAX_CHARS", "1500"))
+# Fold only once this many turns are waiting, so short follow-ups don't trigger a call each time
+FOLD_BATCH = int(os.getenv("CONTEXT_FOLD_BATCH", "4"))
+MAX_UNSUMMARIZED = 200  # safety cap on the messages read per request
+REFRESH_LOCK_TTL = 120
+
+CONTEXT_ROLES = ("user", "assistant", "vote_results")
+
+
+def as_prompt_turn(message):
+    """DB message row -> prompt history entry (speaker name kept in the content)."""
+    role, content = message["role"], message["content"] or ""
+    if role == "vote_results":
+        try:
+            decisions = [v.get("decision") for v in json.loads(content)]
+            tally = {d: decisions.count(d) for d in dict.fromkeys(decisions)}
+            content = "Oylama sonucu: " + ", ".join(f"{d} ({n})" for d, n in tally.items())
+        except Exception:
+            content = "Oylama sonucu kaydedildi."
+        return {"role": "assistant", "content": content}
+    agent_name = (message.get("metadata") or {}).get("agent_name")
+    if role == "assistant" and agent_name:
+        content = f"{agent_name}: {content}"
+    return {"role": role, "content": content}
+
+
+def _load_rows(conversation_id):
+    client = get_db_client()
+    summary, summary_upto = "", None
+    try:
+        conv = client.table("conversations").select("summary, summary_upto").eq("id", conversation_id).limit(1).execute()
+        if conv.data:
+            summary = conv.data[0].get("summary") or ""
+            summary_upto = conv.data[0].get("summary_upto")
+    except Exception as e:
+        print(f"Conversation summary load failed: {e}")
+
+    # Newest first, then reversed, so a missing summary still only reads a bounded tail
+    query = client.table("messages").select("role, content, metadata, created_at") \
+        .eq("conversation_id", conversation_id).in_("role", list(CONTEXT_ROLES))
+    if summary_upto:
+        query = query.gt("created_at", summary_upto)
+    res = query.order("created_at", desc=True).limit(MAX_UNSUMMARIZED).execute()
+    return summary, list(reversed(res.data or []))
+
+
+def load_context(conversation_id, recent_turns=RECENT_TURNS):
+    """
+    Prompt history for a new message: [summary as a system message] + last
+    `recent_turns` turns. Returns [] for unknown conversations or on DB errors.
+    """
+    if not conversation_id:
+        return []
+    try:
+        summary, rows = _load_rows(conversation_id)
+    except Exception as e:
+        print(f"Conversation context load failed: {e}")
+        return []
+    history = []
+    if summary:
+        history.append({"role": "system", "content": f"ÖNCEKİ KONUŞMA ÖZETİ:\n{summary}"})
+    history.extend(as_prompt_turn(m) for m in rows[-recent_turns:])
+    return history
+
+
+def refresh_summary(conversation_id, summarizer, recent_turns=RECENT_TURNS):
+    """
+    Folds turns older than the last `recent_turns` into the stored summary.
+    `summarizer` is an AIModel; one call per fold, no-op when little is waiting.
+    """
+    if not conversation_id:
+        return
+    # One refresh per conversation at a time across workers, or both would fold the same turns
+    lock = f"summary_refresh:{conversation_id}"
+    try:
+        if not get_state().set(lock, True, ttl=REFRESH_LOCK_TTL, nx=True):
+            return
+    except Exception as e:
+        print(f"Summary refresh lock unavailable: {e}")
+    try:
+        summary, rows = _load_rows(conversation_id)
+        to_fold = rows[:-recent_turns] if recent_turns else rows
+        if len(to_fold) < FOLD_BATCH:
+            return
+
+        new_turns = "\n".join(f"- {t['content'][:400]}" for t in map(as_prompt_turn, to_fold))
+        prompt = f"""
+        GÖREV: Bir yönetim kurulu sohbetinin özetini güncelle.
+
+        MEVCUT ÖZET:
+        {summary or "(yok)"}
+
+        YENİ KONUŞMALAR:
+        {new_turns}
+
+        KURALLAR:
+        - Konuları, alınan kararları, oyları ve açık kalan soruları koru.
+        - Kim neyi savundu, kısaca belirt.
+        - En fazla {SUMMARY_MAX_CHARS // 6} kelime. Sadece özeti yaz.
+        """
+        new_summary = summarizer.generate_response([{"role": "user", "content": prompt}])
+        if not new_summary or new_summary.startswith("Error"):
+            return
+        get_db_client().table("conversations").update({
+            "summary": new_summary.strip()[:SUMMARY_MAX_CHARS],
+            "summary_upto": to_fold[-1]["created_at"],
+        }).eq("id", conversation_id).execute()
+    except Exception as e:
+        print(f"Conversation summary refresh failed: {e}")
+    finally:
+        try:
+            get_state().delete(lock)
+        except Exception:
+            pass
@@ -0,0 +1,171 @@
+"""
+Small, polite multi-page crawl of a company website.
+
+The landing page alone is often just a hero banner, so after it is fetched the
+crawler picks a few high-value pages linked from it (about / products / pricing)
+and fetches them concurrently:
+
+- at most CRAWL_MAX_PAGES pages, same site only, URLs de-duplicated,
+- at most CRAWL_DOMAIN_CONCURRENCY requests in flight per domain,
+- robots.txt is honoured for the extra pages and cached per domain,
+- a total byte budget and a time budget; pages that are not done in time are dropped.
+"""
+import asyncio
+import os
+import time
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode
+from urllib.robotparser import RobotFileParser
+
+try:
+    from backend.app.services.web_fetch import fetch_page_text, get_http_client, normalize_url, USER_AGENT
+except ImportError:
+    from app.services.web_fetch import fetch_page_text, get_http_client, normalize_url, USER_AGENT
+
+MAX_PAGES = int(os.getenv("CRAWL_MAX_PAGES", "4"))  # landing page included
+DOMAIN_CONCURRENCY = int(os.getenv("CRAWL_DOMAIN_CONCURRENCY", "3"))
+BYTE_BUDGET = int(os.getenv("CRAWL_BYTE_BUDGET", "3000000"))
+TIME_BUDGET = float(os.getenv("CRAWL_TIME_BUDGET", "10"))  # same as the old single-page timeout
+SUBPAGE_TIMEOUT = float(os.getenv("CRAWL_SUBPAGE_TIMEOUT", "4"))
+ROBOTS_TTL = 3600
+
+# URL / anchor keywords of pages worth reading (TR + EN), with a score
+PAGE_HINTS = {
+    "about": 3, "hakkimizda": 3, "hakkinda": 3, "who-we-are": 3, "kurumsal": 2, "company": 2,
+    "product": 3, "urun": 3, "ürün": 3, "menu": 1, "catalog": 2, "katalog": 2,
+    "service": 2, "hizmet": 2, "solution": 2, "cozum": 2,
+    "pricing": 3, "price": 2, "fiyat": 3, "plans": 2,
+}
+SKIP_EXTENSIONS = (".pdf", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".zip", ".mp4", ".doc", ".docx", ".xls", ".xlsx")
+
+_robots_cache = {}  # netloc -> (RobotFileParser or None, expires_at)
+_domain_semaphores = {}
+
+
+def canonical_url(url):
+    """Lower-cased host, no fragment, no tracking params, no trailing slash."""
+    parts = urlsplit(url)
+    query = urlencode([(k, v) for k, v in parse_qsl(parts.query) if not k.startswith("utm_")])
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, query, ""))
+
+
+def _same_site(a, b):
+    return urlsplit(a).netloc.lower().removeprefix("www.") == urlsplit(b).netloc.lower().removeprefix("www.")
+
+
+def _domain_semaphore(netloc):
+    if netloc not in _domain_semaphores:
+        _domain_semaphores[netloc] = asyncio.Semaphore(DOMAIN_CONCURRENCY)
+    return _domain_semaphores[netloc]
+
+
+def pick_candidate_pages(base_url, links, limit):
+    """Scores same-site links by URL/anchor keywords and returns the best `limit` URLs."""
+    base = canonical_url(base_url)
+    scored = {}
+    for href, text in links:
+        if href.startswith(("mailto:", "tel:", "javascript:", "#")):
+            continue
+        url = canonical_url(urljoin(base_url, href))
+        if url == base or not _same_site(url, base_url) or url.lower().endswith(SKIP_EXTENSIONS):
+            continue
+        haystack = (urlsplit(url).path + " " + text).lower()
+        score = sum(weight for hint, weight in PAGE_HINTS.items() if hint in haystack)
+        if score == 0:
+            continue
+        # Shallow pages first (/about beats /blog/2021/about-our-new-logo)
+        score -= urlsplit(url).path.count("/") * 0.5
+        scored[url] = max(score, scored.get(url, score))
+    return [url for url, _ in sorted(scored.items(), key=lambda kv: kv[1], reverse=True)[:limit]]
+
+
+async def _load_robots(base_url):
+    netloc = urlsplit(base_url).netloc.lower()
+    cached = _robots_cache.get(netloc)
+    if cached and cached[1] > time.monotonic():
+        return cached[0]
+
+    parser = None
+    robots_url = urlunsplit((urlsplit(base_url).scheme, netloc, "/robots.txt", "", ""))
+    try:
+        response = await get_http_client().get(robots_url, timeout=3.0)
+        if response.status_code == 200:
+            parser = RobotFileParser()
+            parser.parse(response.text[:100000].splitlines())
+    except Exception:
+        parser = None  # No robots.txt reachable -> allowed
+    _robots_cache[netloc] = (parser, time.monotonic() + ROBOTS_TTL)
+    return parser
+
+
+async def _fetch(url, max_bytes, timeout):
+    async with _domain_semaphore(urlsplit(url).netloc.lower()):
+        return await fetch_page_text(url, max_chars=2500, max_bytes=max_bytes, timeout=timeout)
+
+
+async def crawl_company_site(url, max_pages=MAX_PAGES, byte_budget=BYTE_BUDGET, time_budget=TIME_BUDGET):
+    """
+    Fetches the landing page plus up to max_pages-1 linked high-value pages.
+    Returns a list of page dicts (see web_fetch.fetch_page_text), landing page first.
+    Raises if the landing page itself cannot be read.
+    """
+    url = normalize_url(url)
+    deadline = time.monotonic() + time_budget
+
+    # robots.txt is fetched while the landing page downloads, so it costs no extra time
+    robots_task = asyncio.create_task(_load_robots(url))
+    try:
+        landing = await _fetch(url, max_bytes=min(byte_budget, 1500000), timeout=time_budget)
+    except Exception:
+        robots_task.cancel()
+        raise
+    pages = [landing]
+
+    remaining_time = min(deadline - time.monotonic(), SUBPAGE_TIMEOUT)
+    remaining_bytes = byte_budget - landing["bytes_read"]
+    if max_pages <= 1 or remaining_time <= 0.5 or remaining_bytes <= 0:
+        robots_task.cancel()
+        return pages
+
+    robots = await robots_task
+    seen = {canonical_url(url), canonical_url(landing["url"])}
+    candidates = []
+    for candidate in pick_candidate_pages(landing["url"], landing["links"], max_pages * 2):
+        if candidate in seen or (robots and not robots.can_fetch(USER_AGENT, candidate)):
+            continue
+        seen.add(candidate)
+        candidates.append(candidate)
+        if len(candidates) >= max_pages - 1:
+            break
+    if not candidates:
+        return pages
+
+    per_page_bytes = remaining_bytes // len(candidates)
+    tasks = [asyncio.create_task(_fetch(c, per_page_bytes, remaining_time)) for c in candidates]
+    done, pending = await asyncio.wait(tasks, timeout=remaining_time)
+    for task in pending:
+        task.cancel()
+
+    # Keep link order (= relevance order), skip failures and duplicates after redirects
+    for task in tasks:
+        if task in done and not task.exception():
+            page = task.result()
+            if canonical_url(page["url"]) not in {canonical_url(p["url"]) for p in pages} and page["text"]:
+                pages.append(page)
+    return pages
+
+
+def build_site_digest(pages, max_chars=4000):
+    """Merges crawled pages into one text block; the landing page gets the largest share."""
+    if not pages:
+        return ""
+    if len(pages) == 1:
+        return pages[0]["text"][:max_chars]
+
+    landing_share = max_chars // 2
+    sub_share = (max_chars - landing_share) // (len(pages) - 1)
+    parts = [pages[0]["text"][:landing_share]]
+    for page in pages[1:]:
+        path = urlsplit(page["url"]).path or "/"
+        parts.append(f"\n[{path}]\n{page['text'][:sub_share]}")
+    return "\n".join(parts)[:max_chars + 200]
@@ -0,0 +1,112 @@
+"""
+Debate execution profiles: the latency / cost / depth trade-off of one debate.
+
+    fast      parallel openings, one rebuttal, no side-calls, no artificial pauses
+    standard  the classic serial debate (ends early once the board agrees)
+    deep      longer serial debate, wider web search, stronger models
+
+A profile is a plain dict. ChatRequest.profile picks one; explicit request fields
+(debate_mode, client_pacing) override the profile's value. With client pacing the
+server never sleeps between turns: the pause is sent as "pace_ms" on the typing
+event and the client waits before rendering the next message.
+"""
+
+DEBATE_PROFILES = {
+    "fast": {
+        "debate_mode": "parallel",
+        "max_turns": 3,
+        "vote_after_turns": 3,         # classic mode: once everyone has spoken, vote after N turns
+        "max_speaks_per_agent": 1,
+        "max_rebuttal_pairs": 1,
+        "moderator_every": 0,          # moderator intervention every N turns (0 = never)
+        "contradiction_check": False,  # LLM contradiction check on repeat speakers
+        "argument_summaries": False,   # LLM one-line summary of every turn (else truncation)
+        "website_analysis": False,     # LLM summary of the crawled website (else raw excerpt)
+        "search_optimizer": False,     # LLM rewrite of the search query (else topic + industry)
+        "research_summary": False,     # LLM summary of search results (else raw results)
+        "search_max_results": 3,
+        "model_tier": "fast",
+        "turn_delay": 0.0,             # "suspense" pause before each turn (seconds)
+        "moderator_delay": 0.0,
+        "vote_delay": 0.0,
+        "client_pacing": False,        # send pauses as pace_ms hints instead of sleeping
+        "direct_moderator_note": False,  # moderator note after a direct (target_agent) answer
+        "early_stop": False,           # classic mode: vote as soon as the board agrees (consensus.py)
+        "consensus_window": 3,         # ...over the last N turns
+        "consensus_min_confidence": 70,  # ...with at least this mean [CONFIDENCE:X%]
+        "consensus_similarity": 0.5,   # ...and turn summaries this similar (embedding cosine)
+    },
+    "standard": {
+        "debate_mode": "classic",
+        "max_turns": 5,
+        "vote_after_turns": 5,
+        "max_speaks_per_agent": 2,
+        "max_rebuttal_pairs": 2,
+        "moderator_every": 3,
+        "contradiction_check": True,
+        "argument_summaries": True,
+        "website_analysis": True,
+        "search_optimizer": True,
+        "research_summary": True,
+        "search_max_results": 3,
+        "model_tier": "standard",
+        "turn_delay": 1.5,
+        "moderator_delay": 1.0,
+        "vote_delay": 1.0,
+        "client_pacing": False,
+        "direct_moderator_note": False,
+        "early_stop": True,
+        "consensus_window": 3,
+        "consensus_min_confidence": 70,
+        "consensus_similarity": 0.5,
+    },
+    "deep": {
+        "debate_mode": "classic",
+        "max_turns": 8,
+        "vote_after_turns": 8,
+        "max_speaks_per_agent": 3,
+        "max_rebuttal_pairs": 3,
+        "moderator_every": 3,
+        "contradiction_check": True,
+        "argument_summaries": True,
+        "website_analysis": True,
+        "search_optimizer": True,
+        "research_summary": True,
+        "search_max_results": 6,
+        "model_tier": "deep",
+        "turn_delay": 1.5,
+        "moderator_delay": 1.0,
+        "vote_delay": 1.0,
+        "client_pacing": False,
+        "direct_moderator_note": True,
+        "early_stop": True,
+        "consensus_window": 4,
+        "consensus_min_confidence": 75,
+        "consensus_similarity": 0.55,
+    },
+}
+
+DEFAULT_PROFILE = "standard"
+
+# Per-agent model overrides for each tier: agent name -> (provider, model_name)
+MODEL_TIERS = {
+    "fast": {
+        "Orion (Moderatör)": ("openai", "gpt-4o-mini"),
+        "Sterling": ("openai", "gpt-4o-mini"),
+    },
+    "standard": {},
+    "deep": {
+        "Maya": ("anthropic", "claude-3-5-haiku-20241022"),
+        "Sterling": ("openai", "gpt-5-mini"),
+    },
+}
+
+
+def get_profile(name=None, **overrides):
+    """Returns a copy of the named profile (unknown names fall back to standard) with overrides applied."""
+    profile = dict(DEBATE_PROFILES.get(name or DEFAULT_PROFILE, DEBATE_PROFILES[DEFAULT_PROFILE]))
+    profile["name"] = name if name in DEBATE_PROFILES else DEFAULT_PROFILE
+    for key, value in overrides.items():
+        if value is not None:
+            profile[key] = value
+    return profile
@@ -0,0 +1,51 @@
+"""
+Full-text search over an organization's past debates (migrations/add_debate_search.sql).
+
+Conversation titles and message contents carry a stored tsvector (Turkish and
+English stemming) with GIN indexes; the search_debates RPC ranks the matches
+of one organization and builds highlighted snippets for the requested page only.
+"""
+try:
+    from backend.app.services import repository
+except ImportError:
+    from app.services import repository
+
+MAX_PAGE_SIZE = 50
+MAX_QUERY_CHARS = 200
+
+
+async def search(org_id, query, page=1, page_size=20, language="tr"):
+    """One page of ranked matches. Fetches one extra row to tell whether more pages exist."""
+    query = " ".join((query or "").split())[:MAX_QUERY_CHARS]
+    page = max(1, int(page))
+    page_size = max(1, min(int(page_size), MAX_PAGE_SIZE))
+    if not query:
+        return {"query": query, "page": page, "page_size": page_size, "results": [], "has_more": False}
+
+    rows = await repository.rpc("search_debates", {
+        "p_org_id": org_id,
+        "p_query": query,
+        "p_limit": page_size + 1,
+        "p_offset": (page - 1) * page_size,
+        "p_language": language,
+    }) or []
+    return {
+        "query": query,
+        "page": page,
+        "page_size": page_size,
+        "results": [
+            {
+                "type": row["kind"],
+                "conversation_id": row["conversation_id"],
+                "conversation_title": row["conversation_title"],
+                "message_id": row["message_id"],
+                "role": row["role"],
+                "agent_name": row["agent_name"],
+                "created_at": row["created_at"],
+                "rank": round(row["rank"] or 0.0, 4),
+                "highlight": row["headline"],
+            }
+            for row in rows[:page_size]
+        ],
+        "has_more": len(rows) > page_size,
+    }
@@ -0,0 +1,124 @@
+"""
+Per-organization decision analytics (migrations/add_decision_analytics.sql).
+
+Outcomes used to live only in stringified vote_results messages, so "how often
+does a member dissent?" meant parsing every debate. Now each finished debate is
+added to aggregate tables once (record_debate_analytics RPC): votes per member
+(with the majority / dissent / abstain, average confidence), an agreement
+matrix of member pairs, and daily decision counts. GET /api/analytics reads
+them back with one RPC; its cost depends on the board size and the requested
+date range, not on how many debates the organization has had.
+"""
+from datetime import date, datetime, timedelta, timezone
+
+try:
+    from backend.app.services import repository
+except ImportError:
+    from app.services import repository
+
+MAX_DAYS = 730
+BUCKETS = ("day", "week", "month")
+
+
+def confidence_totals(confidences):
+    """{agent: [confidence, ...]} -> {agent: {"sum": x, "count": n}} (agents that never spoke are left out)."""
+    return {
+        agent: {"sum": float(sum(values)), "count": len(values)}
+        for agent, values in confidences.items() if values
+    }
+
+
+async def record_debate(org_id, votes, decision, confidences):
+    """Adds a finished debate to the organization's aggregates (failures are only logged)."""
+    if not org_id or not votes:
+        return
+    try:
+        await repository.rpc("record_debate_analytics", {
+            "p_org_id": org_id,
+            "p_votes": [{"agent": v.get("agent"), "decision": v.get("decision")} for v in votes],
+            "p_decision": decision,
+            "p_confidence": confidence_totals(confidences),
+        }, write=True)
+    except Exception as e:
+        print(f"Decision analytics not updated: {e}")
+
+
+def _rate(part, whole):
+    return round(part / whole, 3) if whole else None
+
+
+def _average(total, count):
+    return round(total / count, 1) if count else None
+
+
+def _bucket_start(day, bucket):
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    if bucket == "month":
+        return day.replace(day=1)
+    return day
+
+
+def timeline(daily_rows, bucket="day"):
+    """Daily aggregate rows -> one entry per day / week (Monday) / month."""
+    merged = {}
+    for row in daily_rows:
+        start = _bucket_start(date.fromisoformat(row["day"]), bucket)
+        entry = merged.setdefault(start, {"debates": 0, "unanimous": 0, "confidence_sum": 0.0, "confidence_count": 0, "decisions": {}})
+        for field in ("debates", "unanimous", "confidence_sum", "confidence_count"):
+            entry[field] += row[field]
+        for decision, count in (row.get("decisions") or {}).items():
+            entry["decisions"][decision] = entry["decisions"].get(decision, 0) + count
+    return [
+        {
+            "period": start.isoformat(),
+            "debates": e["debates"],
+            "unanimous": e["unanimous"],
+            "decisions": dict(sorted(e["decisions"].items(), key=lambda kv: kv[1], reverse=True)),
+            "avg_confidence": _average(e["confidence_sum"], e["confidence_count"]),
+        }
+        for start, e in sorted(merged.items())
+    ]
+
+
+def shape(raw, bucket="day"):
+    """get_decision_analytics RPC result -> API response."""
+    totals = raw.get("totals") or {}
+    personas = [
+        {
+            "agent": p["agent"],
+            "votes": p["votes"],
+            "with_majority": p["with_majority"],
+            "dissents": p["dissents"],
+            "abstentions": p["abstentions"],
+            "dissent_rate": _rate(p["dissents"], p["votes"]),
+            "avg_confidence": _average(p["confidence_sum"], p["confidence_count"]),
+        }
+        for p in raw.get("personas") or []
+    ]
+    # Symmetric {agent: {other: share of shared debates with the same vote}}
+    agreement = {}
+    for pair in raw.get("pairs") or []:
+        rate = _rate(pair["agreed"], pair["debates"])
+        agreement.setdefault(pair["agent_a"], {})[pair["agent_b"]] = rate
+        agreement.setdefault(pair["agent_b"], {})[pair["agent_a"]] = rate
+    return {
+        "totals": {
+            "debates": totals.get("debates", 0),
+            "unanimous": totals.get("unanimous", 0),
+            "unanimous_rate": _rate(totals.get("unanimous", 0), totals.get("debates", 0)),
+            "avg_confidence": _average(totals.get("confidence_sum", 0), totals.get("confidence_count", 0)),
+            "updated_at": totals.get("updated_at"),
+        },
+        "personas": personas,
+        "agreement": agreement,
+        "timeline": timeline(raw.get("daily") or [], bucket),
+    }
+
+
+async def get_analytics(org_id, days=90, bucket="day"):
+    """The organization's aggregates, with the timeline limited to the last `days` days."""
+    days = max(1, min(int(days), MAX_DAYS))
+    since = (datetime.now(timezone.utc).date() - timedelta(days=days - 1)).isoformat()
+    raw = await repository.rpc("get_decision_analytics", {"p_org_id": org_id, "p_since": since})
+    return {"days": days, "bucket": bucket, **shape(raw or {}, bucket)}
@@ -0,0 +1,215 @@
+"""
+Local embedding engine for vector memory.
+
+Chroma's implicit default embedding function downloaded its model on the first
+query of a fresh machine and embedded one document per call on the request path.
+Here the same model (all-MiniLM-L6-v2, ONNX, shipped with chromadb) is:
+
+- provisioned ahead of time into EMBEDDING_MODEL_DIR
+  (`python scripts/bench_embeddings.py --provision` in the build step),
+- loaded once per process (lifecycle warm-up) and shared,
+- fed in batches of EMBEDDING_BATCH_SIZE on one dedicated worker thread (every
+  embed / aembed / warm-up call runs there, whichever thread it comes from, so ONNX
+  sessions never run concurrently and the stats need no lock),
+- fronted by an in-memory LRU and an optional SQLite disk cache keyed by
+  sha256(model + text), so repeated topics are never re-encoded.
+"""
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+MODEL_DIR = os.getenv("EMBEDDING_MODEL_DIR", str(BACKEND_DIR / ".models"))
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", str(BACKEND_DIR / ".cache" / "embeddings.sqlite"))  # "" = no disk cache
+LRU_SIZE = int(os.getenv("EMBEDDING_LRU_SIZE", "4096"))
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+WORKER_PREFIX = "embedding-engine"
+
+
+class EmbeddingEngine:
+    def __init__(self, model_dir=MODEL_DIR, cache_path=CACHE_PATH, lru_size=LRU_SIZE, batch_size=BATCH_SIZE):
+        self.model_dir = model_dir
+        self.cache_path = cache_path
+        self.lru_size = lru_size
+        self.batch_size = batch_size
+        self._model = None
+        self._model_lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._lru_lock = threading.Lock()
+        self._disk = None
+        self._disk_lock = threading.Lock()
+        # ONNX runtime already uses several cores per batch; one worker keeps
+        # concurrent debates from oversubscribing the CPU
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=WORKER_PREFIX)
+        self.stats = {"lru_hits": 0, "disk_hits": 0, "encoded": 0, "batches": 0, "encode_seconds": 0.0, "load_seconds": 0.0}
+
+    # --- model ---
+    def _load_model(self):
+        with self._model_lock:
+            if self._model is None:
+                started = time.perf_counter()
+                from chromadb.utils.embedding_functions import ONNXMiniLM_L6_V2
+                model = ONNXMiniLM_L6_V2()
+                model.DOWNLOAD_PATH = os.path.join(self.model_dir, MODEL_NAME)
+                model._download_model_if_not_exists()  # no-op when provisioned
+                self._model = model
+                self.stats["load_seconds"] = round(time.perf_counter() - started, 3)
+            return self._model
+
+    def provision(self):
+        """Downloads the model files into model_dir (build step) and loads them once."""
+        self._load_model()
+        return os.path.join(self.model_dir, MODEL_NAME)
+
+    # --- caches ---
+    @staticmethod
+    def cache_key(text):
+        return hashlib.sha256(f"{MODEL_NAME}\x00{text}".encode("utf-8")).hexdigest()
+
+    def _disk_conn(self):
+        if not self.cache_path:
+            return None
+        if self._disk is None:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            self._disk = sqlite3.connect(self.cache_path, check_same_thread=False)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        return self._disk
+
+    def _lru_get(self, key):
+        with self._lru_lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+            return vector
+
+    def _lru_put(self, key, vector):
+        with self._lru_lock:
+            self._lru[key] = vector
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def _disk_get(self, keys):
+        try:
+            with self._disk_lock:
+                conn = self._disk_conn()
+                if conn is None or not keys:
+                    return {}
+                found = {}
+                for start in range(0, len(keys), 500):
+                    chunk = keys[start:start + 500]
+                    rows = conn.execute(
+                        f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    found.update({key: array("f", blob).tolist() for key, blob in rows})
+                return found
+        except sqlite3.Error as e:
+            print(f"Embedding disk cache read failed: {e}")
+            return {}
+
+    def _disk_put(self, items):
+        try:
+            with self._disk_lock:
+                conn = self._disk_conn()
+                if conn is None or not items:
+                    return
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    [(key, array("f", vector).tobytes()) for key, vector in items],
+                )
+                conn.commit()
+        except sqlite3.Error as e:
+            print(f"Embedding disk cache write failed: {e}")
+
+    # --- encoding ---
+    def _on_worker(self, func, *args):
+        """Runs func on the engine's worker thread and waits for it (blocking)."""
+        if threading.current_thread().name.startswith(WORKER_PREFIX):
+            return func(*args)
+        return self._executor.submit(func, *args).result()
+
+    def embed(self, texts):
+        """Embeds a list of texts (blocking). Cached texts are not re-encoded; order is kept."""
+        return self._on_worker(self._embed, list(texts))
+
+    def _embed(self, texts):
+        keys = [self.cache_key(t) for t in texts]
+        vectors = {}
+        for key in keys:
+            vector = self._lru_get(key)
+            if vector is not None:
+                vectors[key] = vector
+                self.stats["lru_hits"] += 1
+
+        missing = [k for k in dict.fromkeys(keys) if k not in vectors]
+        for key, vector in self._disk_get(missing).items():
+            vectors[key] = vector
+            self._lru_put(key, vector)
+            self.stats["disk_hits"] += 1
+
+        to_encode = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                to_encode.setdefault(key, text)
+        if to_encode:
+            model = self._load_model()
+            items = list(to_encode.items())
+            for start in range(0, len(items), self.batch_size):
+                batch = items[start:start + self.batch_size]
+                started = time.perf_counter()
+                encoded = model._forward([text for _, text in batch], batch_size=self.batch_size)
+                self.stats["encode_seconds"] += time.perf_counter() - started
+                self.stats["batches"] += 1
+                self.stats["encoded"] += len(batch)
+                new = [(key, [float(x) for x in vector]) for (key, _), vector in zip(batch, encoded)]
+                for key, vector in new:
+                    vectors[key] = vector
+                    self._lru_put(key, vector)
+                self._disk_put(new)
+        return [vectors[key] for key in keys]
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+    async def aembed(self, texts):
+        """Non-blocking embed for async callers (runs on the engine's worker thread)."""
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self._embed, list(texts))
+
+    def warm(self):
+        """Loads the model and runs one encode so the first debate doesn't pay for it."""
+        self._on_worker(lambda: self._load_model()._forward(["warmup"]))
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats["encode_seconds"] = round(stats["encode_seconds"], 3)
+        stats["texts_per_second"] = round(stats["encoded"] / stats["encode_seconds"], 1) if stats["encode_seconds"] else None
+        stats["lru_entries"] = len(self._lru)
+        stats["model_loaded"] = self._model is not None
+        return stats
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    """Process-wide engine (model loaded once)."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = EmbeddingEngine()
+        return _engine
+
+
+def get_stats():
+    return _engine.get_stats() if _engine else {"model_loaded": False}
@@ -0,0 +1,298 @@
+"""
+API key pools per provider.
+
+Keys are read from the environment. Either variable (or both) can be used:
+
+    OPENAI_API_KEY=sk-one
+    OPENAI_API_KEYS=sk-two,sk-three
+
+Every call leases the least-loaded key that is not cooling down. After the call
+the provider's rate-limit headers (x-ratelimit-remaining-*, retry-after,
+anthropic-ratelimit-*) are fed back so a key that is about to run out is paced,
+and a key that got a 429 is parked until its retry-after / reset time.
+
+Parking is announced through shared_state, so the other uvicorn workers stop
+using the key too instead of each collecting its own 429 first.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+try:
+    from backend.app.services.shared_state import get_state
+except ImportError:
+    from app.services.shared_state import get_state
+
+ENV_NAMES = {
+    "openai": "OPENAI_API_KEY",
+    "groq": "GROQ_API_KEY",
+    "gemini": "GEMINI_API_KEY",
+    "anthropic": "ANTHROPIC_API_KEY",
+}
+
+# Cool-down used when a 429 arrives without any retry-after / reset hint
+DEFAULT_COOLDOWN_SECONDS = 20.0
+MAX_COOLDOWN_SECONDS = 300.0
+COOLDOWN_CHANNEL = "key_pool.cooldown"
+
+
+def mask_key(value):
+    """Masks an API key for logs and error messages."""
+    return f"{value[:15]}..." if value else "None"
+
+
+def key_fingerprint(value):
+    """Identifies a key across workers without sending the key itself."""
+    return hashlib.sha256(value.encode("utf-8")).hexdigest()[:16]
+
+
+def _parse_duration(value):
+    """
+    Parses the reset/retry formats providers use into seconds:
+    "12" / "1.5" (retry-after), "6m0s" / "20ms" / "1h2m3s" (OpenAI, Groq),
+    RFC 3339 timestamps (Anthropic) and HTTP dates (retry-after).
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts and "".join(n + u for n, u in parts) == value:
+        factors = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+        return sum(float(n) * factors[u] for n, u in parts)
+
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _header(headers, *names):
+    for name in names:
+        value = headers.get(name)
+        if value is not None:
+            return value
+    return None
+
+
+class PooledKey:
+    def __init__(self, value):
+        self.value = value
+        self.fingerprint = key_fingerprint(value)
+        self.in_flight = 0
+        self.requests_total = 0
+        self.rate_limited_total = 0
+        self.cooldown_until = 0.0
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.last_used = 0.0
+
+    def cooling_down(self, now):
+        return self.cooldown_until > now
+
+    def get_stats(self, now):
+        return {
+            "key": mask_key(self.value),
+            "in_flight": self.in_flight,
+            "requests_total": self.requests_total,
+            "rate_limited_total": self.rate_limited_total,
+            "cooldown_seconds": round(max(self.cooldown_until - now, 0.0), 1),
+            "remaining_requests": self.remaining_requests,
+            "remaining_tokens": self.remaining_tokens,
+        }
+
+
+class KeyPool:
+    def __init__(self, provider, values):
+        self.provider = provider
+        self.keys = [PooledKey(v) for v in values]
+        self._lock = threading.Condition()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _pick(self, now):
+        available = [k for k in self.keys if not k.cooling_down(now)]
+        if not available:
+            return None
+        # Least loaded first; prefer keys with more known headroom, then least recently used
+        return min(
+            available,
+            key=lambda k: (
+                k.in_flight,
+                -(k.remaining_requests if k.remaining_requests is not None else float("inf")),
+                k.last_used,
+            ),
+        )
+
+    @contextmanager
+    def lease(self):
+        """Context manager yielding a PooledKey. Blocks while every key is cooling down (call it off the event loop)."""
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                key = self._pick(now)
+                if key is not None:
+                    break
+                wake_at = min(k.cooldown_until for k in self.keys)
+                self._lock.wait(timeout=max(wake_at - now, 0.05))
+            key.in_flight += 1
+            key.requests_total += 1
+            key.last_used = now
+        try:
+            yield key
+        finally:
+            with self._lock:
+                key.in_flight -= 1
+                self._lock.notify_all()
+
+    def report_headers(self, key, headers):
+        """Updates a key's remaining budget from response headers and paces it if exhausted."""
+        if not headers:
+            return
+        remaining_requests = _header(headers, "x-ratelimit-remaining-requests", "anthropic-ratelimit-requests-remaining")
+        remaining_tokens = _header(headers, "x-ratelimit-remaining-tokens", "anthropic-ratelimit-tokens-remaining")
+        with self._lock:
+            if remaining_requests is not None:
+                try:
+                    key.remaining_requests = int(float(remaining_requests))
+                except ValueError:
+                    pass
+            if remaining_tokens is not None:
+                try:
+                    key.remaining_tokens = int(float(remaining_tokens))
+                except ValueError:
+                    pass
+
+            # Out of requests or tokens -> hold the key until the window resets
+            wait = None
+            if key.remaining_requests == 0:
+                wait = _parse_duration(_header(headers, "x-ratelimit-reset-requests", "anthropic-ratelimit-requests-reset"))
+            if key.remaining_tokens == 0:
+                token_wait = _parse_duration(_header(headers, "x-ratelimit-reset-tokens", "anthropic-ratelimit-tokens-reset"))
+                if token_wait is not None:
+                    wait = max(wait or 0.0, token_wait)
+            retry_after = _parse_duration(_header(headers, "retry-after"))
+            if retry_after is not None:
+                wait = max(wait or 0.0, retry_after)
+            if wait:
+                wait = min(wait, MAX_COOLDOWN_SECONDS)
+                key.cooldown_until = max(key.cooldown_until, time.monotonic() + wait)
+        if wait:
+            self._share_cooldown(key, wait)
+
+    def report_rate_limited(self, key, headers=None):
+        """Parks a key after a 429."""
+        wait = None
+        if headers:
+            wait = _parse_duration(_header(
+                headers, "retry-after",
+                "x-ratelimit-reset-requests", "anthropic-ratelimit-requests-reset",
+            ))
+        wait = min(wait or DEFAULT_COOLDOWN_SECONDS, MAX_COOLDOWN_SECONDS)
+        with self._lock:
+            key.rate_limited_total += 1
+            key.cooldown_until = max(key.cooldown_until, time.monotonic() + wait)
+        self._share_cooldown(key, wait)
+        print(f"Rate limited: {self.provider} key {mask_key(key.value)} cooling down for {wait:.0f}s")
+
+    def _share_cooldown(self, key, wait):
+        try:
+            get_state().publish(COOLDOWN_CHANNEL, {
+                "provider": self.provider, "key": key.fingerprint, "until": time.time() + wait,
+            })
+        except Exception as e:
+            print(f"Key cooldown not shared: {e}")
+
+    def apply_cooldown(self, fingerprint, until):
+        """Cool-down announced by another worker (until = wall-clock time)."""
+        wait = until - time.time()
+        if wait <= 0:
+            return
+        with self._lock:
+            for key in self.keys:
+                if key.fingerprint == fingerprint:
+                    key.cooldown_until = max(key.cooldown_until, time.monotonic() + min(wait, MAX_COOLDOWN_SECONDS))
+
+    def get_stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return [k.get_stats(now) for k in self.keys]
+
+
+def _load_keys(provider):
+    env_name = ENV_NAMES[provider]
+    values = []
+    for raw in [os.getenv(env_name, "")] + os.getenv(env_name + "S", "").split(","):
+        value = raw.strip()
+        if value and value not in values:
+            values.append(value)
+    return values
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_subscribed = False
+
+
+def _on_cooldown(message):
+    with _pools_lock:
+        pool = _pools.get(message.get("provider"))
+    if pool:
+        pool.apply_cooldown(message.get("key"), message.get("until", 0))
+
+
+def get_key_pool(provider):
+    """Returns the shared key pool of a provider (None if the provider has no keys configured)."""
+    if provider not in ENV_NAMES:
+        return None
+    global _subscribed
+    with _pools_lock:
+        if provider not in _pools:
+            values = _load_keys(provider)
+            _pools[provider] = KeyPool(provider, values) if values else None
+        pool = _pools[provider]
+        subscribe = pool is not None and not _subscribed
+        _subscribed = _subscribed or subscribe
+    if subscribe:
+        try:
+            get_state().subscribe(COOLDOWN_CHANNEL, _on_cooldown)
+        except Exception as e:
+            print(f"Key cooldowns are per worker: {e}")
+    return pool
+
+
+def is_rate_limit_error(error):
+    """True for 429 errors from any of the provider SDKs."""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if status == 429:
+        return True
+    return "429" in str(error) and ("rate" in str(error).lower() or "quota" in str(error).lower())
+
+
+def error_headers(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None)
+
+
+def get_stats():
+    with _pools_lock:
+        pools = dict(_pools)
+    return {provider: pool.get_stats() for provider, pool in pools.items() if pool}
@@ -0,0 +1,70 @@
+"""
+Startup / readiness lifecycle.
+
+Importing the app is kept cheap (see scripts/check_import_time.py) so the port
+opens quickly and "/" answers right away. Heavy pieces (Supabase clients, provider
+SDKs, Chroma and its embedding model) are loaded by an optional background
+warm-up after startup (WARMUP_ON_STARTUP=0 to disable); until it finishes,
+GET /ready reports 503 and requests simply load what they need on first use.
+"""
+import os
+import threading
+import time
+
+_state = {
+    "started_at": None,
+    "warmup": "disabled",  # disabled | running | done | failed
+    "steps": {},
+}
+_lock = threading.Lock()
+_warmup_steps = []
+
+
+def register_warmup(name, func):
+    """Adds a warm-up step. Steps run in registration order on a background thread."""
+    _warmup_steps.append((name, func))
+
+
+def _run_warmup():
+    failed = False
+    for name, func in _warmup_steps:
+        started = time.perf_counter()
+        try:
+            func()
+            result = {"ok": True}
+        except Exception as e:
+            # A failed step is not fatal: the same thing is retried lazily on first use
+            print(f"Warm-up step '{name}' failed: {e}")
+            result = {"ok": False, "error": str(e)}
+            failed = True
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        with _lock:
+            _state["steps"][name] = result
+    with _lock:
+        _state["warmup"] = "failed" if failed else "done"
+
+
+def startup():
+    """Called once when the app starts. Returns immediately."""
+    with _lock:
+        _state["started_at"] = time.time()
+        if os.getenv("WARMUP_ON_STARTUP", "1") != "1" or not _warmup_steps:
+            return
+        _state["warmup"] = "running"
+    threading.Thread(target=_run_warmup, name="warmup", daemon=True).start()
+
+
+def is_ready():
+    # "failed" still counts as ready: failed steps fall back to lazy loading
+    with _lock:
+        return _state["started_at"] is not None and _state["warmup"] != "running"
+
+
+def get_status():
+    with _lock:
+        return {
+            "ready": _state["started_at"] is not None and _state["warmup"] != "running",
+            "warmup": _state["warmup"],
+            "steps": dict(_state["steps"]),
+            "uptime_seconds": round(time.time() - _state["started_at"], 1) if _state["started_at"] else 0,
+        }
@@ -0,0 +1,336 @@
+"""
+Persona registry: who sits on an organization's board.
+
+The catalog (built-in personas plus PERSONAS_FILE, a JSON list of extra or
+overriding specs) is loaded once at import. A spec is a plain dict:
+
+    {"name": "Lex", "provider": "openai", "model_name": "gpt-4o-mini",
+     "persona": "Hukukçu (The Counsel): ..."}
+
+An organization picks its members in organizations.board
+(migrations/add_board_config.sql):
+
+    {"members": ["Atlas", "Marcus", "Lex", ...], "custom": [<spec>, ...]}
+
+Without a board config the five original members debate. Boards larger than
+COMMITTEE_SIZE are split into sub-committees in member order (see
+split_committees and ai_service.run_committee_rounds).
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+
+try:
+    from backend.app.services import repository
+    from backend.app.services.shared_state import get_state
+except ImportError:
+    from app.services import repository
+    from app.services.shared_state import get_state
+
+PERSONAS_FILE = os.getenv("PERSONAS_FILE", "")
+COMMITTEE_SIZE = max(2, int(os.getenv("COMMITTEE_SIZE", "5")))
+MAX_BOARD_SIZE = 20
+BOARD_CACHE_TTL = float(os.getenv("BOARD_CACHE_TTL", "300"))
+BOARD_CHANNEL = "personas.board_changed"
+PROVIDERS = ("openai", "anthropic", "groq", "gemini")
+
+DEFAULT_BOARD = ["Atlas", "Nova", "Marcus", "Sterling", "Maya"]
+
+MODERATOR = {
+    "name": "Orion (Moderatör)",
+    "provider": "openai",
+    "model_name": "gpt-5-mini",
+    "persona": """Başkan (The Chairman): Tartışmayı yöneten ve karara varmayı sağlayan lidersin.
+        GÖREVİN: Tartışma tıkandığında yeni perspektifler sun, konudan sapıldığında geri yönlendir.
+        KONUŞMA TARZI: Profesyonel, kararlı ve çözüm odaklı. Tartışmayı ileriye taşı.""",
+}
+
+BUILTIN_PERSONAS = [
+    {
+        "name": "Atlas",
+        "provider": "openai",
+        "model_name": "gpt-4o-mini",
+        "persona": """Stratejist (The Strategist): Büyük resmi gör. Rakipler ne yapıyor? Pazar nereye gidiyor? 
+            ÖNCELİKLİ KONULAR: Rekabet avantajı, pazar payı, uzun vadeli strateji.
+            DÜŞÜK ÖNCELİK: Kısa vadeli maliyet detayları - stratejik bağlamda değinebilirsin.
+            KONUŞMA TARZI: Soğukkanlı, analitik, 'Rakipler bize karşı ne yapar?' perspektifinden bak.""",
+    },
+    {
+        "name": "Nova",
+        "provider": "anthropic",
+        "model_name": "claude-3-5-haiku-20241022",
+        "persona": """Vizyoner (The Visionary): Büyük düşün! İnovasyon, disruption ve 'Wow' faktörü senin alanın.
+            ÖNCELİKLİ KONULAR: Gelecek trendler, inovasyon, marka prestiji, 'Ya büyük düşünseydik?'
+            DÜŞÜK ÖNCELİK: Bütçe ve maliyet senin önceliğin değil, ama farkındaysan kısaca not edebilirsin.
+            KONUŞMA TARZI: Heyecanlı, iddialı, ilham verici. 'Neden olmasın?' diye meydan oku.""",
+    },
+    {
+        "name": "Marcus",
+        "provider": "groq",
+        "model_name": "llama-3.3-70b-versatile",
+        "persona": """Şüpheci (The Skeptic): Eleştirel düşün. Her iddianın kanıtını iste. Murphy Kanunları senin rehberin.
+            ÖNCELİKLİ KONULAR: Riskler, belirsizlikler, 'Nereden biliyorsunuz?', 'Ya işe yaramazsa?'
+            DÜŞÜK ÖNCELİK: Aşırı iyimser tahminlere karşı ol, ama yapıcı eleştiri sun.
+            KONUŞMA TARZI: Sorgulayıcı ama yapıcı, 'Bu veriyi nereden çıkardın?' diye sor.""",
+    },
+    {
+        "name": "Sterling",
+        "provider": "openai",
+        "model_name": "gpt-5-nano",
+        "persona": """CFO (The Finance Guy): Rakamlar ve finansal metrikler senin uzmanlık alanın.
+            ÖNCELİKLİ KONULAR: ROI, nakit akışı, maliyet, geri ödeme süresi, bilanço etkisi.
+            DÜŞÜK ÖNCELİK: Vizyon ve marka değeri - finansal etkisini analiz edebilirsin.
+            KONUŞMA TARZI: Analitik, rakam odaklı, 'Yatırımın geri dönüşü ne olacak?' diye sor.""",
+    },
+    {
+        "name": "Maya",
+        "provider": "anthropic",
+        "model_name": "claude-3-haiku-20240307",
+        "persona": """Kullanıcı Savunucusu (The User Advocate): Müşteri deneyimi senin önceliğin.
+            ÖNCELİKLİ KONULAR: Müşteri deneyimi (UX), kullanıcı memnuniyeti, 'Müşteri ne hisseder?'
+            DÜŞÜK ÖNCELİK: Teknik ve finansal detaylar - müşteri etkisi bağlamında değinebilirsin.
+            KONUŞMA TARZI: Empatik, kullanıcı odaklı, 'Müşterinin gözünden bak' perspektifini sun.""",
+    },
+    # Specialists for larger (enterprise) boards
+    {
+        "name": "Lex",
+        "provider": "openai",
+        "model_name": "gpt-4o-mini",
+        "persona": """Hukukçu (The Counsel): Mevzuat, sözleşmeler ve uyum senin alanın.
+            ÖNCELİKLİ KONULAR: Yasal riskler, KVKK/GDPR, sözleşme yükümlülükleri, regülasyon.
+            KONUŞMA TARZI: Temkinli ve net, 'Bunu yapmaya hakkımız var mı?' diye sor.""",
+    },
+    {
+        "name": "Ada",
+        "provider": "groq",
+        "model_name": "llama-3.3-70b-versatile",
+        "persona": """CTO (The Technologist): Teknik fizibilite ve mimari senin alanın.
+            ÖNCELİKLİ KONULAR: Uygulanabilirlik, teknik borç, ölçeklenebilirlik, geliştirme süresi.
+            KONUŞMA TARZI: Pragmatik, 'Bunu kim, ne kadar sürede inşa eder?' diye sor.""",
+    },
+    {
+        "name": "Kai",
+        "provider": "anthropic",
+        "model_name": "claude-3-5-haiku-20241022",
+        "persona": """COO (The Operator): Operasyon ve uygulama senin alanın.
+            ÖNCELİKLİ KONULAR: Süreçler, kaynak planlaması, teslimat, operasyonel darboğazlar.
+            KONUŞMA TARZI: Somut ve adım adım, 'Pazartesi sabahı ne değişecek?' diye sor.""",
+    },
+    {
+        "name": "Iris",
+        "provider": "openai",
+        "model_name": "gpt-4o-mini",
+        "persona": """CMO (The Marketer): Marka, konumlandırma ve büyüme kanalları senin alanın.
+            ÖNCELİKLİ KONULAR: Hedef kitle, mesaj, edinme maliyeti (CAC), kampanya etkisi.
+            KONUŞMA TARZI: Enerjik, 'Bunu müşteriye tek cümlede nasıl anlatırız?' diye sor.""",
+    },
+    {
+        "name": "Rex",
+        "provider": "groq",
+        "model_name": "llama-3.3-70b-versatile",
+        "persona": """Satış Direktörü (The Closer): Gelir ve satış hattı senin alanın.
+            ÖNCELİKLİ KONULAR: Satış döngüsü, fiyatlandırma, kanal ortakları, kısa vadeli gelir.
+            KONUŞMA TARZI: Sonuç odaklı, 'Bunu kim satın alacak ve ne zaman?' diye sor.""",
+    },
+    {
+        "name": "Vera",
+        "provider": "anthropic",
+        "model_name": "claude-3-haiku-20240307",
+        "persona": """İK Direktörü (The People Lead): Ekip, kültür ve yetenek senin alanın.
+            ÖNCELİKLİ KONULAR: İşe alım, çalışan bağlılığı, yetkinlik açıkları, değişim yönetimi.
+            KONUŞMA TARZI: Dengeli, 'Ekip bunu taşıyabilir mi?' diye sor.""",
+    },
+    {
+        "name": "Quinn",
+        "provider": "openai",
+        "model_name": "gpt-4o-mini",
+        "persona": """Veri Analisti (The Analyst): Ölçüm ve kanıt senin alanın.
+            ÖNCELİKLİ KONULAR: KPI'lar, deney tasarımı, veri kalitesi, başarı kriterleri.
+            KONUŞMA TARZI: Kesin, 'Başarıyı hangi metrikle ölçeceğiz?' diye sor.""",
+    },
+    {
+        "name": "Terra",
+        "provider": "anthropic",
+        "model_name": "claude-3-5-haiku-20241022",
+        "persona": """Sürdürülebilirlik Sorumlusu (The Steward): ESG ve uzun vadeli etki senin alanın.
+            ÖNCELİKLİ KONULAR: Çevresel etki, sosyal sorumluluk, itibar, paydaş beklentileri.
+            KONUŞMA TARZI: İlkeli ama gerçekçi, '10 yıl sonra bu karardan gurur duyar mıyız?' diye sor.""",
+    },
+    {
+        "name": "Cipher",
+        "provider": "groq",
+        "model_name": "llama-3.3-70b-versatile",
+        "persona": """Güvenlik Direktörü (The Guardian): Bilgi güvenliği ve süreklilik senin alanın.
+            ÖNCELİKLİ KONULAR: Siber riskler, veri sızıntısı, tedarikçi güvenliği, iş sürekliliği.
+            KONUŞMA TARZI: Uyanık, 'Bir saldırgan bunu nasıl kötüye kullanır?' diye sor.""",
+    },
+    {
+        "name": "Piper",
+        "provider": "openai",
+        "model_name": "gpt-4o-mini",
+        "persona": """Ürün Yöneticisi (The Product Lead): Ürün stratejisi ve önceliklendirme senin alanın.
+            ÖNCELİKLİ KONULAR: Yol haritası, kullanıcı problemi, MVP kapsamı, fırsat maliyeti.
+            KONUŞMA TARZI: Odaklı, 'Neyi yapmamaya karar veriyoruz?' diye sor.""",
+    },
+    {
+        "name": "Hugo",
+        "provider": "anthropic",
+        "model_name": "claude-3-haiku-20240307",
+        "persona": """Tedarik Zinciri Uzmanı (The Supplier): Tedarik, lojistik ve maliyet yapısı senin alanın.
+            ÖNCELİKLİ KONULAR: Tedarikçi riski, stok, teslim süreleri, birim maliyet.
+            KONUŞMA TARZI: Detaycı, 'Tedarikçi yarın teslim edemezse ne olur?' diye sor.""",
+    },
+    {
+        "name": "Sage",
+        "provider": "groq",
+        "model_name": "llama-3.3-70b-versatile",
+        "persona": """Yatırımcı Temsilcisi (The Investor): Hissedar değeri ve yönetişim senin alanın.
+            ÖNCELİKLİ KONULAR: Değerleme, sermaye verimliliği, hissedar beklentileri, çıkış senaryoları.
+            KONUŞMA TARZI: Talepkar, 'Bu şirketin değerini nasıl artırır?' diye sor.""",
+    },
+]
+
+
+class BoardConfigError(ValueError):
+    """Invalid board configuration (unknown member, bad custom spec, size)."""
+
+
+def validate_spec(spec):
+    if not isinstance(spec, dict):
+        raise BoardConfigError("A persona must be an object")
+    missing = [k for k in ("name", "provider", "model_name", "persona") if not str(spec.get(k) or "").strip()]
+    if missing:
+        raise BoardConfigError(f"Persona is missing {', '.join(missing)}")
+    if spec["provider"] not in PROVIDERS:
+        raise BoardConfigError(f"Unknown provider {spec['provider']} (one of {', '.join(PROVIDERS)})")
+    if spec["name"] == MODERATOR["name"]:
+        raise BoardConfigError("The moderator cannot be a board member")
+    return {k: str(spec[k]).strip() for k in ("name", "provider", "model_name", "persona")}
+
+
+def _load_catalog():
+    catalog = {p["name"]: p for p in BUILTIN_PERSONAS}
+    if PERSONAS_FILE:
+        try:
+            with open(PERSONAS_FILE, encoding="utf-8") as f:
+                for spec in json.load(f):
+                    spec = validate_spec(spec)
+                    catalog[spec["name"]] = spec
+        except (OSError, ValueError) as e:
+            print(f"PERSONAS_FILE {PERSONAS_FILE} not loaded: {e}")
+    return catalog
+
+
+PERSONA_CATALOG = _load_catalog()
+
+
+def resolve_board(config):
+    """Board config -> list of persona specs in member order (raises BoardConfigError)."""
+    config = config or {}
+    custom = {}
+    for spec in config.get("custom") or []:
+        spec = validate_spec(spec)
+        custom[spec["name"]] = spec
+    names = config.get("members") or DEFAULT_BOARD
+    if len(set(names)) != len(names):
+        raise BoardConfigError("Board members must be unique")
+    if not 2 <= len(names) <= MAX_BOARD_SIZE:
+        raise BoardConfigError(f"A board has 2 to {MAX_BOARD_SIZE} members")
+    unknown = [n for n in names if n not in custom and n not in PERSONA_CATALOG]
+    if unknown:
+        raise BoardConfigError(f"Unknown board members: {', '.join(unknown)}")
+    return [custom.get(n) or PERSONA_CATALOG[n] for n in names]
+
+
+def default_board():
+    return [PERSONA_CATALOG[n] for n in DEFAULT_BOARD]
+
+
+def split_committees(members, size=COMMITTEE_SIZE):
+    """Consecutive, evenly sized groups of at most `size` (member order decides the grouping)."""
+    count = -(-len(members) // size)
+    base, extra = divmod(len(members), count)
+    committees, start = [], 0
+    for i in range(count):
+        end = start + base + (1 if i < extra else 0)
+        committees.append(members[start:end])
+        start = end
+    return committees
+
+
+# --- per-organization boards (cached per worker, invalidated on change) ---
+
+_boards = {}
+_boards_lock = threading.Lock()
+_subscribed = False
+
+
+def _on_board_changed(org_id):
+    with _boards_lock:
+        _boards.pop(org_id, None)
+
+
+def _subscribe():
+    global _subscribed
+    with _boards_lock:
+        if _subscribed:
+            return
+        _subscribed = True
+    try:
+        get_state().subscribe(BOARD_CHANNEL, _on_board_changed)
+    except Exception as e:
+        print(f"Board changes reach other workers after {BOARD_CACHE_TTL:.0f}s: {e}")
+
+
+async def load_board_config(org_id):
+    rows = await repository.execute(
+        repository.get_client().table("organizations").select("board").eq("id", org_id).limit(1)
+    )
+    return (rows[0].get("board") if rows else None) or {}
+
+
+async def board_for_org(org_id):
+    """Persona specs of the organization's board (falls back to the default board)."""
+    if not org_id:
+        return default_board()
+    if not _subscribed:
+        await asyncio.to_thread(_subscribe)
+    with _boards_lock:
+        cached = _boards.get(org_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+    try:
+        members = resolve_board(await load_board_config(org_id))
+    except Exception as e:
+        print(f"Board of {org_id} not loaded, using the default board: {e}")
+        members = default_board()
+    with _boards_lock:
+        _boards[org_id] = (time.monotonic() + BOARD_CACHE_TTL, members)
+    return members
+
+
+async def save_board(org_id, config):
+    """Validates and stores the organization's board, then drops it from every worker's cache."""
+    members = resolve_board(config)
+    stored = {"members": [m["name"] for m in members], "custom": [validate_spec(s) for s in config.get("custom") or []]}
+    await repository.execute(
+        repository.get_client().table("organizations").update({"board": stored}).eq("id", org_id), write=True
+    )
+    _on_board_changed(org_id)
+    try:
+        await asyncio.to_thread(get_state().publish, BOARD_CHANNEL, org_id)
+    except Exception as e:
+        print(f"Board change not broadcast: {e}")
+    return members
+
+
+def describe(spec):
+    """Public view of a persona spec (title instead of the full prompt)."""
+    return {
+        "name": spec["name"],
+        "title": spec["persona"].split(":")[0].strip(),
+        "provider": spec["provider"],
+        "model_name": spec["model_name"],
+    }
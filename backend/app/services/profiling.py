@@ -0,0 +1,183 @@
+"""
+Opt-in profiling of single debate runs (admins only).
+
+POST /api/chat-stream with the header `X-Debug-Profile: wall` (or `cpu`), or
+`?debug_profile=wall`, profiles that one simulate_debate_streaming run with yappi:
+coroutine-aware (wall time of a coroutine includes its awaits), and including
+the worker threads the run hands provider / Supabase / parsing calls to. Other
+debates running in the same worker at the same time are filtered out (runs are
+tagged through a context variable that asyncio tasks and to_thread inherit).
+
+Each run is stored in PROFILE_DIR as <id>.pstat (open with snakeviz or
+pstats) plus <id>.json (metadata, per-package self time, top functions).
+GET /api/profiles lists them, GET /api/profiles/{id} downloads one.
+
+Admins are listed in PROFILING_ADMINS (user ids or e-mails, comma separated).
+yappi is imported only when a profiled run starts (pip install yappi); without
+the header nothing here runs, so normal requests pay nothing.
+"""
+import contextvars
+import itertools
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+PROFILE_DIR = Path(os.getenv("PROFILE_DIR", str(BACKEND_DIR / ".cache" / "profiles")))
+PROFILING_ADMINS = {a.strip().lower() for a in os.getenv("PROFILING_ADMINS", "").split(",") if a.strip()}
+MAX_PROFILES = int(os.getenv("PROFILE_MAX_FILES", "50"))
+CLOCKS = ("wall", "cpu")
+TOP_FUNCTIONS = 60
+
+_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+_tag = contextvars.ContextVar("profile_tag", default=0)
+_tags = itertools.count(1)
+_lock = threading.Lock()
+_active = 0
+
+
+class ProfilingUnavailable(Exception):
+    """yappi is not installed."""
+
+
+def is_profiling_admin(user):
+    return bool(PROFILING_ADMINS) and bool(
+        {str(getattr(user, "id", "")).lower(), str(getattr(user, "email", "") or "").lower()} & PROFILING_ADMINS
+    )
+
+
+def requested_clock(header_value, query_value):
+    """"wall" / "cpu" if the request asks for a profile, else None."""
+    value = (header_value or query_value or "").strip().lower()
+    if not value or value in ("0", "off", "false"):
+        return None
+    return value if value in CLOCKS else "wall"
+
+
+def _package(path):
+    """Groups a code file by what it belongs to: a site-package, our own module, or the stdlib module."""
+    path = path.replace("\\", "/")
+    if "site-packages/" in path:
+        return path.split("site-packages/", 1)[1].split("/", 1)[0].removesuffix(".py")
+    if "/backend/app/" in path:
+        return "app." + path.rsplit("/", 1)[-1].removesuffix(".py")
+    return path.rsplit("/", 1)[-1].removesuffix(".py") or path
+
+
+class ProfileSession:
+    """One profiled run. Call finish() when the run is over (also on errors / disconnects)."""
+
+    def __init__(self, clock, meta):
+        try:
+            import yappi
+        except ImportError:
+            raise ProfilingUnavailable("Profiling needs yappi (pip install yappi)")
+        global _active
+        self.yappi = yappi
+        self.id = uuid.uuid4().hex
+        self.tag = next(_tags)
+        self.meta = meta
+        with _lock:
+            # One yappi session per process; concurrent profiled runs share it with their own tags
+            if _active == 0:
+                yappi.clear_stats()
+                yappi.set_clock_type(clock)
+                yappi.set_tag_callback(_tag.get)
+                yappi.start(builtins=False, profile_threads=True)
+            _active += 1
+            self.clock = yappi.get_clock_type()
+        _tag.set(self.tag)  # inherited by the run's tasks and to_thread calls
+        self.started = time.perf_counter()
+        self.cpu_started = time.process_time()
+        self.finished = False
+
+    def finish(self):
+        global _active
+        if self.finished:
+            return None
+        self.finished = True
+        wall = time.perf_counter() - self.started
+        process_cpu = time.process_time() - self.cpu_started
+        try:
+            with _lock:
+                stats = self.yappi.get_func_stats(filter={"tag": self.tag})
+                summary = self._save(stats, wall, process_cpu)
+        except Exception as e:
+            print(f"Profile {self.id} could not be saved: {e}")
+            summary = None
+        finally:
+            with _lock:
+                _active -= 1
+                if _active == 0:
+                    self.yappi.stop()
+        _prune()
+        return summary
+
+    def _save(self, stats, wall, process_cpu):
+        PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+        stats.save(str(PROFILE_DIR / f"{self.id}.pstat"), type="pstat")
+
+        by_package = defaultdict(float)
+        functions = []
+        for s in stats:
+            by_package[_package(s.module)] += s.tsub
+            functions.append({
+                "function": s.name,
+                "module": s.module,
+                "line": s.lineno,
+                "calls": s.ncall,
+                "total_seconds": round(s.ttot, 4),
+                "self_seconds": round(s.tsub, 4),
+            })
+        functions.sort(key=lambda f: f["total_seconds"], reverse=True)
+        summary = {
+            "id": self.id,
+            "created_at": time.time(),
+            "clock": self.clock,
+            "wall_seconds": round(wall, 3),
+            # Whole process, so it includes other requests served meanwhile
+            "process_cpu_seconds": round(process_cpu, 3),
+            **self.meta,
+            "self_seconds_by_package": {
+                k: round(v, 4) for k, v in sorted(by_package.items(), key=lambda kv: kv[1], reverse=True)
+            },
+            "top_functions": functions[:TOP_FUNCTIONS],
+        }
+        (PROFILE_DIR / f"{self.id}.json").write_text(json.dumps(summary, ensure_ascii=False, indent=2))
+        return summary
+
+
+def _prune():
+    try:
+        summaries = sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime)
+        for old in summaries[:-MAX_PROFILES] if MAX_PROFILES > 0 else []:
+            old.unlink(missing_ok=True)
+            old.with_suffix(".pstat").unlink(missing_ok=True)
+    except OSError as e:
+        print(f"Profile cleanup failed: {e}")
+
+
+def list_profiles():
+    profiles = []
+    for path in sorted(PROFILE_DIR.glob("*.json"), key=lambda p: p.stat().st_mtime, reverse=True):
+        try:
+            data = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        profiles.append({k: v for k, v in data.items() if k not in ("top_functions", "self_seconds_by_package")})
+    return profiles
+
+
+def profile_path(profile_id, fmt="json"):
+    """Path of a stored profile file, or None (ids are validated, no path tricks)."""
+    if not _ID_RE.match(profile_id or "") or fmt not in ("json", "pstat"):
+        return None
+    path = PROFILE_DIR / f"{profile_id}.{fmt}"
+    return path if path.exists() else None
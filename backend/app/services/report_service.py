@@ -0,0 +1,165 @@
+"""
+On-demand final decision report ("Nihai Karar Tutanağı").
+
+The debate stream ends with the votes; the report is the most expensive call of a
+debate, so it is only generated when the user asks for it (GET /api/report).
+Reports are content-addressed: the key is a hash of the debate transcript, the
+language and the prompt version, so re-opening or sharing a report is free.
+Lookups go to the shared cache first (shared_state, every worker sees the same
+entries), then to the decision_reports table (migrations/add_decision_reports.sql).
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+
+try:
+    from backend.app.services import repository
+    from backend.app.services.conversation_memory import as_prompt_turn
+    from backend.app.services.shared_state import get_state
+except ImportError:
+    from app.services import repository
+    from app.services.conversation_memory import as_prompt_turn
+    from app.services.shared_state import get_state
+
+# Bump when report_prompt changes so old cached reports are not served
+PROMPT_VERSION = "1"
+CACHE_TTL = int(os.getenv("REPORT_CACHE_TTL", str(24 * 3600)))
+MAX_TRANSCRIPT_ROWS = 500
+
+
+class NoDebateError(Exception):
+    """The conversation has no finished debate (no vote_results yet)."""
+
+
+async def load_debate_transcript(conversation_id):
+    """
+    Messages of the latest finished debate of a conversation: from the user
+    message that started it up to and including its vote_results.
+    """
+    data = await repository.execute(
+        repository.get_client().table("messages").select("role, content, metadata, created_at")
+        .eq("conversation_id", conversation_id).in_("role", ["user", "assistant", "vote_results"])
+        .order("created_at", desc=True).limit(MAX_TRANSCRIPT_ROWS)
+    )
+    rows = list(reversed(data or []))
+
+    vote_idx = max((i for i, m in enumerate(rows) if m["role"] == "vote_results"), default=None)
+    if vote_idx is None:
+        raise NoDebateError("No finished debate in this conversation")
+    start = max((i for i, m in enumerate(rows[:vote_idx]) if m["role"] == "user"), default=0)
+    return [as_prompt_turn(m) for m in rows[start:vote_idx + 1]]
+
+
+def transcript_hash(transcript, language):
+    payload = json.dumps({"v": PROMPT_VERSION, "lang": language, "t": transcript}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def build_report_prompt(transcript):
+    full_history_text = "\n".join([f"{m['role']}: {m['content']}" for m in transcript if m['role'] != "system"])
+    current_date_str = datetime.now().strftime("%Y-%m-%d")
+    return f"""
+    GÖREV: Bu yönetim kurulu toplantısının "Nihai Karar Tutanağı"nı hazırla.
+
+    TARTIŞMA GEÇMİŞİ:
+    {full_history_text}
+
+    TALİMATLAR:
+    - Profesyonel, resmi ve net bir dil kullan.
+    - Markdown formatını kusursuz uygula (Başlıklar, Listeler, Kalın Yazı).
+    - Her ana başlık öncesinde ve sonrasında MUTLAKA bir boş satır bırak.
+
+    ÇIKTI FORMATI (TAM OLARAK BU ŞABLONU KULLAN):
+
+    # 📋 [Konu Başlığı] - Karar Raporu
+
+    ## 1. Yönetici Özeti
+    (Buraya 2-3 cümlelik net bir özet gelecek. Ne konuşuldu, hangi engeller çıktı, sonuç ne oldu?)
+
+    ## 2. Temel Bulgular (SWOT Analizi)
+    ### ✅ Fırsatlar & Artılar
+    - (Madde 1)
+    - (Madde 2)
+
+    ### ⚠️ Riskler & Tehditler
+    - (Madde 1)
+    - (Madde 2)
+
+    ## 3. Nihai Karar
+    **(Karar: ONAY / RED / ERTELEME / REVİZYON)**
+    (Kararın gerekçesini buraya yaz.)
+
+    ## 4. Aksiyon Planı
+    1. **[Hemen]:** (İlk adım)
+    2. **[Orta Vade]:** (Sonraki adım)
+    3. **[Kritik Uyarı]:** (Varsa dikkat edilmesi gereken nokta)
+
+    ---
+    *Rapor Tarihi: {current_date_str} | Raportör: Pocket Board AI*
+    """
+
+
+async def _cache_get(key):
+    try:
+        cached = await asyncio.to_thread(get_state().get, f"report:{key}")
+        if cached is not None:
+            return cached
+    except Exception as e:
+        print(f"Report cache read failed: {e}")
+    try:
+        rows = await repository.execute(
+            repository.get_client().table("decision_reports").select("content").eq("transcript_hash", key).limit(1)
+        )
+        if rows:
+            await asyncio.to_thread(_cache_put, key, rows[0]["content"])
+            return rows[0]["content"]
+    except Exception as e:
+        print(f"Report cache lookup failed: {e}")
+    return None
+
+
+def _cache_put(key, content):
+    try:
+        get_state().set(f"report:{key}", content, ttl=CACHE_TTL)
+    except Exception as e:
+        print(f"Report cache write failed: {e}")
+
+
+async def get_report(transcript, language, reporter, conversation_id=None):
+    """
+    Returns (report, transcript_hash, cached). `reporter` is the AIModel that
+    writes the report (the moderator). New reports are stored in
+    decision_reports and, for a conversation, as a system message so they show up
+    in /api/history like before.
+    """
+    key = transcript_hash(transcript, language)
+    cached = await _cache_get(key)
+    if cached is not None:
+        return cached, key, True
+
+    report = await asyncio.to_thread(
+        reporter.generate_response, [{"role": "user", "content": build_report_prompt(transcript)}]
+    )
+    if report.startswith("Error"):
+        raise RuntimeError(report)
+    await asyncio.to_thread(_cache_put, key, report)
+    try:
+        client = repository.get_client()
+        await repository.execute(client.table("decision_reports").upsert({
+            "transcript_hash": key,
+            "conversation_id": conversation_id,
+            "language": language,
+            "content": report,
+        }), write=True)
+        if conversation_id:
+            await repository.execute(client.table("messages").insert({
+                "conversation_id": conversation_id,
+                "role": "system",
+                "content": report,
+                "metadata": {"report_hash": key},
+            }), write=True)
+    except Exception as e:
+        print(f"Report save failed: {e}")
+    return report, key, False
@@ -0,0 +1,211 @@
+"""
+Async data access for the chat endpoints and the debate's message writes.
+
+Search, analytics, reports and boards (debate_search, decision_analytics,
+report_service, personas) go through execute() / rpc() as well.
+
+The handlers in api/chat.py and save_to_db in ai_service.py used the blocking
+supabase-py client inside async code, so every round-trip stalled the event
+loop (and every other stream on the worker). This module talks to Supabase's
+PostgREST endpoint with the async postgrest client instead:
+
+- one pooled httpx connection pool per event loop (DB_POOL_SIZE connections,
+  keep-alive), service role key with the anon key as fallback (like get_db_client),
+- a timeout per query (DB_TIMEOUT seconds),
+- retries with jittered backoff (DB_RETRIES) for connection errors, timeouts and
+  5xx / 429 answers; writes are only retried when the request never got out,
+- multi-step lookups as single RPCs (migrations/add_chat_rpcs.sql).
+
+Latency against a local PostgREST stand-in: scripts/bench_db.py.
+"""
+import asyncio
+import os
+import random
+import time
+import weakref
+from collections import Counter
+
+import httpx
+
+POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+QUERY_TIMEOUT = float(os.getenv("DB_TIMEOUT", "10"))
+CONNECT_TIMEOUT = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))
+RETRIES = int(os.getenv("DB_RETRIES", "2"))
+RETRY_BACKOFF = 0.2  # seconds, doubled per attempt
+
+# Failures where the request never reached PostgREST: safe to repeat, even for writes
+_NOT_SENT = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Failures after sending: only reads are repeated
+_TRANSIENT = _NOT_SENT + (httpx.ReadTimeout, httpx.ReadError, httpx.RemoteProtocolError, asyncio.TimeoutError)
+
+_clients = weakref.WeakKeyDictionary()  # event loop -> AsyncPostgrestClient
+_pending_writes = set()
+_stats = Counter()
+
+
+def _rest_credentials():
+    url = os.environ.get("NEXT_PUBLIC_SUPABASE_URL")
+    key = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("NEXT_PUBLIC_SUPABASE_ANON_KEY")
+    if not url or not key:
+        raise ValueError("Supabase URL or Key missing in environment variables.")
+    return f"{url.rstrip('/')}/rest/v1", key
+
+
+def get_client():
+    """The async PostgREST client of the running event loop (created on first use)."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        from postgrest import AsyncPostgrestClient
+
+        base_url, key = _rest_credentials()
+        headers = {
+            "apikey": key,
+            "Authorization": f"Bearer {key}",
+            "Accept": "application/json",
+            "Content-Type": "application/json",
+        }
+        http_client = httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=httpx.Timeout(QUERY_TIMEOUT, connect=CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE),
+        )
+        client = _clients[loop] = AsyncPostgrestClient(base_url, headers=headers, http_client=http_client)
+    return client
+
+
+def _retryable(error, write):
+    if isinstance(error, _NOT_SENT):
+        return True
+    if write:
+        return False
+    if isinstance(error, _TRANSIENT):
+        return True
+    # APIError: HTTP status for non-JSON answers (gateway errors), PGRST000-003 = database unreachable
+    code = str(getattr(error, "code", "") or "")
+    return code == "429" or (code.startswith("5") and len(code) == 3) or code.startswith("PGRST00")
+
+
+async def execute(query, write=False, timeout=None):
+    """Runs a postgrest query builder with the timeout and retry policy; returns the response data."""
+    started = time.perf_counter()
+    _stats["queries"] += 1
+    try:
+        for attempt in range(RETRIES + 1):
+            try:
+                response = await asyncio.wait_for(query.execute(), timeout or QUERY_TIMEOUT)
+                return response.data
+            except Exception as e:
+                if isinstance(e, (asyncio.TimeoutError, httpx.TimeoutException)):
+                    _stats["timeouts"] += 1
+                if attempt == RETRIES or not _retryable(e, write):
+                    _stats["errors"] += 1
+                    raise
+                _stats["retries"] += 1
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** attempt * random.uniform(0.5, 1.0))
+    finally:
+        _stats["total_ms"] += (time.perf_counter() - started) * 1000
+
+
+async def rpc(function, params, write=False, timeout=None):
+    return await execute(get_client().rpc(function, params), write=write, timeout=timeout)
+
+
+# --- chat endpoints ---
+
+async def get_profile(user_id):
+    """{"organization_id", "role"} of the user's profile, or {} without one."""
+    rows = await execute(get_client().table("profiles").select("organization_id, role").eq("id", user_id).limit(1))
+    return rows[0] if rows else {}
+
+
+async def get_user_org_id(user_id):
+    return (await get_profile(user_id)).get("organization_id")
+
+
+async def get_conversation_org_id(conversation_id):
+    rows = await execute(
+        get_client().table("conversations").select("organization_id").eq("id", conversation_id).limit(1)
+    )
+    return rows[0].get("organization_id") if rows else None
+
+
+async def load_history(user_id, conversation_id=None):
+    """
+    Messages of the conversation (the organization's latest one without
+    conversation_id), in one round-trip: {"conversation_id": ..., "messages": [...]}.
+    Conversations of other organizations come back empty.
+    """
+    data = await rpc("get_chat_history", {"p_user_id": user_id, "p_conversation_id": conversation_id})
+    return data or {"conversation_id": None, "messages": []}
+
+
+async def list_conversations(user_id):
+    return await rpc("list_conversations", {"p_user_id": user_id}) or []
+
+
+async def start_conversation(user_id, title):
+    """Creates a conversation (and the user's organization if missing); returns {"organization_id", "conversation_id", "provisioned"}."""
+    return await rpc("start_conversation", {"p_user_id": user_id, "p_title": title}, write=True)
+
+
+async def insert_message(conversation_id, role, content, agent_name=None):
+    await execute(get_client().table("messages").insert({
+        "conversation_id": conversation_id,
+        "role": role,
+        "content": content,
+        "metadata": {"agent_name": agent_name} if agent_name else {},
+    }), write=True)
+
+
+class MessageWriter:
+    """
+    Saves one conversation's messages in the background, in call order.
+
+    add() returns immediately, so a debate turn never waits on the database;
+    flush() waits until everything added so far is stored (before reads of the
+    conversation, e.g. the rolling summary).
+    """
+
+    def __init__(self, conversation_id):
+        self.conversation_id = conversation_id
+        self._last = None
+
+    def add(self, role, content, agent_name=None):
+        if not self.conversation_id:
+            return
+        task = asyncio.get_running_loop().create_task(self._write(self._last, role, content, agent_name))
+        self._last = task
+        _pending_writes.add(task)  # keep a reference until it finishes
+        task.add_done_callback(_pending_writes.discard)
+
+    async def _write(self, previous, role, content, agent_name):
+        if previous:
+            await asyncio.wait([previous])  # created_at order = call order
+        try:
+            await insert_message(self.conversation_id, role, content, agent_name)
+        except Exception as e:
+            print(f"DB Save Error: {e}")
+
+    async def flush(self):
+        if self._last:
+            await asyncio.wait([self._last])
+
+
+async def close():
+    """Waits for pending message writes and closes this loop's connection pool (app shutdown)."""
+    if _pending_writes:
+        await asyncio.wait(list(_pending_writes), timeout=QUERY_TIMEOUT)
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client:
+        await client.aclose()
+
+
+def get_stats():
+    stats = dict(_stats)
+    stats.pop("total_ms", None)
+    stats["mean_ms"] = round(_stats["total_ms"] / _stats["queries"], 1) if _stats["queries"] else None
+    stats["pending_writes"] = len(_pending_writes)
+    stats["pool_size"] = POOL_SIZE
+    return stats
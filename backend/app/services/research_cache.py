@@ -0,0 +1,121 @@
+"""
+Research artifacts of a conversation (website digest, search summary, memory hits,
+image description), stored in conversations.research so follow-up messages don't
+crawl, search and summarise again.
+
+    {"website": [artifact, ...], "search": [...], "memory": [...], "image": [...]}
+    artifact = {"key": ..., "topic": ..., "content": ..., "created_at": epoch seconds}
+
+Every kind has a freshness TTL. Search summaries and memory hits are topic
+specific: they are reused only while the new message is similar enough to the
+topic they were made for; a topic shift adds a new artifact (incremental search)
+next to the old ones instead of redoing everything. Run
+migrations/add_conversation_research.sql first; without the column the cache
+just stays empty.
+"""
+import math
+import os
+import re
+import time
+from collections import Counter
+
+try:
+    from backend.app.services.auth_service import get_db_client
+except ImportError:
+    from app.services.auth_service import get_db_client
+
+HOUR = 3600
+TTL = {
+    "website": int(os.getenv("RESEARCH_TTL_WEBSITE", str(7 * 24 * HOUR))),
+    "search": int(os.getenv("RESEARCH_TTL_SEARCH", str(12 * HOUR))),
+    "memory": int(os.getenv("RESEARCH_TTL_MEMORY", str(HOUR))),
+    "image": int(os.getenv("RESEARCH_TTL_IMAGE", str(30 * 24 * HOUR))),
+}
+# Minimum topic similarity (0-1) for reusing a search summary / memory hits
+TOPIC_THRESHOLD = float(os.getenv("RESEARCH_TOPIC_THRESHOLD", "0.45"))
+MAX_PER_KIND = 3
+
+
+def _trigrams(text):
+    # Character trigrams survive Turkish suffixes ("fiyat" / "fiyatları") better than words
+    words = re.findall(r"\w+", (text or "").lower())
+    grams = Counter()
+    for word in words:
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            grams[padded[i:i + 3]] += 1
+    return grams
+
+
+def topic_similarity(a, b):
+    """Cosine similarity of character trigram counts, 0.0 - 1.0."""
+    ga, gb = _trigrams(a), _trigrams(b)
+    if not ga or not gb:
+        return 0.0
+    dot = sum(count * gb[gram] for gram, count in ga.items())
+    return dot / (math.sqrt(sum(v * v for v in ga.values())) * math.sqrt(sum(v * v for v in gb.values())))
+
+
+def load(conversation_id):
+    """Returns the stored artifacts of a conversation ({} if none or not available)."""
+    if not conversation_id:
+        return {}
+    try:
+        res = get_db_client().table("conversations").select("research").eq("id", conversation_id).limit(1).execute()
+        return (res.data[0].get("research") if res.data else None) or {}
+    except Exception as e:
+        print(f"Research cache load failed: {e}")
+        return {}
+
+
+def save(conversation_id, research):
+    if not conversation_id:
+        return
+    try:
+        get_db_client().table("conversations").update({"research": research}).eq("id", conversation_id).execute()
+    except Exception as e:
+        print(f"Research cache save failed: {e}")
+
+
+def is_fresh(kind, artifact, now=None):
+    return (now or time.time()) - artifact.get("created_at", 0) < TTL[kind]
+
+
+def search_key(company_info):
+    """Key of a search summary: the search query includes the company name and industry."""
+    return "|".join(" ".join(str(company_info.get(f) or "").split()).lower() for f in ("name", "industry"))
+
+
+def find(research, kind, key=None, topic=None):
+    """
+    Newest fresh artifact of `kind` whose key matches (if given) and whose topic is
+    similar enough to `topic` (if given). None on a miss.
+    """
+    best, best_score = None, -1.0
+    for artifact in reversed(research.get(kind, [])):
+        if not is_fresh(kind, artifact) or (key is not None and artifact.get("key") != key):
+            continue
+        if topic is None:
+            return artifact
+        score = topic_similarity(topic, artifact.get("topic", ""))
+        if score >= TOPIC_THRESHOLD and score > best_score:
+            best, best_score = artifact, score
+    return best
+
+
+def latest(research, kind):
+    """Newest artifact of `kind` regardless of topic and age (used by the direct-question path)."""
+    items = research.get(kind, [])
+    return items[-1] if items else None
+
+
+def put(research, kind, content, key=None, topic=None):
+    """Adds an artifact; expired ones and artifacts with the same key+topic are replaced."""
+    now = time.time()
+    items = [
+        a for a in research.get(kind, [])
+        if is_fresh(kind, a, now) and not (a.get("key") == key and a.get("topic") == topic)
+    ]
+    items.append({"key": key, "topic": topic, "content": content, "created_at": now})
+    research[kind] = items[-MAX_PER_KIND:]
+    return research
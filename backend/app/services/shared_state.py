@@ -0,0 +1,378 @@
+"""
+Shared state for all uvicorn workers of one deployment.
+
+Module globals are per process: with `uvicorn --workers N` every cache hit rate
+drops by N and every limit becomes N times too loose. Caches, counters and
+limiters that must hold across workers use this interface instead:
+
+- KV with TTL (JSON values): get / set (optionally only-if-absent) / delete
+- counters: incr
+- token buckets: take_token
+- leases: acquire_lease / renew_lease / release_lease (a cross-worker semaphore
+  with TTL, so a crashed worker cannot leak a slot forever)
+- pub/sub: publish / subscribe (invalidation, "slot freed" wake-ups)
+
+Backends, chosen with SHARED_STATE_URL:
+
+    (unset)                          SQLite WAL file, backend/.cache/shared_state.sqlite
+    sqlite:////var/data/state.db     SQLite WAL file at that path (one machine)
+    redis://localhost:6379/0         Redis or any Redis-compatible server (pip install redis)
+
+Pub/sub on SQLite is an events table polled by one thread per process
+(SHARED_STATE_POLL_INTERVAL); on Redis it is one subscribed connection.
+"""
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+SHARED_STATE_URL = os.getenv("SHARED_STATE_URL", "")
+DEFAULT_SQLITE_PATH = str(BACKEND_DIR / ".cache" / "shared_state.sqlite")
+KEY_PREFIX = os.getenv("SHARED_STATE_PREFIX", "pb:")
+POLL_INTERVAL = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "0.25"))
+EVENT_RETENTION_SECONDS = 60
+
+
+class SharedState:
+    """Backend-independent part. Backends implement the _raw_* methods and _start_listener."""
+
+    backend = "base"
+
+    def __init__(self):
+        self._subscribers = {}
+        self._subscribers_lock = threading.Lock()
+        self._listener_started = False
+
+    # --- KV ---
+    def get(self, key):
+        raw = self._raw_get(key)
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, key, value, ttl=None, nx=False):
+        """Stores a JSON value. With nx=True only if the key is absent; returns whether it was stored."""
+        return self._raw_set(key, json.dumps(value, ensure_ascii=False), ttl, nx)
+
+    def delete(self, key):
+        self._raw_delete(key)
+
+    # --- counters / limiters ---
+    def incr(self, key, amount=1, ttl=None):
+        """Adds to an integer counter (created at 0; ttl applies when it is created). Returns the new value."""
+        return self._raw_incr(key, amount, ttl)
+
+    def take_token(self, key, rate_per_second, capacity):
+        """Token bucket shared by all workers. Returns 0.0 if a token was taken, else seconds to wait."""
+        return self._raw_take_token(key, rate_per_second, capacity)
+
+    def acquire_lease(self, name, limit, ttl):
+        """Takes one of `limit` slots of `name` for at most ttl seconds. Returns a lease or None if all are taken."""
+        owner = uuid.uuid4().hex
+        # Random start so workers don't all probe slot 0 first
+        start = random.randrange(limit) if limit > 0 else 0
+        for i in range(limit):
+            slot = f"lease:{name}:{(start + i) % limit}"
+            if self.set(slot, owner, ttl=ttl, nx=True):
+                return (slot, owner)
+        return None
+
+    def renew_lease(self, lease, ttl):
+        """Extends a lease to ttl seconds from now. False if it already expired (the slot may be someone else's)."""
+        slot, owner = lease
+        return self._raw_expire_if(slot, json.dumps(owner), ttl)
+
+    def release_lease(self, lease):
+        """Frees a lease (no-op if it already expired and was taken by someone else)."""
+        if lease:
+            slot, owner = lease
+            self._raw_delete_if(slot, json.dumps(owner))
+
+    # --- pub/sub ---
+    def publish(self, channel, data):
+        self._raw_publish(json.dumps({"channel": channel, "data": data}, ensure_ascii=False))
+
+    def subscribe(self, channel, callback):
+        """callback(data) runs on the listener thread for every message on channel (from any worker)."""
+        with self._subscribers_lock:
+            self._subscribers.setdefault(channel, []).append(callback)
+            if not self._listener_started:
+                self._listener_started = True
+                self._start_listener()
+
+    def _deliver(self, raw):
+        try:
+            message = json.loads(raw)
+        except ValueError:
+            return
+        with self._subscribers_lock:
+            callbacks = list(self._subscribers.get(message.get("channel"), []))
+        for callback in callbacks:
+            try:
+                callback(message.get("data"))
+            except Exception as e:
+                print(f"Shared state subscriber error ({message.get('channel')}): {e}")
+
+    def describe(self):
+        return {"backend": self.backend}
+
+
+class SQLiteState(SharedState):
+    """One WAL database file shared by every process on the machine."""
+
+    backend = "sqlite"
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        super().__init__()
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL);
+            CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, created_at REAL NOT NULL);
+        """)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; writes that read first use BEGIN IMMEDIATE (one writer across processes)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, func):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = func(conn, time.time())
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    @staticmethod
+    def _live(row, now):
+        return row is not None and (row[1] is None or row[1] > now)
+
+    def _raw_get(self, key):
+        row = self._conn().execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if self._live(row, time.time()) else None
+
+    def _raw_set(self, key, value, ttl, nx):
+        def op(conn, now):
+            if nx:
+                row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+                if self._live(row, now):
+                    return False
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, now + ttl if ttl else None))
+            if random.random() < 0.01:
+                conn.execute("DELETE FROM kv WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            return True
+        return self._write(op)
+
+    def _raw_delete(self, key):
+        self._conn().execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    def _raw_delete_if(self, key, value):
+        self._conn().execute("DELETE FROM kv WHERE key = ? AND value = ?", (key, value))
+
+    def _raw_expire_if(self, key, value, ttl):
+        def op(conn, now):
+            cursor = conn.execute(
+                "UPDATE kv SET expires_at = ? WHERE key = ? AND value = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (now + ttl, key, value, now),
+            )
+            return cursor.rowcount > 0
+        return self._write(op)
+
+    def _raw_incr(self, key, amount, ttl):
+        def op(conn, now):
+            row = conn.execute("SELECT value, expires_at FROM kv WHERE key = ?", (key,)).fetchone()
+            if self._live(row, now):
+                value, expires_at = int(json.loads(row[0])) + amount, row[1]
+            else:
+                value, expires_at = amount, (now + ttl if ttl else None)
+            conn.execute("INSERT OR REPLACE INTO kv (key, value, expires_at) VALUES (?, ?, ?)", (key, json.dumps(value), expires_at))
+            return value
+        return self._write(op)
+
+    def _raw_take_token(self, key, rate, capacity):
+        def op(conn, now):
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = capacity if row is None else min(capacity, row[0] + max(now - row[1], 0.0) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            conn.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)", (key, tokens, now))
+            return wait
+        return self._write(op)
+
+    def _raw_publish(self, payload):
+        def op(conn, now):
+            conn.execute("INSERT INTO events (payload, created_at) VALUES (?, ?)", (payload, now))
+            if random.random() < 0.05:
+                conn.execute("DELETE FROM events WHERE created_at < ?", (now - EVENT_RETENTION_SECONDS,))
+        self._write(op)
+
+    def _start_listener(self):
+        last_id = self._conn().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+        def poll():
+            nonlocal last_id
+            while True:
+                time.sleep(POLL_INTERVAL)
+                try:
+                    rows = self._conn().execute("SELECT id, payload FROM events WHERE id > ? ORDER BY id", (last_id,)).fetchall()
+                except sqlite3.Error as e:
+                    print(f"Shared state poll failed: {e}")
+                    continue
+                for event_id, payload in rows:
+                    last_id = event_id
+                    self._deliver(payload)
+
+        threading.Thread(target=poll, name="shared-state-events", daemon=True).start()
+
+    def describe(self):
+        return {"backend": self.backend, "path": self.path}
+
+
+class RedisState(SharedState):
+    """Redis or a Redis-compatible server. Pass client= to use an existing (or stand-in) client."""
+
+    backend = "redis"
+    EVENTS_CHANNEL = "events"
+
+    def __init__(self, url=None, client=None, prefix=KEY_PREFIX):
+        super().__init__()
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url, decode_responses=True)
+        self.client = client
+        self.prefix = prefix
+
+    def _k(self, key):
+        return self.prefix + key
+
+    @staticmethod
+    def _text(value):
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def _raw_get(self, key):
+        return self._text(self.client.get(self._k(key)))
+
+    def _raw_set(self, key, value, ttl, nx):
+        return bool(self.client.set(self._k(key), value, px=int(ttl * 1000) if ttl else None, nx=nx))
+
+    def _raw_delete(self, key):
+        self.client.delete(self._k(key))
+
+    def _raw_delete_if(self, key, value):
+        def op(pipe):
+            current = self._text(pipe.get(self._k(key)))
+            pipe.multi()
+            if current == value:
+                pipe.delete(self._k(key))
+        self.client.transaction(op, self._k(key))
+
+    def _raw_expire_if(self, key, value, ttl):
+        result = {}
+
+        def op(pipe):
+            current = self._text(pipe.get(self._k(key)))
+            pipe.multi()
+            result["renewed"] = current == value
+            if result["renewed"]:
+                pipe.pexpire(self._k(key), int(ttl * 1000))
+        self.client.transaction(op, self._k(key))
+        return result["renewed"]
+
+    def _raw_incr(self, key, amount, ttl):
+        value = self.client.incrby(self._k(key), amount)
+        if ttl and value == amount:
+            self.client.pexpire(self._k(key), int(ttl * 1000))
+        return value
+
+    def _raw_take_token(self, key, rate, capacity):
+        # WATCH/MULTI instead of a Lua script, so servers without scripting work too
+        name = self._k("bucket:" + key)
+        result = {}
+
+        def op(pipe):
+            state = pipe.hgetall(name)
+            now = time.time()
+            tokens_raw, updated_raw = state.get("tokens", state.get(b"tokens")), state.get("updated", state.get(b"updated"))
+            tokens = capacity if tokens_raw is None else min(capacity, float(tokens_raw) + max(now - float(updated_raw), 0.0) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate
+            pipe.multi()
+            pipe.hset(name, mapping={"tokens": tokens, "updated": now})
+            pipe.expire(name, max(int(capacity / rate) + 60, 60))
+            result["wait"] = wait
+
+        self.client.transaction(op, name)
+        return result["wait"]
+
+    def _raw_publish(self, payload):
+        self.client.publish(self._k(self.EVENTS_CHANNEL), payload)
+
+    def _start_listener(self):
+        pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._k(self.EVENTS_CHANNEL))
+
+        def listen():
+            while True:
+                try:
+                    message = pubsub.get_message(timeout=1.0)
+                except Exception as e:
+                    print(f"Shared state listener error: {e}")
+                    time.sleep(1.0)
+                    continue
+                if message and message.get("type") == "message":
+                    self._deliver(self._text(message["data"]))
+
+        threading.Thread(target=listen, name="shared-state-events", daemon=True).start()
+
+    def describe(self):
+        return {"backend": self.backend, "prefix": self.prefix}
+
+
+def create_state(url=SHARED_STATE_URL):
+    if not url:
+        return SQLiteState(DEFAULT_SQLITE_PATH)
+    if url.startswith("sqlite:///"):
+        return SQLiteState(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisState(url)
+    raise ValueError(f"Unsupported SHARED_STATE_URL: {url}")
+
+
+_state = None
+_state_lock = threading.Lock()
+
+
+def get_state():
+    """Process-wide shared state backend (created on first use)."""
+    global _state
+    with _state_lock:
+        if _state is None:
+            _state = create_state()
+        return _state
+
+
+def get_stats():
+    return _state.describe() if _state else {"backend": None}
@@ -0,0 +1,122 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When several members of one organization start debates on the same topic at the
+same time, every debate ran the same website crawl, search-query optimisation,
+web search and research summary with byte-identical inputs. Deterministic
+utility calls go through here instead: the first caller for a key (the leader)
+does the work, concurrent callers with the same key wait for its result. Nothing
+is kept once the call finishes - reuse across time is research_cache's job.
+
+Keys are sha256 hashes of (kind, provider, model, normalised messages, params),
+see flight_key / llm_key. Debater turns are never coalesced.
+"""
+import asyncio
+import hashlib
+import json
+import threading
+from collections import defaultdict
+
+
+def normalize_messages(messages):
+    """Whitespace-insensitive form of a chat message list (prompts are built from indented f-strings)."""
+    return [
+        {"role": m.get("role"), "content": " ".join(m["content"].split()) if isinstance(m.get("content"), str) else m.get("content")}
+        for m in messages
+    ]
+
+
+def flight_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def llm_key(provider, model, messages, **params):
+    return flight_key("llm", provider, model, normalize_messages(messages), params)
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+        self.stats = defaultdict(lambda: {"leaders": 0, "coalesced": 0})
+
+    def _count(self, kind, leader):
+        self.stats[kind]["leaders" if leader else "coalesced"] += 1
+
+    def do(self, kind, key, func):
+        """Blocking: runs func() once per key among concurrent callers (any thread)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(kind, leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def ado(self, kind, key, coro_func):
+        """Async: awaits one shared task per key (and event loop) among concurrent callers."""
+        loop = asyncio.get_running_loop()
+        task_key = (id(loop), key)
+        with self._lock:
+            task = self._tasks.get(task_key)
+            leader = task is None
+            if leader:
+                task = self._tasks[task_key] = loop.create_task(coro_func())
+                task.add_done_callback(lambda t: self._forget(task_key, t))
+            self._count(kind, leader)
+        # A caller that disconnects must not cancel the work the others wait for
+        return await asyncio.shield(task)
+
+    def _forget(self, task_key, task):
+        with self._lock:
+            if self._tasks.get(task_key) is task:
+                del self._tasks[task_key]
+
+    def get_stats(self):
+        with self._lock:
+            stats = {kind: dict(counts) for kind, counts in self.stats.items()}
+            in_flight = len(self._calls) + len(self._tasks)
+        for counts in stats.values():
+            total = counts["leaders"] + counts["coalesced"]
+            counts["coalesced_ratio"] = round(counts["coalesced"] / total, 3) if total else 0.0
+        return {"in_flight": in_flight, "kinds": stats}
+
+
+_flights = SingleFlight()
+
+
+def do(kind, key, func):
+    return _flights.do(kind, key, func)
+
+
+async def ado(kind, key, coro_func):
+    return await _flights.ado(kind, key, coro_func)
+
+
+def get_stats():
+    return _flights.get_stats()
@@ -0,0 +1,141 @@
+"""
+Vector memory of past board decisions (ChromaDB).
+
+Where the collection lives:
+
+- CHROMA_URL (e.g. http://chroma:8000): a Chroma server (chromadb.HttpClient),
+  the only option that is shared between uvicorn workers and machines,
+- CHROMA_PATH: an on-disk store (chromadb.PersistentClient). It survives
+  restarts and can be filled by scripts/backfill_memory.py, but it is NOT
+  multi-process safe: every worker keeps its own index and does not see the
+  other workers' writes. Use it with a single worker only,
+- neither: in memory, per worker, lost on restart (as before).
+
+Every entry carries the
+organization id and searches are scoped to it. Entry ids are derived from
+(org, conversation, topic), so saving the same decision twice - live or from
+the backfill - updates one entry instead of adding a duplicate.
+"""
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    from backend.app.services.embeddings import get_engine as get_embedding_engine
+except ImportError:
+    from app.services.embeddings import get_engine as get_embedding_engine
+
+CHROMA_URL = os.getenv("CHROMA_URL", "")  # shared Chroma server
+CHROMA_PATH = os.getenv("CHROMA_PATH", "")  # "" = in-memory
+COLLECTION_NAME = "debate_memory"
+
+_collection = None
+_collection_lock = threading.Lock()
+
+
+def get_memory_collection():
+    """Creates the Chroma collection on first use (chromadb is slow to import)."""
+    global _collection
+    with _collection_lock:
+        if _collection is None:
+            import chromadb
+            if CHROMA_URL:
+                url = urlparse(CHROMA_URL)
+                chroma_client = chromadb.HttpClient(
+                    host=url.hostname, port=url.port or (443 if url.scheme == "https" else 8000),
+                    ssl=url.scheme == "https",
+                )
+            elif CHROMA_PATH:
+                if int(os.getenv("WEB_CONCURRENCY", "1")) > 1:
+                    print("WARNING: CHROMA_PATH is not shared between workers; set CHROMA_URL for a Chroma server.")
+                chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+            else:
+                chroma_client = chromadb.Client()
+            # Embeddings come from embeddings.py (cached, batched), not Chroma's implicit default
+            _collection = chroma_client.get_or_create_collection(name=COLLECTION_NAME, embedding_function=None)
+        return _collection
+
+
+def memory_id(org_id, conversation_id, topic):
+    raw = f"{org_id or '-'}|{conversation_id or '-'}|{' '.join((topic or '').split()).lower()}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def memory_document(topic, decision, reason):
+    return f"Konu: {topic}. Karar: {decision}. Gerekçe: {reason}"
+
+
+def tally_votes(votes):
+    """vote_results list -> (winning decision, {decision: count})."""
+    vote_counts = {}
+    for v in votes:
+        vote_counts[v.get("decision")] = vote_counts.get(v.get("decision"), 0) + 1
+    final_decision = max(vote_counts, key=vote_counts.get) if vote_counts else "ÇEKİMSER"
+    return final_decision, vote_counts
+
+
+def vote_reason(vote_counts):
+    return f"Votes: {json.dumps(vote_counts, ensure_ascii=False)}"
+
+
+def upsert_memories(entries):
+    """
+    Bulk, idempotent insert. entries: dicts with topic, decision, reason, org_id,
+    conversation_id and date. Embeds all documents in one batched call.
+    """
+    if not entries:
+        return 0
+    documents = [memory_document(e["topic"], e["decision"], e["reason"]) for e in entries]
+    get_memory_collection().upsert(
+        ids=[memory_id(e.get("org_id"), e.get("conversation_id"), e["topic"]) for e in entries],
+        documents=documents,
+        embeddings=get_embedding_engine().embed(documents),
+        metadatas=[{
+            "topic": e["topic"],
+            "decision": e["decision"],
+            "reason": e["reason"],
+            "org_id": e.get("org_id") or "",
+            "conversation_id": e.get("conversation_id") or "",
+            "date": e.get("date") or datetime.now().strftime("%Y-%m-%d"),
+        } for e in entries],
+    )
+    return len(entries)
+
+
+def save_memory_vector(topic, decision, reason, org_id=None, conversation_id=None):
+    """Saves the final decision to Vector DB."""
+    try:
+        upsert_memories([{
+            "topic": topic, "decision": decision, "reason": reason,
+            "org_id": org_id, "conversation_id": conversation_id,
+        }])
+    except Exception as e:
+        print(f"Vector memory save error: {e}")
+
+
+def search_memory_vector(query, org_id=None):
+    """Searches past debates semantically (only the organization's own decisions when org_id is given)."""
+    try:
+        results = get_memory_collection().query(
+            query_embeddings=[get_embedding_engine().embed_one(query)],
+            n_results=3,
+            where={"org_id": org_id} if org_id else None,
+        )
+
+        if not results['documents'][0]:
+            return []
+
+        memory_list = []
+        for i, doc in enumerate(results['documents'][0]):
+            meta = results['metadatas'][0][i]
+            memory_list.append({
+                "topic": meta['topic'],
+                "decision": meta['decision'],
+                "reason": meta['reason']
+            })
+        return memory_list
+    except Exception:
+        return []
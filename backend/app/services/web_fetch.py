@@ -0,0 +1,287 @@
+"""
+Bounded, streaming website fetcher.
+
+The old scraper downloaded the whole page with `requests`, built a full
+BeautifulSoup tree and then kept only the first 4000 characters. Here the body
+is streamed with httpx and fed chunk by chunk into a light HTML-to-text
+extractor; both stop as soon as enough text has been collected or the byte
+budget is spent, so a 5 MB page costs about as much as a 50 KB one.
+"""
+import codecs
+import os
+import re
+from html.parser import HTMLParser
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+
+MAX_BYTES = int(os.getenv("SCRAPE_MAX_BYTES", "1500000"))
+MAX_CHARS = 4000
+FETCH_TIMEOUT = 10.0
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+# Elements whose whole subtree is boilerplate (or not text at all). <header> is
+# kept: on landing pages it often holds the hero, i.e. most of the content.
+SKIP_TAGS = {
+    "script", "style", "noscript", "nav", "footer", "aside",
+    "form", "svg", "template", "iframe", "select", "button",
+}
+# Whole class / id / role tokens of boilerplate containers ("hero-banner" or
+# "menu-item" are not hints: they often wrap real content)
+BOILERPLATE_HINTS = {
+    "cookie", "cookies", "cookie-banner", "cookie-consent", "consent", "gdpr",
+    "navbar", "menu", "main-menu", "nav-menu", "breadcrumb", "breadcrumbs",
+    "sidebar", "footer", "site-footer", "popup", "modal", "newsletter",
+    "social", "social-links", "share", "share-buttons",
+    "navigation", "contentinfo", "dialog", "alertdialog",  # ARIA roles
+}
+# Start tags that implicitly close an open element (end tags are optional in
+# HTML), searched up to the nearest enclosing container
+IMPLIED_END = {
+    "li": {"li"}, "dt": {"dt", "dd"}, "dd": {"dt", "dd"}, "option": {"option"},
+    "tr": {"tr", "td", "th"}, "td": {"td", "th"}, "th": {"td", "th"},
+}
+P_CLOSERS = {
+    "p", "div", "section", "article", "main", "ul", "ol", "dl", "table", "blockquote", "pre",
+    "h1", "h2", "h3", "h4", "h5", "h6", "header", "footer", "nav", "aside", "form",
+}
+SCOPE_TAGS = {"ul", "ol", "dl", "table", "tbody", "thead", "select", "div", "section", "article", "main", "body", "html"}
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "br", "tr", "td", "th",
+    "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre", "table", "dd", "dt",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+
+_META_CHARSET_RE = re.compile(rb"""<meta[^>]+charset=["']?([a-zA-Z0-9_\-]+)""", re.IGNORECASE)
+
+
+class NotHtmlError(Exception):
+    """The URL answered with something that is not an HTML page."""
+
+
+class TextExtractor(HTMLParser):
+    """
+    Streaming HTML-to-text extractor. Skips boilerplate subtrees, keeps the page
+    title and meta description first, and stops collecting once max_chars is reached.
+    Links (href + anchor text) are collected everywhere, including in navigation,
+    because that is where "About" / "Products" pages are linked from.
+    """
+
+    MAX_LINKS = 300
+
+    def __init__(self, max_chars=MAX_CHARS):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.title = ""
+        self.description = ""
+        self.lines = []
+        self.seen = set()
+        self.size = 0
+        self.done = False
+        self._current = []
+        self._in_title = False
+        self._open = []  # open elements, with the implicit closes of HTML applied
+        self._skip_at = None  # index in _open of the boilerplate element being skipped
+        self.links = []
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a" and len(self.links) < self.MAX_LINKS:
+            href = dict(attrs).get("href")
+            if href:
+                self._link = [href, ""]
+                self.links.append(self._link)
+        if tag not in VOID_TAGS:
+            self._close_implied(tag)
+            self._open.append(tag)
+        if self._skip_at is not None:
+            return
+        if tag == "meta":
+            attrs = dict(attrs)
+            if (attrs.get("name") or attrs.get("property") or "").lower() in ("description", "og:description"):
+                self.description = self.description or (attrs.get("content") or "").strip()
+            return
+        if tag == "title":
+            self._in_title = True
+            return
+        if tag in VOID_TAGS:
+            if tag == "br":
+                self._flush()
+            return
+
+        hints = {t for k, v in attrs if k in ("class", "id", "role") and v for t in v.lower().split()}
+        if tag in SKIP_TAGS or not hints.isdisjoint(BOILERPLATE_HINTS):
+            self._skip_at = len(self._open) - 1
+            return
+        if tag in BLOCK_TAGS:
+            self._flush()
+
+    def handle_endtag(self, tag):
+        if tag == "a":
+            self._link = None
+        if tag in self._open:
+            # Also closes the elements left open inside it (e.g. an unclosed <li>)
+            index = len(self._open) - 1 - self._open[::-1].index(tag)
+            self._pop_to(index)
+        if self._skip_at is not None:
+            return
+        if tag == "title":
+            self._in_title = False
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def _close_implied(self, tag):
+        closes = IMPLIED_END.get(tag) or ({"p"} if tag in P_CLOSERS else None)
+        if not closes:
+            return
+        for index in range(len(self._open) - 1, -1, -1):
+            if self._open[index] in closes:
+                self._pop_to(index)
+                return
+            if self._open[index] in SCOPE_TAGS:
+                return
+
+    def _pop_to(self, index):
+        del self._open[index:]
+        if self._skip_at is not None and self._skip_at >= index:
+            self._skip_at = None
+
+    def handle_data(self, data):
+        if self._link is not None and len(self._link[1]) < 100:
+            self._link[1] += data
+        if self.done or self._skip_at is not None:
+            return
+        if self._in_title:
+            self.title += data
+            return
+        # Text nodes can arrive split across feed() calls, so whitespace is
+        # normalised when the line is flushed, not here
+        self._current.append(data)
+
+    def _flush(self):
+        if not self._current:
+            return
+        line = " ".join("".join(self._current).split())
+        self._current = []
+        # Menus and repeated teasers show up as duplicate or 1-word lines
+        if len(line) < 3 or line in self.seen:
+            return
+        self.seen.add(line)
+        self.lines.append(line)
+        self.size += len(line) + 1
+        if self.size >= self.max_chars:
+            self.done = True
+
+    def get_text(self):
+        self._flush()
+        head = [part for part in (self.title.strip(), self.description) if part]
+        return "\n".join(head + self.lines)[: self.max_chars]
+
+
+def _charset_from_content_type(content_type):
+    match = re.search(r"charset=([\w\-]+)", content_type or "", re.IGNORECASE)
+    return match.group(1) if match else None
+
+
+class HtmlTextStream:
+    """
+    Feeds raw body bytes into a TextExtractor. The charset comes from the
+    Content-Type header, else from a <meta charset> in the first 2 KB, else UTF-8.
+    """
+
+    SNIFF_BYTES = 2048
+
+    def __init__(self, max_chars=MAX_CHARS, charset=None):
+        self.extractor = TextExtractor(max_chars)
+        self.charset = charset
+        self.bytes_read = 0
+        self._decoder = None
+        self._pending = b""
+
+    def _start(self, head):
+        if not self.charset:
+            match = _META_CHARSET_RE.search(head)
+            self.charset = match.group(1).decode("ascii") if match else "utf-8"
+        try:
+            self._decoder = codecs.getincrementaldecoder(self.charset)(errors="replace")
+        except LookupError:
+            self.charset = "utf-8"
+            self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    def feed(self, chunk):
+        """Returns True once enough text has been collected."""
+        self.bytes_read += len(chunk)
+        if self._decoder is None:
+            self._pending += chunk
+            if len(self._pending) < self.SNIFF_BYTES:
+                return False
+            self._start(self._pending)
+            chunk, self._pending = self._pending, b""
+        self.extractor.feed(self._decoder.decode(chunk))
+        return self.extractor.done
+
+    def close(self):
+        if self._decoder is None:
+            self._start(self._pending)
+            self.extractor.feed(self._decoder.decode(self._pending))
+        self.extractor.feed(self._decoder.decode(b"", final=True))
+        return self.extractor.get_text()
+
+
+_http_client = None
+
+
+def get_http_client():
+    """Shared AsyncClient (connection pooling across debates). httpx is imported on first use."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+        _http_client = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"},
+            follow_redirects=True,
+            timeout=FETCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+        )
+    return _http_client
+
+
+def normalize_url(url):
+    url = url.strip()
+    if not url.startswith("http"):
+        url = "https://" + url
+    return url
+
+
+async def fetch_page_text(url, max_chars=MAX_CHARS, max_bytes=MAX_BYTES, timeout=FETCH_TIMEOUT):
+    """
+    Streams an HTML page and returns
+    {"url", "text", "bytes_read", "charset", "truncated", "links"}.
+    Raises NotHtmlError for non-HTML responses and httpx errors for network failures.
+    """
+    url = normalize_url(url)
+    client = get_http_client()
+    async with client.stream("GET", url, timeout=timeout) as response:
+        response.raise_for_status()
+        content_type = response.headers.get("content-type", "")
+        if content_type and not content_type.lower().startswith(HTML_CONTENT_TYPES):
+            raise NotHtmlError(f"Not an HTML page ({content_type.split(';')[0]})")
+
+        stream = HtmlTextStream(max_chars, charset=_charset_from_content_type(content_type))
+        truncated = False
+        async for chunk in response.aiter_bytes():
+            if stream.feed(chunk):
+                break
+            if stream.bytes_read >= max_bytes:
+                truncated = True
+                break
+        # Leaving the block closes the connection without reading the rest of the body
+        text = stream.close()
+
+    return {
+        "url": str(response.url),
+        "text": text,
+        "bytes_read": stream.bytes_read,
+        "charset": stream.charset,
+        "truncated": truncated,
+        "links": [(href, " ".join(text.split())) for href, text in stream.extractor.links],
+    }
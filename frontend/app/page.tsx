@@ -114,6 +114,7 @@ function BoardContent() {
 
   const [messages, setMessages] = useState<Message[]>([]);
   const [votes, setVotes] = useState<Vote[] | null>(null);
+  const [reportLoading, setReportLoading] = useState(false);
 
   // Initialize welcome message based on language
   useEffect(() => {
@@ -230,6 +231,29 @@ function BoardContent() {
     }
   };
 
+  // The decision report is generated on demand (cached on the server by transcript hash)
+  const handleReportRequest = async () => {
+    if (!conversationId || reportLoading) return;
+    setReportLoading(true);
+    try {
+      const { data: { session } } = await supabase.auth.getSession();
+      const res = await fetch(
+        `${process.env.NEXT_PUBLIC_API_URL || 'http://127.0.0.1:8000'}/api/report?conversation_id=${conversationId}&language=${language}`,
+        { headers: { 'Authorization': `Bearer ${session?.access_token}` } }
+      );
+      const data = await res.json();
+      setMessages((prev) => [...prev, {
+        role: 'Sistem',
+        content: data.report || data.detail,
+        agentName: 'Sistem'
+      }]);
+    } catch (error) {
+      console.error('Report error:', error);
+    } finally {
+      setReportLoading(false);
+    }
+  };
+
   const handleSubmit = async (e: React.FormEvent) => {
     e.preventDefault();
     if (!input.trim()) return;
@@ -283,7 +307,9 @@ function BoardContent() {
           },
           image: selectedImage,
           conversation_id: conversationId,
-          language: language
+          language: language,
+          // "@Sterling ..." asks one board member directly (no full debate)
+          target_agent: userMsg.content.match(/^@(\p{L}+)/u)?.[1]
         }),
       });
 
@@ -316,8 +342,18 @@ function BoardContent() {
                 }]);
               } else if (data.type === 'meta') {
                 setConversationId(data.conversation_id);
+              } else if (data.type === 'queued') {
+                setMessages((prev) => [...prev, {
+                  role: 'Sistem',
+                  content: t('chat.queued').replace('{position}', String(data.position)),
+                  agentName: 'Sistem'
+                }]);
               } else if (data.type === 'typing') {
                 // Enhance: Show specific agent typing if needed
+                if (data.pace_ms) {
+                  // Client-side pacing: the server did not sleep, so pause here
+                  await new Promise((resolve) => setTimeout(resolve, data.pace_ms));
+                }
               } else if (data.type === 'vote_results') {
                 setVotes(data.votes);
               } else if (data.type === 'phase') {
@@ -738,6 +774,15 @@ function BoardContent() {
                     <Sparkles className="w-5 h-5 text-amber-400" />
                     Konsey Nihai Kararı
                   </h3>
+                  {conversationId && (
+                    <button
+                      onClick={handleReportRequest}
+                      disabled={reportLoading}
+                      className="text-xs font-bold px-3 py-1.5 bg-amber-400 text-slate-900 rounded-lg hover:bg-amber-300 disabled:opacity-60 transition-colors"
+                    >
+                      {reportLoading ? t('chat.finalReport') : t('chat.generateReport')}
+                    </button>
+                  )}
                 </div>
 
                 {/* Summary Bar */}
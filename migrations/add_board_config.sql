@@ -0,0 +1,7 @@
+-- Migration for configurable boards: which personas debate for an organization
+-- {"members": ["Atlas", "Marcus", "Lex", ...], "custom": [{"name", "provider", "model_name", "persona"}]}
+-- NULL = the default five members (see backend/app/services/personas.py)
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE public.organizations
+ADD COLUMN IF NOT EXISTS board JSONB;
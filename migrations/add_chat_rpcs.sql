@@ -0,0 +1,94 @@
+-- Migration for single round-trip chat lookups (backend/app/services/repository.py)
+-- profile -> organization -> conversation -> messages used to take up to three
+-- sequential PostgREST requests per endpoint call
+-- Run this in Supabase SQL Editor
+
+CREATE INDEX IF NOT EXISTS conversations_org_created_idx ON public.conversations (organization_id, created_at);
+
+-- Messages of one conversation of the user's organization, or of the organization's
+-- latest conversation when p_conversation_id is NULL:
+-- {"conversation_id": ..., "messages": [{"role", "content", "metadata"}, ...]}
+-- (conversation_id is NULL when the user has no organization or no such conversation)
+CREATE OR REPLACE FUNCTION get_chat_history(p_user_id UUID, p_conversation_id UUID DEFAULT NULL)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    WITH conv AS (
+        SELECT c.id
+        FROM public.conversations c
+        JOIN public.profiles p ON p.organization_id = c.organization_id
+        WHERE p.id = p_user_id
+          AND (p_conversation_id IS NULL OR c.id = p_conversation_id)
+        ORDER BY c.created_at DESC
+        LIMIT 1
+    )
+    SELECT jsonb_build_object(
+        'conversation_id', (SELECT id FROM conv),
+        'messages', COALESCE((
+            SELECT jsonb_agg(
+                jsonb_build_object('role', m.role, 'content', m.content, 'metadata', m.metadata)
+                ORDER BY m.created_at
+            )
+            FROM public.messages m
+            WHERE m.conversation_id = (SELECT id FROM conv)
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- The sidebar list: conversations of the user's organization, newest first
+-- (without the stored search vector)
+CREATE OR REPLACE FUNCTION list_conversations(p_user_id UUID)
+RETURNS SETOF JSONB
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT to_jsonb(c) - 'search_tsv'
+    FROM public.conversations c
+    JOIN public.profiles p ON p.organization_id = c.organization_id
+    WHERE p.id = p_user_id
+    ORDER BY c.created_at DESC;
+$$;
+
+-- New conversation for the user's organization. Users without a profile or without
+-- an organization get one first (JIT provisioning, the user becomes its admin).
+CREATE OR REPLACE FUNCTION start_conversation(p_user_id UUID, p_title TEXT)
+RETURNS JSONB
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_org_id UUID;
+    v_conversation_id UUID;
+    v_provisioned BOOLEAN := FALSE;
+BEGIN
+    SELECT organization_id INTO v_org_id FROM public.profiles WHERE id = p_user_id;
+
+    IF v_org_id IS NULL THEN
+        INSERT INTO public.organizations (name, industry)
+        VALUES ('My Company', 'General')
+        RETURNING id INTO v_org_id;
+
+        INSERT INTO public.profiles (id, organization_id, role)
+        VALUES (p_user_id, v_org_id, 'admin')
+        ON CONFLICT (id) DO UPDATE SET organization_id = EXCLUDED.organization_id, role = EXCLUDED.role;
+        v_provisioned := TRUE;
+    END IF;
+
+    INSERT INTO public.conversations (organization_id, title, status)
+    VALUES (v_org_id, p_title, 'active')
+    RETURNING id INTO v_conversation_id;
+
+    RETURN jsonb_build_object(
+        'organization_id', v_org_id,
+        'conversation_id', v_conversation_id,
+        'provisioned', v_provisioned
+    );
+END;
+$$;
+
+REVOKE EXECUTE ON FUNCTION get_chat_history(UUID, UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION list_conversations(UUID) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION start_conversation(UUID, TEXT) FROM PUBLIC, anon, authenticated;
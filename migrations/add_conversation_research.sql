@@ -0,0 +1,6 @@
+-- Migration to store research artifacts (website digest, search summaries,
+-- memory hits, image descriptions) with each conversation
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE public.conversations
+ADD COLUMN IF NOT EXISTS research JSONB NOT NULL DEFAULT '{}'::jsonb;
@@ -0,0 +1,11 @@
+-- Migration to keep a rolling summary of each conversation on the server
+-- (the client no longer resends the whole history)
+-- Run this in Supabase SQL Editor
+
+ALTER TABLE public.conversations
+ADD COLUMN IF NOT EXISTS summary TEXT,
+ADD COLUMN IF NOT EXISTS summary_upto TIMESTAMPTZ;
+
+-- Recent-turn lookups: messages of one conversation after summary_upto
+CREATE INDEX IF NOT EXISTS messages_conversation_created_idx
+ON public.messages (conversation_id, created_at);
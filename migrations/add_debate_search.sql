@@ -0,0 +1,80 @@
+-- Migration for full-text search over an organization's past debates
+-- (conversation titles and message contents, Turkish + English stemming)
+-- Run this in Supabase SQL Editor
+-- Note: adding the stored columns rewrites the messages table once
+
+ALTER TABLE public.conversations
+ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR GENERATED ALWAYS AS (
+    setweight(to_tsvector('turkish', COALESCE(title, '')), 'A') ||
+    setweight(to_tsvector('english', COALESCE(title, '')), 'A')
+) STORED;
+
+-- vote_results rows hold JSON, not text worth searching
+ALTER TABLE public.messages
+ADD COLUMN IF NOT EXISTS search_tsv TSVECTOR GENERATED ALWAYS AS (
+    CASE WHEN role = 'vote_results' THEN NULL ELSE
+        to_tsvector('turkish', COALESCE(content, '')) || to_tsvector('english', COALESCE(content, ''))
+    END
+) STORED;
+
+CREATE INDEX IF NOT EXISTS conversations_search_idx ON public.conversations USING GIN (search_tsv);
+CREATE INDEX IF NOT EXISTS messages_search_idx ON public.messages USING GIN (search_tsv);
+CREATE INDEX IF NOT EXISTS conversations_org_created_idx ON public.conversations (organization_id, created_at);
+
+-- Ranked, highlighted page of matches (conversation titles and messages) of one
+-- organization. p_query uses web search syntax ("exact phrase", -word, or).
+-- Headlines are only built for the returned page.
+CREATE OR REPLACE FUNCTION search_debates(
+    p_org_id UUID,
+    p_query TEXT,
+    p_limit INTEGER DEFAULT 20,
+    p_offset INTEGER DEFAULT 0,
+    p_language TEXT DEFAULT 'tr'
+)
+RETURNS TABLE (
+    kind TEXT,
+    conversation_id UUID,
+    conversation_title TEXT,
+    message_id TEXT,
+    role TEXT,
+    agent_name TEXT,
+    created_at TIMESTAMPTZ,
+    rank REAL,
+    headline TEXT
+)
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    WITH q AS (
+        SELECT websearch_to_tsquery('turkish', p_query) || websearch_to_tsquery('english', p_query) AS query
+    ),
+    hits AS (
+        SELECT 'conversation' AS kind, c.id AS conversation_id, NULL::text AS message_id, NULL::text AS role,
+               NULL::text AS agent_name, c.created_at, c.title AS body, ts_rank_cd(c.search_tsv, q.query) AS rank
+        FROM public.conversations c, q
+        WHERE c.organization_id = p_org_id AND c.search_tsv @@ q.query
+        UNION ALL
+        SELECT 'message', m.conversation_id, m.id::text, m.role,
+               m.metadata->>'agent_name', m.created_at, m.content, ts_rank_cd(m.search_tsv, q.query)
+        FROM public.messages m
+        JOIN public.conversations c ON c.id = m.conversation_id, q
+        WHERE c.organization_id = p_org_id AND m.search_tsv @@ q.query
+    ),
+    page AS (
+        SELECT * FROM hits
+        ORDER BY rank DESC, created_at DESC
+        LIMIT LEAST(GREATEST(p_limit, 1), 100) OFFSET GREATEST(p_offset, 0)
+    )
+    SELECT p.kind, p.conversation_id, c.title, p.message_id, p.role, p.agent_name, p.created_at, p.rank,
+           ts_headline(
+               CASE WHEN p_language = 'en' THEN 'english' ELSE 'turkish' END::regconfig,
+               p.body, q.query,
+               'StartSel=<mark>, StopSel=</mark>, MaxWords=35, MinWords=12, MaxFragments=2'
+           )
+    FROM page p
+    JOIN public.conversations c ON c.id = p.conversation_id, q
+    ORDER BY p.rank DESC, p.created_at DESC;
+$$;
+
+REVOKE EXECUTE ON FUNCTION search_debates(UUID, TEXT, INTEGER, INTEGER, TEXT) FROM PUBLIC, anon, authenticated;
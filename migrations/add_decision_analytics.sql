@@ -0,0 +1,195 @@
+-- Migration for per-organization decision analytics, maintained incrementally:
+-- record_debate_analytics() adds one finished debate to the aggregates, so
+-- reading them (get_decision_analytics) never scans messages
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS public.decision_analytics_totals (
+    organization_id UUID PRIMARY KEY REFERENCES public.organizations(id) ON DELETE CASCADE,
+    debates INTEGER NOT NULL DEFAULT 0,
+    unanimous INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Vote distribution per board member
+CREATE TABLE IF NOT EXISTS public.decision_analytics_personas (
+    organization_id UUID NOT NULL REFERENCES public.organizations(id) ON DELETE CASCADE,
+    agent TEXT NOT NULL,
+    votes INTEGER NOT NULL DEFAULT 0,
+    with_majority INTEGER NOT NULL DEFAULT 0,
+    dissents INTEGER NOT NULL DEFAULT 0,
+    abstentions INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, agent)
+);
+
+-- Agreement matrix: one row per member pair (agent_a < agent_b)
+CREATE TABLE IF NOT EXISTS public.decision_analytics_pairs (
+    organization_id UUID NOT NULL REFERENCES public.organizations(id) ON DELETE CASCADE,
+    agent_a TEXT NOT NULL,
+    agent_b TEXT NOT NULL,
+    debates INTEGER NOT NULL DEFAULT 0,
+    agreed INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (organization_id, agent_a, agent_b)
+);
+
+-- Decisions over time (UTC days; weeks / months are summed up by the backend)
+CREATE TABLE IF NOT EXISTS public.decision_analytics_daily (
+    organization_id UUID NOT NULL REFERENCES public.organizations(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    debates INTEGER NOT NULL DEFAULT 0,
+    unanimous INTEGER NOT NULL DEFAULT 0,
+    confidence_sum DOUBLE PRECISION NOT NULL DEFAULT 0,
+    confidence_count INTEGER NOT NULL DEFAULT 0,
+    decisions JSONB NOT NULL DEFAULT '{}'::jsonb,  -- {"winning option": count}
+    PRIMARY KEY (organization_id, day)
+);
+
+-- Only the backend (service role) reads and writes analytics
+ALTER TABLE public.decision_analytics_totals ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.decision_analytics_personas ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.decision_analytics_pairs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.decision_analytics_daily ENABLE ROW LEVEL SECURITY;
+
+-- Adds one debate. p_votes is the vote_results list ([{"agent", "decision", ...}]),
+-- p_confidence {"agent": {"sum": x, "count": n}} of the members' [CONFIDENCE:X%] tags.
+-- p_decision NULL = majority with ties going to the option voted first (like tally_votes)
+CREATE OR REPLACE FUNCTION record_debate_analytics(
+    p_org_id UUID,
+    p_votes JSONB,
+    p_decision TEXT DEFAULT NULL,
+    p_confidence JSONB DEFAULT '{}'::jsonb,
+    p_decided_at TIMESTAMPTZ DEFAULT now()
+)
+RETURNS VOID
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+DECLARE
+    v_day DATE := (p_decided_at AT TIME ZONE 'UTC')::date;
+    v_decision TEXT := p_decision;
+    v_unanimous INTEGER;
+    v_conf_sum DOUBLE PRECISION;
+    v_conf_count INTEGER;
+BEGIN
+    IF p_org_id IS NULL OR jsonb_typeof(p_votes) <> 'array' OR jsonb_array_length(p_votes) = 0 THEN
+        RETURN;
+    END IF;
+    p_confidence := COALESCE(p_confidence, '{}'::jsonb);
+
+    IF v_decision IS NULL THEN
+        SELECT v->>'decision' INTO v_decision
+        FROM jsonb_array_elements(p_votes) WITH ORDINALITY AS x(v, n)
+        GROUP BY v->>'decision'
+        ORDER BY count(*) DESC, min(n)
+        LIMIT 1;
+    END IF;
+
+    SELECT (count(DISTINCT v->>'decision') = 1)::int INTO v_unanimous
+    FROM jsonb_array_elements(p_votes) AS v;
+
+    SELECT COALESCE(sum((c.value->>'sum')::float8), 0), COALESCE(sum((c.value->>'count')::int), 0)
+    INTO v_conf_sum, v_conf_count
+    FROM jsonb_each(p_confidence) AS c;
+
+    INSERT INTO public.decision_analytics_totals AS t
+        (organization_id, debates, unanimous, confidence_sum, confidence_count)
+    VALUES (p_org_id, 1, v_unanimous, v_conf_sum, v_conf_count)
+    ON CONFLICT (organization_id) DO UPDATE SET
+        debates = t.debates + 1,
+        unanimous = t.unanimous + EXCLUDED.unanimous,
+        confidence_sum = t.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = t.confidence_count + EXCLUDED.confidence_count,
+        updated_at = now();
+
+    INSERT INTO public.decision_analytics_daily AS d
+        (organization_id, day, debates, unanimous, confidence_sum, confidence_count, decisions)
+    VALUES (p_org_id, v_day, 1, v_unanimous, v_conf_sum, v_conf_count, jsonb_build_object(v_decision, 1))
+    ON CONFLICT (organization_id, day) DO UPDATE SET
+        debates = d.debates + 1,
+        unanimous = d.unanimous + EXCLUDED.unanimous,
+        confidence_sum = d.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = d.confidence_count + EXCLUDED.confidence_count,
+        decisions = d.decisions || jsonb_build_object(v_decision, COALESCE((d.decisions->>v_decision)::int, 0) + 1);
+
+    INSERT INTO public.decision_analytics_personas AS p
+        (organization_id, agent, votes, with_majority, dissents, abstentions, confidence_sum, confidence_count)
+    SELECT
+        p_org_id,
+        v->>'agent',
+        1,
+        (v->>'decision' = v_decision)::int,
+        (v->>'decision' <> v_decision AND v->>'decision' NOT IN ('ÇEKİMSER', 'ABSTAIN'))::int,
+        (v->>'decision' IN ('ÇEKİMSER', 'ABSTAIN'))::int,
+        COALESCE((p_confidence->(v->>'agent')->>'sum')::float8, 0),
+        COALESCE((p_confidence->(v->>'agent')->>'count')::int, 0)
+    FROM jsonb_array_elements(p_votes) AS v
+    WHERE v->>'agent' IS NOT NULL
+    ON CONFLICT (organization_id, agent) DO UPDATE SET
+        votes = p.votes + 1,
+        with_majority = p.with_majority + EXCLUDED.with_majority,
+        dissents = p.dissents + EXCLUDED.dissents,
+        abstentions = p.abstentions + EXCLUDED.abstentions,
+        confidence_sum = p.confidence_sum + EXCLUDED.confidence_sum,
+        confidence_count = p.confidence_count + EXCLUDED.confidence_count;
+
+    INSERT INTO public.decision_analytics_pairs AS pr
+        (organization_id, agent_a, agent_b, debates, agreed)
+    SELECT p_org_id, a->>'agent', b->>'agent', 1, (a->>'decision' = b->>'decision')::int
+    FROM jsonb_array_elements(p_votes) AS a, jsonb_array_elements(p_votes) AS b
+    WHERE a->>'agent' < b->>'agent'
+    ON CONFLICT (organization_id, agent_a, agent_b) DO UPDATE SET
+        debates = pr.debates + 1,
+        agreed = pr.agreed + EXCLUDED.agreed;
+END;
+$$;
+
+-- All aggregates of one organization in one round-trip (daily rows from p_since on)
+CREATE OR REPLACE FUNCTION get_decision_analytics(p_org_id UUID, p_since DATE)
+RETURNS JSONB
+LANGUAGE sql
+STABLE
+SET search_path = public
+AS $$
+    SELECT jsonb_build_object(
+        'totals', (SELECT to_jsonb(t) - 'organization_id' FROM public.decision_analytics_totals t
+                   WHERE t.organization_id = p_org_id),
+        'personas', COALESCE((SELECT jsonb_agg(to_jsonb(p) - 'organization_id' ORDER BY p.agent)
+                              FROM public.decision_analytics_personas p WHERE p.organization_id = p_org_id), '[]'::jsonb),
+        'pairs', COALESCE((SELECT jsonb_agg(to_jsonb(pr) - 'organization_id')
+                           FROM public.decision_analytics_pairs pr WHERE pr.organization_id = p_org_id), '[]'::jsonb),
+        'daily', COALESCE((SELECT jsonb_agg(to_jsonb(d) - 'organization_id' ORDER BY d.day)
+                           FROM public.decision_analytics_daily d
+                           WHERE d.organization_id = p_org_id AND d.day >= p_since), '[]'::jsonb)
+    );
+$$;
+
+REVOKE EXECUTE ON FUNCTION record_debate_analytics(UUID, JSONB, TEXT, JSONB, TIMESTAMPTZ) FROM PUBLIC, anon, authenticated;
+REVOKE EXECUTE ON FUNCTION get_decision_analytics(UUID, DATE) FROM PUBLIC, anon, authenticated;
+
+-- One-time backfill from the vote_results messages stored so far (confidence was
+-- not stored with them). Skipped once any debate has been recorded.
+DO $$
+DECLARE
+    r RECORD;
+BEGIN
+    IF EXISTS (SELECT 1 FROM public.decision_analytics_totals) THEN
+        RETURN;
+    END IF;
+    FOR r IN
+        SELECT c.organization_id, m.content, m.created_at
+        FROM public.messages m
+        JOIN public.conversations c ON c.id = m.conversation_id
+        WHERE m.role = 'vote_results' AND c.organization_id IS NOT NULL
+        ORDER BY m.created_at
+    LOOP
+        BEGIN
+            PERFORM record_debate_analytics(r.organization_id, r.content::jsonb, NULL, '{}'::jsonb, r.created_at);
+        EXCEPTION WHEN others THEN
+            RAISE NOTICE 'Skipped unparsable vote_results message: %', SQLERRM;
+        END;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,13 @@
+-- Migration for on-demand decision reports, cached by transcript hash
+-- Run this in Supabase SQL Editor
+
+CREATE TABLE IF NOT EXISTS public.decision_reports (
+    transcript_hash TEXT PRIMARY KEY,
+    conversation_id UUID REFERENCES public.conversations(id) ON DELETE SET NULL,
+    language TEXT NOT NULL DEFAULT 'tr',
+    content TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Only the backend (service role) reads and writes reports
+ALTER TABLE public.decision_reports ENABLE ROW LEVEL SECURITY;
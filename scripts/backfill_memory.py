@@ -0,0 +1,160 @@
+"""
+Backfills vector memory from decisions already stored in Supabase.
+
+Streams `vote_results` rows from `messages` in keyset-paginated batches
+(created_at, id), pairs each with its debate topic (the last user message before
+the vote in the same conversation) and organization, embeds the batch in one
+call and upserts it into the persistent Chroma collection. Entry ids are the
+same as for live saves, so re-running (or overlapping with live traffic) never
+creates duplicates. Progress is checkpointed after every batch; a re-run
+continues where the last one stopped.
+
+    CHROMA_PATH=/var/data/chroma python scripts/backfill_memory.py
+    python scripts/backfill_memory.py --org <org-uuid> --batch-size 500
+    python scripts/backfill_memory.py --reset          # ignore the checkpoint
+    python scripts/backfill_memory.py --dry-run        # read + pair only
+
+Needs NEXT_PUBLIC_SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY (or
+NEXT_PUBLIC_SUPABASE_ANON_KEY, which row-level security may restrict), plus
+CHROMA_URL or CHROMA_PATH (the same store the backend uses, otherwise the memory
+is gone when the script exits). With CHROMA_PATH, run it while the backend is stopped: the on-disk
+store is not multi-process safe.
+"""
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(ROOT / ".env")
+
+from backend.app.services.auth_service import get_db_client  # noqa: E402
+from backend.app.services import vector_memory  # noqa: E402
+
+DEFAULT_CHECKPOINT = ROOT / ".backfill_memory.json"
+
+
+def load_checkpoint(path):
+    if path.exists():
+        return json.loads(path.read_text())
+    return {"created_at": None, "id": None, "indexed": 0, "skipped": 0}
+
+
+def save_checkpoint(path, checkpoint):
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(checkpoint, indent=2))
+    tmp.replace(path)  # atomic, a crash never leaves a half-written checkpoint
+
+
+def fetch_vote_batch(client, after, batch_size, org_id=None):
+    """Next `batch_size` vote_results rows ordered by (created_at, id), strictly after `after`."""
+    if org_id:
+        # Inner join on the conversation so the org filter runs in the database
+        query = client.table("messages").select("id, conversation_id, content, created_at, conversations!inner(organization_id)") \
+            .eq("role", "vote_results").eq("conversations.organization_id", org_id)
+    else:
+        query = client.table("messages").select("id, conversation_id, content, created_at").eq("role", "vote_results")
+    if after["created_at"]:
+        ts, last_id = after["created_at"], after["id"]
+        query = query.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt."{last_id}")')
+    return query.order("created_at").order("id").limit(batch_size).execute().data or []
+
+
+def fetch_conversations(client, conversation_ids):
+    res = client.table("conversations").select("id, organization_id, title").in_("id", conversation_ids).execute()
+    return {c["id"]: c for c in res.data or []}
+
+
+def fetch_topics(client, votes, workers=8):
+    """
+    Debate topic of each vote row: the newest user message before it in the same
+    conversation. One limit(1) query per vote (run concurrently) - fetching every
+    user message of the batch's conversations would be cut off by PostgREST's
+    max-rows cap on long conversations.
+    """
+    def topic(vote):
+        res = client.table("messages").select("content") \
+            .eq("role", "user").eq("conversation_id", vote["conversation_id"]) \
+            .lte("created_at", vote["created_at"]).order("created_at", desc=True).limit(1).execute()
+        return vote["id"], res.data[0]["content"] if res.data else None
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return {vote_id: content for vote_id, content in pool.map(topic, votes) if content}
+
+
+def build_entries(votes, conversations, topics):
+    entries, skipped = [], 0
+    for v in votes:
+        conversation = conversations.get(v["conversation_id"])
+        try:
+            ballots = json.loads(v["content"])
+        except (TypeError, ValueError):
+            ballots = None
+        topic = topics.get(v["id"]) or (conversation or {}).get("title")
+        if not conversation or not ballots or not topic:
+            skipped += 1
+            continue
+        decision, vote_counts = vector_memory.tally_votes(ballots)
+        entries.append({
+            "topic": topic,
+            "decision": decision,
+            "reason": vector_memory.vote_reason(vote_counts),
+            "org_id": conversation.get("organization_id"),
+            "conversation_id": v["conversation_id"],
+            "date": (v.get("created_at") or "")[:10],
+        })
+    return entries, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index historical vote_results into vector memory.")
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--org", help="only this organization")
+    parser.add_argument("--checkpoint", type=Path, default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--reset", action="store_true", help="start from the beginning")
+    parser.add_argument("--dry-run", action="store_true", help="read and pair rows, don't embed or write")
+    parser.add_argument("--limit", type=int, help="stop after this many vote rows")
+    args = parser.parse_args()
+
+    if not (vector_memory.CHROMA_URL or vector_memory.CHROMA_PATH) and not args.dry_run:
+        sys.exit("❌ CHROMA_URL / CHROMA_PATH is not set - an in-memory collection would be lost when this script exits.")
+
+    client = get_db_client()
+    checkpoint = {"created_at": None, "id": None, "indexed": 0, "skipped": 0} if args.reset else load_checkpoint(args.checkpoint)
+    if checkpoint["created_at"]:
+        print(f"↪️  Resuming after {checkpoint['created_at']} ({checkpoint['indexed']} already indexed)")
+
+    started = time.perf_counter()
+    seen = 0
+    while True:
+        votes = fetch_vote_batch(client, checkpoint, args.batch_size, args.org)
+        if not votes:
+            break
+        conversations = fetch_conversations(client, list({v["conversation_id"] for v in votes}))
+        entries, skipped = build_entries(votes, conversations, fetch_topics(client, votes))
+
+        checkpoint.update(created_at=votes[-1]["created_at"], id=votes[-1]["id"])
+        if not args.dry_run:
+            vector_memory.upsert_memories(entries)
+            checkpoint["indexed"] += len(entries)
+            checkpoint["skipped"] += skipped
+            save_checkpoint(args.checkpoint, checkpoint)
+
+        seen += len(votes)
+        elapsed = time.perf_counter() - started
+        print(f"  {seen:7d} rows | +{len(entries)} indexed, {skipped} skipped | {seen / elapsed:6.1f} rows/s | up to {votes[-1]['created_at']}")
+        if len(votes) < args.batch_size or (args.limit and seen >= args.limit):
+            break
+
+    print(f"\n✅ Done: {seen} rows read in {time.perf_counter() - started:.1f}s"
+          + ("" if args.dry_run else f", {checkpoint['indexed']} indexed in total"))
+
+
+if __name__ == "__main__":
+    main()
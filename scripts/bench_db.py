@@ -0,0 +1,333 @@
+"""
+Chat endpoint latency: blocking supabase-py lookups vs the async repository.
+
+Starts a local PostgREST stand-in (in-memory tables, the RPCs of
+migrations/add_chat_rpcs.sql, a fixed delay per request to model the round-trip
+to Supabase) and points the backend at it. Then, with N requests in flight:
+
+- legacy: the previous handlers - synchronous PostgREST calls inside async def,
+  one request per step (profile -> organization -> conversation -> messages)
+- async:  the current endpoints (api/chat.py on repository.py)
+
+for GET /api/history, GET /api/conversations, starting a conversation (chat-stream's
+lookup + JIT provisioning) and saving a debate's messages. Both run in one local
+backend server; latencies are measured by the client, so time spent queued behind
+a blocked event loop counts. Reports p50/p95 latency, requests/sec and database
+round-trips per operation.
+
+    python scripts/bench_db.py
+    python scripts/bench_db.py --latency 40 --concurrency 32 --requests 200
+    python scripts/bench_db.py --ops history conversations --out bench_db.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from fastapi import FastAPI, Request  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+KEY = "bench-service-key"
+OPS = ("history", "conversations", "start", "save")
+DEBATE_MESSAGES = 12  # messages one debate saves (user, research, turns, moderator, votes)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+# --- PostgREST stand-in ---
+
+class StandIn:
+    """Just enough of PostgREST for the chat endpoints: eq filters, order, limit, insert / upsert, RPCs."""
+
+    def __init__(self, latency, users, conversations, messages):
+        self.latency = latency
+        self.requests = 0
+        self.tables = {"organizations": [], "profiles": [], "conversations": [], "messages": []}
+        self.users = []
+        clock = 0
+        for _ in range(users):
+            org_id, user_id = str(uuid.uuid4()), str(uuid.uuid4())
+            self.users.append(user_id)
+            self.tables["organizations"].append({"id": org_id, "name": "Bench Co", "industry": "General"})
+            self.tables["profiles"].append({"id": user_id, "organization_id": org_id, "role": "admin"})
+            for c in range(conversations):
+                conv_id = str(uuid.uuid4())
+                clock += 1
+                self.tables["conversations"].append({
+                    "id": conv_id, "organization_id": org_id, "title": f"Debate {c}", "status": "active",
+                    "created_at": clock,
+                })
+                for m in range(messages):
+                    clock += 1
+                    self.tables["messages"].append({
+                        "id": clock, "conversation_id": conv_id, "role": "assistant" if m else "user",
+                        "content": f"Message {m} " + "lorem ipsum " * 40,
+                        "metadata": {"agent_name": "Sterling"} if m else {}, "created_at": clock,
+                    })
+        self.clock = clock
+
+    def _next_clock(self):
+        self.clock += 1
+        return self.clock
+
+    def select(self, table, params):
+        rows = self.tables[table]
+        for column, value in params.items():
+            if value.startswith("eq."):
+                rows = [r for r in rows if str(r.get(column)) == value[3:]]
+        if "order" in params:
+            column, _, direction = params["order"].partition(".")
+            rows = sorted(rows, key=lambda r: r[column], reverse=direction.startswith("desc"))
+        if "limit" in params:
+            rows = rows[:int(params["limit"])]
+        return rows
+
+    def insert(self, table, body, upsert=False):
+        inserted = []
+        for row in body if isinstance(body, list) else [body]:
+            row = {"id": str(uuid.uuid4()), **row, "created_at": self._next_clock()}
+            existing = [r for r in self.tables[table] if r["id"] == row["id"]] if upsert else []
+            if existing:
+                existing[0].update(row)
+                row = existing[0]
+            else:
+                self.tables[table].append(row)
+            inserted.append(row)
+        return inserted
+
+    def rpc(self, function, params):
+        profile = next((p for p in self.tables["profiles"] if p["id"] == params["p_user_id"]), None)
+        org_id = profile["organization_id"] if profile else None
+        if function == "get_chat_history":
+            convs = [c for c in self.tables["conversations"] if org_id and c["organization_id"] == org_id
+                     and params.get("p_conversation_id") in (None, c["id"])]
+            conv = max(convs, key=lambda c: c["created_at"]) if convs else None
+            messages = sorted((m for m in self.tables["messages"] if conv and m["conversation_id"] == conv["id"]),
+                              key=lambda m: m["created_at"])
+            return {"conversation_id": conv and conv["id"],
+                    "messages": [{k: m[k] for k in ("role", "content", "metadata")} for m in messages]}
+        if function == "list_conversations":
+            return sorted((c for c in self.tables["conversations"] if org_id and c["organization_id"] == org_id),
+                          key=lambda c: c["created_at"], reverse=True)
+        if function == "start_conversation":
+            provisioned = not org_id
+            if provisioned:
+                org_id = self.insert("organizations", {"name": "My Company", "industry": "General"})[0]["id"]
+                self.insert("profiles", {"id": params["p_user_id"], "organization_id": org_id, "role": "admin"}, upsert=True)
+            conv = self.insert("conversations", {"organization_id": org_id, "title": params["p_title"], "status": "active"})[0]
+            return {"organization_id": org_id, "conversation_id": conv["id"], "provisioned": provisioned}
+        raise KeyError(function)
+
+    def app(self):
+        app = FastAPI()
+
+        @app.api_route("/rest/v1/{path:path}", methods=["GET", "POST", "PATCH"])
+        async def handle(path: str, request: Request):
+            self.requests += 1
+            await asyncio.sleep(self.latency)  # network round-trip + query time
+            body = await request.json() if request.method != "GET" else None
+            if path.startswith("rpc/"):
+                return JSONResponse(self.rpc(path[4:], body or {}))
+            params = dict(request.query_params)
+            if request.method == "GET":
+                rows = self.select(path, params)
+                if "vnd.pgrst.object" in request.headers.get("accept", ""):  # .single()
+                    return JSONResponse(rows[0])
+                return JSONResponse(rows)
+            upsert = "merge-duplicates" in request.headers.get("prefer", "")
+            return JSONResponse(self.insert(path, body, upsert=upsert), status_code=201)
+
+        return app
+
+
+def serve(app):
+    """Runs the stand-in on a free local port in a background thread; returns its URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return f"http://127.0.0.1:{port}"
+
+
+# --- the backend under test ---
+
+def backend_app(url):
+    """
+    The current chat router (/api/..., on repository.py) next to the previous handlers
+    (/legacy/...: blocking PostgREST calls - what supabase-py's table() runs - inside
+    async def). Conversation start and a debate's message saves get bench routes.
+    """
+    from postgrest import SyncPostgrestClient
+    from backend.app.api import chat
+    from backend.app.services import repository
+    from backend.app.services.auth_service import get_current_user
+
+    client = SyncPostgrestClient(f"{url}/rest/v1", headers={"apikey": KEY, "Authorization": f"Bearer {KEY}"})
+    app = FastAPI()
+    app.include_router(chat.router, prefix="/api")
+
+    def bench_user(request: Request):
+        class User:
+            id = request.headers["x-bench-user"]
+        return type("CurrentUser", (), {"user": User})
+
+    app.dependency_overrides[get_current_user] = bench_user
+
+    @app.get("/legacy/history")
+    async def legacy_history(request: Request):
+        user_id = request.headers["x-bench-user"]
+        profile = client.table("profiles").select("organization_id").eq("id", user_id).single().execute()
+        org_id = profile.data["organization_id"]
+        conv = client.table("conversations").select("id").eq("organization_id", org_id) \
+            .order("created_at", desc=True).limit(1).execute()
+        msgs = client.table("messages").select("*").eq("conversation_id", conv.data[0]["id"]) \
+            .order("created_at", desc=False).execute()
+        return {"messages": msgs.data, "conversation_id": conv.data[0]["id"]}
+
+    @app.get("/legacy/conversations")
+    async def legacy_conversations(request: Request):
+        profile = client.table("profiles").select("organization_id").eq("id", request.headers["x-bench-user"]).execute()
+        org_id = profile.data[0]["organization_id"]
+        return client.table("conversations").select("*").eq("organization_id", org_id) \
+            .order("created_at", desc=True).execute().data
+
+    @app.post("/legacy/start")
+    async def legacy_start(request: Request):
+        profile = client.table("profiles").select("organization_id").eq("id", request.headers["x-bench-user"]).execute()
+        org_id = profile.data[0]["organization_id"]
+        conv = client.table("conversations").insert({"organization_id": org_id, "title": "Bench", "status": "active"}).execute()
+        return {"conversation_id": conv.data[0]["id"]}
+
+    @app.post("/legacy/save/{conversation_id}")
+    async def legacy_save(conversation_id: str):
+        for i in range(DEBATE_MESSAGES):
+            client.table("messages").insert({
+                "conversation_id": conversation_id, "role": "assistant", "content": f"turn {i}",
+                "metadata": {"agent_name": "Sterling"},
+            }).execute()
+        return {"saved": DEBATE_MESSAGES}
+
+    @app.post("/async/start")
+    async def async_start(request: Request):
+        return await repository.start_conversation(request.headers["x-bench-user"], "Bench")
+
+    @app.post("/async/save/{conversation_id}")
+    async def async_save(conversation_id: str):
+        # save_to_db's writer: add() returns at once, the stream waits once before its end event
+        writer = repository.MessageWriter(conversation_id)
+        for i in range(DEBATE_MESSAGES):
+            writer.add("assistant", f"turn {i}", agent_name="Sterling")
+        await writer.flush()
+        return {"saved": DEBATE_MESSAGES}
+
+    return app
+
+
+ROUTES = {
+    "legacy": {"history": ("GET", "/legacy/history"), "conversations": ("GET", "/legacy/conversations"),
+               "start": ("POST", "/legacy/start"), "save": ("POST", "/legacy/save/{}")},
+    "async": {"history": ("GET", "/api/history"), "conversations": ("GET", "/api/conversations"),
+              "start": ("POST", "/async/start"), "save": ("POST", "/async/save/{}")},
+}
+
+
+# --- runner ---
+
+async def run_op(http, method, path, users, conversation_ids, requests, concurrency):
+    """Client-side latency (queueing in the backend included) with `concurrency` requests in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i):
+        user_id = users[i % len(users)]
+        async with semaphore:
+            started = time.perf_counter()
+            response = await http.request(method, path.format(conversation_ids[i % len(conversation_ids)]),
+                                          headers={"x-bench-user": user_id})
+            response.raise_for_status()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "req_per_sec": round(requests / wall, 1),
+    }
+
+
+async def bench(args, stand_in, backend_url):
+    results = {}
+    conversation_ids = [c["id"] for c in stand_in.tables["conversations"]]
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=backend_url, timeout=60, limits=limits) as http:
+        for name, routes in ROUTES.items():
+            for op in args.ops:
+                before = stand_in.requests
+                method, path = routes[op]
+                results.setdefault(op, {})[name] = {
+                    **await run_op(http, method, path, stand_in.users, conversation_ids, args.requests, args.concurrency),
+                    "round_trips": round((stand_in.requests - before) / args.requests, 1),
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat endpoint database latency against a local PostgREST stand-in.")
+    parser.add_argument("--latency", type=float, default=20, help="stand-in delay per request (ms)")
+    parser.add_argument("--requests", type=int, default=100, help="requests per operation")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--conversations", type=int, default=10, help="per user")
+    parser.add_argument("--messages", type=int, default=40, help="per conversation")
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=list(OPS))
+    parser.add_argument("--out", type=Path, help="also write the results to this JSON file")
+    args = parser.parse_args()
+
+    stand_in = StandIn(args.latency / 1000, args.users, args.conversations, args.messages)
+    args.url = serve(stand_in.app())
+    os.environ["NEXT_PUBLIC_SUPABASE_URL"] = args.url
+    os.environ["SUPABASE_SERVICE_ROLE_KEY"] = KEY
+
+    backend_url = serve(backend_app(args.url))
+    results = asyncio.run(bench(args, stand_in, backend_url))
+
+    print(f"stand-in latency {args.latency:g} ms, {args.requests} requests per operation, concurrency {args.concurrency}")
+    print(f"{'operation':<14} {'impl':<7} {'p50 ms':>8} {'p95 ms':>8} {'req/s':>8} {'trips':>6}")
+    for op, by_impl in results.items():
+        for name, r in by_impl.items():
+            print(f"{op:<14} {name:<7} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['req_per_sec']:>8} {r['round_trips']:>6}")
+    if args.out:
+        args.out.write_text(json.dumps({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "settings": {k: v for k, v in vars(args).items() if k not in ("out",)},
+            "results": results,
+        }, indent=2, default=str))
+        print(f"-> {args.out}")
+
+
+if __name__ == "__main__":
+    main()
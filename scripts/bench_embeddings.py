@@ -0,0 +1,91 @@
+"""
+Embedding engine benchmark (backend/app/services/embeddings.py).
+
+Measures model load time, encoding throughput one text at a time (the old
+per-call path) vs batched, and the cost of LRU / disk cache hits.
+
+    python scripts/bench_embeddings.py
+    python scripts/bench_embeddings.py --texts 500 --batch-sizes 1 16 32 64
+
+Build step (downloads the model into EMBEDDING_MODEL_DIR, default backend/.models):
+
+    python scripts/bench_embeddings.py --provision
+"""
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.app.services.embeddings import EmbeddingEngine  # noqa: E402
+
+TOPICS = [
+    "Ürün fiyatlarını %10 artıralım mı", "Yeni bir şube açmalı mıyız", "Should we hire a growth marketer",
+    "E-ticaret sitesine geçelim mi", "Tedarikçiyi değiştirmeli miyiz", "Launch a subscription plan",
+    "Instagram reklam bütçesini iki katına çıkaralım mı", "Open an office in Berlin",
+]
+DECISIONS = ["KABUL", "RED", "ERTELEME", "REVİZYON"]
+
+
+def make_texts(count, seed=7):
+    rng = random.Random(seed)
+    return [
+        f"Konu: {rng.choice(TOPICS)} ({i}). Karar: {rng.choice(DECISIONS)}. Gerekçe: Votes: {{'KABUL': {rng.randint(0, 5)}}}"
+        for i in range(count)
+    ]
+
+
+def timed(func):
+    started = time.perf_counter()
+    func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the local embedding engine.")
+    parser.add_argument("--provision", action="store_true", help="only download + load the model, then exit")
+    parser.add_argument("--texts", type=int, default=256)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 64])
+    args = parser.parse_args()
+
+    if args.provision:
+        engine = EmbeddingEngine(cache_path="")
+        print(f"✅ Embedding model ready in {engine.provision()} ({engine.stats['load_seconds']}s)")
+        return
+
+    texts = make_texts(args.texts)
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = str(Path(tmp) / "embeddings.sqlite")
+
+        base = EmbeddingEngine(cache_path="")
+        load_s = timed(base.warm)
+        print(f"model load + first encode: {load_s * 1000:.0f} ms")
+
+        print(f"\n{'batch':>6} {'texts/s':>9} {'ms/text':>8}")
+        for batch_size in args.batch_sizes:
+            # Fresh caches, shared model
+            engine = EmbeddingEngine(cache_path="", batch_size=batch_size)
+            engine._model = base._model
+            if batch_size == 1:
+                # Old path: one call per text
+                elapsed = timed(lambda: [engine.embed([t]) for t in texts])
+            else:
+                elapsed = timed(lambda: engine.embed(texts))
+            print(f"{batch_size:>6} {len(texts) / elapsed:9.1f} {elapsed * 1000 / len(texts):8.2f}")
+
+        engine = EmbeddingEngine(cache_path=cache_path)
+        engine._model = base._model
+        engine.embed(texts)
+        lru_s = timed(lambda: engine.embed(texts))
+        disk_engine = EmbeddingEngine(cache_path=cache_path)
+        disk_s = timed(lambda: disk_engine.embed(texts))
+        print(f"\nLRU hit:  {lru_s * 1e6 / len(texts):8.1f} µs/text")
+        print(f"disk hit: {disk_s * 1e6 / len(texts):8.1f} µs/text (new process, warm disk cache, no model load)")
+
+
+if __name__ == "__main__":
+    main()
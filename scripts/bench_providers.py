@@ -0,0 +1,443 @@
+"""
+Concurrent provider latency probe and model benchmark.
+
+Probes every model of the persona catalog (all execution-profile tiers) plus the
+candidate replacements below, all at once, N samples each:
+
+- streaming text call -> time to first token (TTFT), total latency, tokens/sec
+- vote-style JSON call through AIModel's request path (key pool, no provider
+  budget) -> latency and structured-output success rate ({"decision": ..., "reason":
+  ...} parses and uses a valid option)
+
+Waiting for a key lease (all keys cooling down) is reported separately as
+key_wait_seconds and never counted as latency.
+
+Per model it reports p50/p95 TTFT and latency, mean tokens/sec, error and
+structured-output rates, and for every board seat the fastest model of the same
+provider that passes --min-structured. Everything is written to a JSON file
+that routing decisions (debate_profiles.MODEL_TIERS) can be based on.
+
+    python scripts/bench_providers.py                       # all models, 5 samples
+    python scripts/bench_providers.py --samples 20 --out bench_providers.json
+    python scripts/bench_providers.py --models openai:gpt-4o-mini groq:llama-3.1-8b-instant
+    python scripts/bench_providers.py --stub                # offline, synthetic latencies
+    python scripts/bench_providers.py --list-models         # key check + available models
+
+Keys come from the same env vars / key pools as the backend (OPENAI_API_KEY(S), ...).
+"""
+import argparse
+import hashlib
+import json
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(ROOT / ".env")
+
+from backend.app.services.ai_service import AIModel, get_debaters  # noqa: E402
+from backend.app.services.personas import PERSONA_CATALOG  # noqa: E402
+from backend.app.services.debate_profiles import MODEL_TIERS  # noqa: E402
+from backend.app.services.key_pool import get_key_pool  # noqa: E402
+
+# Possible replacements, probed next to the models in use
+CANDIDATES = [
+    ("openai", "gpt-4o-mini"),
+    ("openai", "gpt-4.1-mini"),
+    ("openai", "gpt-5-nano"),
+    ("openai", "gpt-5-mini"),
+    ("anthropic", "claude-3-haiku-20240307"),
+    ("anthropic", "claude-3-5-haiku-20241022"),
+    ("groq", "llama-3.1-8b-instant"),
+    ("groq", "llama-3.3-70b-versatile"),
+    ("gemini", "gemini-flash-latest"),
+]
+
+TEXT_PROMPT = (
+    "Bir yönetim kurulu üyesi olarak şu konuda 3 cümlelik bir görüş yaz: "
+    "Küçük bir gıda toptancısı ürün fiyatlarını %10 artırmalı mı?"
+)
+VOTE_OPTIONS = ["KABUL", "RED", "ERTELEME"]
+VOTE_PROMPT = f"""
+KONU: Küçük bir gıda toptancısı ürün fiyatlarını %10 artırmalı mı?
+MEVCUT SEÇENEKLER: {", ".join(VOTE_OPTIONS)}
+
+Bu konuyu oyla. SADECE yukarıdaki seçeneklerden birini seç.
+Çıktı formatı SADECE JSON olmalı:
+{{"decision": "TAM_SEÇENEK_İSMİ", "reason": "Tek cümlelik kısa gerekçe"}}
+"""
+MAX_TOKENS = 200
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (None for no values)."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[rank]
+
+
+def parse_vote(text):
+    try:
+        data = json.loads((text or "").replace("```json", "").replace("```", "").strip())
+    except ValueError:
+        return False
+    return isinstance(data, dict) and data.get("decision") in VOTE_OPTIONS and bool(data.get("reason"))
+
+
+# --- targets ---
+
+def collect_targets(models=None, with_candidates=True):
+    """(provider, model) -> set of "tier:Agent" seats using it (empty for candidates)."""
+    seats = defaultdict(set)
+    if models:
+        for spec in models:
+            provider, _, model = spec.partition(":")
+            seats.setdefault((provider, model), set())
+        return seats
+    for tier in ["standard"] + list(MODEL_TIERS):
+        debaters, moderator, _ = get_debaters({}, model_tier=tier, members=list(PERSONA_CATALOG.values()))
+        for agent in debaters + [moderator]:
+            seats[(agent.provider, agent.model_name)].add(f"{tier}:{agent.name}")
+    if with_candidates:
+        for target in CANDIDATES:
+            seats.setdefault(target, set())
+    return seats
+
+
+# --- live probes ---
+
+def stream_text(provider, model, api_key, prompt):
+    """Streams one completion. Returns (ttft_s, total_s, output_tokens, text)."""
+    started = time.perf_counter()
+    first = None
+    parts = []
+    tokens = None
+
+    def mark(piece):
+        nonlocal first
+        if piece:
+            if first is None:
+                first = time.perf_counter() - started
+            parts.append(piece)
+
+    if provider in ("openai", "groq"):
+        if provider == "openai":
+            from openai import OpenAI
+            client = OpenAI(api_key=api_key)
+            extra = {"stream_options": {"include_usage": True}}
+            # GPT-5 models only support temperature=1
+            extra["temperature"] = 1.0 if "gpt-5" in model else 0.8
+        else:
+            from groq import Groq
+            client = Groq(api_key=api_key)
+            extra = {"temperature": 0.8}
+        stream = client.chat.completions.create(
+            model=model, messages=[{"role": "user", "content": prompt}], stream=True, **extra
+        )
+        for chunk in stream:
+            if chunk.choices:
+                mark(chunk.choices[0].delta.content)
+            usage = getattr(chunk, "usage", None) or getattr(getattr(chunk, "x_groq", None), "usage", None)
+            if usage and getattr(usage, "completion_tokens", None):
+                tokens = usage.completion_tokens
+
+    elif provider == "anthropic":
+        import anthropic
+        client = anthropic.Anthropic(api_key=api_key)
+        with client.messages.stream(
+            model=model, max_tokens=MAX_TOKENS, messages=[{"role": "user", "content": prompt}]
+        ) as stream:
+            for piece in stream.text_stream:
+                mark(piece)
+            tokens = stream.get_final_message().usage.output_tokens
+
+    elif provider == "gemini":
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        for chunk in genai.GenerativeModel(model).generate_content(prompt, stream=True):
+            mark(chunk.text if chunk.parts else "")
+            usage = getattr(chunk, "usage_metadata", None)
+            if usage and getattr(usage, "candidates_token_count", None):
+                tokens = usage.candidates_token_count
+    else:
+        raise ValueError(f"unknown provider {provider}")
+
+    total = time.perf_counter() - started
+    text = "".join(parts)
+    return first if first is not None else total, total, tokens or estimate_tokens(text), text
+
+
+class LiveProbe:
+    def __init__(self, provider, model):
+        self.provider = provider
+        self.model = model
+        self.pool = get_key_pool(provider)
+        # Production request path (AIModel._call_with_key) without the provider budget,
+        # so vote latencies measure the provider, not the limiter
+        self.agent = AIModel(name="bench", provider=provider, model_name=model, persona="")
+
+    def available(self):
+        return self.pool is not None
+
+    def text(self):
+        """(ttft, total, tokens, text, key_wait); waiting for a key that is cooling down is not latency."""
+        waiting = time.perf_counter()
+        with self.pool.lease() as key:
+            key_wait = time.perf_counter() - waiting
+            return (*stream_text(self.provider, self.model, key.value, TEXT_PROMPT), key_wait)
+
+    def vote(self):
+        """(latency, structured_ok, key_wait)"""
+        waiting = time.perf_counter()
+        with self.pool.lease() as key:
+            key_wait = time.perf_counter() - waiting
+            started = time.perf_counter()
+            content, _ = self.agent._call_with_key([{"role": "user", "content": VOTE_PROMPT}], key.value, pooled_key=key)
+            latency = time.perf_counter() - started
+        if content.startswith("Error"):
+            raise RuntimeError(content[:200])
+        return latency, parse_vote(content), key_wait
+
+
+# --- stub probes ---
+
+class StubProbe:
+    """Synthetic, deterministic-per-model latencies (offline runs, CI, testing the report)."""
+
+    def __init__(self, provider, model, scale):
+        self.provider = provider
+        self.model = model
+        self.scale = scale
+        seed = int(hashlib.sha256(f"{provider}:{model}".encode()).hexdigest()[:8], 16)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.ttft = self.rng.uniform(0.15, 0.9)
+        self.tps = self.rng.uniform(40, 220)
+        self.json_fail = self.rng.uniform(0.0, 0.2)
+
+    def available(self):
+        return True
+
+    def _draw(self):
+        with self.lock:
+            return self.rng.lognormvariate(0, 0.25), self.rng.randint(80, MAX_TOKENS), self.rng.random()
+
+    def text(self):
+        jitter, tokens, _ = self._draw()
+        ttft = self.ttft * jitter
+        total = ttft + tokens / self.tps
+        time.sleep(total * self.scale)
+        return ttft, total, tokens, "", 0.0
+
+    def vote(self):
+        jitter, tokens, roll = self._draw()
+        total = self.ttft * jitter + 30 / self.tps
+        time.sleep(total * self.scale)
+        return total, roll >= self.json_fail, 0.0
+
+
+# --- run ---
+
+def run_sample(probe, kind, record):
+    try:
+        if kind == "text":
+            ttft, total, tokens, _, key_wait = probe.text()
+            generation = max(total - ttft, 1e-6)
+            record(kind, {"ttft": ttft, "latency": total, "tokens_per_second": tokens / generation, "key_wait": key_wait})
+        else:
+            total, ok, key_wait = probe.vote()
+            record(kind, {"latency": total, "structured_ok": ok, "key_wait": key_wait})
+    except Exception as e:
+        record(kind, {"error": f"{type(e).__name__}: {str(e)[:160]}"})
+
+
+def summarize(provider, model, seats, samples):
+    text = [s for s in samples["text"] if "error" not in s]
+    votes = [s for s in samples["vote"] if "error" not in s]
+    errors = [s["error"] for kind in ("text", "vote") for s in samples[kind] if "error" in s]
+    attempted = len(samples["text"]) + len(samples["vote"])
+
+    def ms(values, pct):
+        value = percentile(values, pct)
+        return round(value * 1000) if value is not None else None
+
+    ttft = [s["ttft"] for s in text]
+    latency = [s["latency"] for s in text]
+    tps = [s["tokens_per_second"] for s in text]
+    return {
+        "provider": provider,
+        "model": model,
+        "seats": sorted(seats),
+        "samples": len(samples["text"]),
+        "ttft_ms_p50": ms(ttft, 50),
+        "ttft_ms_p95": ms(ttft, 95),
+        "latency_ms_p50": ms(latency, 50),
+        "latency_ms_p95": ms(latency, 95),
+        "tokens_per_second": round(sum(tps) / len(tps), 1) if tps else None,
+        "vote_latency_ms_p50": ms([s["latency"] for s in votes], 50),
+        "vote_latency_ms_p95": ms([s["latency"] for s in votes], 95),
+        # Time spent waiting for a key pool lease (all keys cooling down), excluded from the latencies
+        "key_wait_seconds": round(sum(s["key_wait"] for s in text + votes), 2),
+        "structured_ok_rate": round(sum(s["structured_ok"] for s in votes) / len(votes), 3) if votes else None,
+        "error_rate": round(len(errors) / attempted, 3) if attempted else None,
+        "errors": sorted(set(errors))[:5],
+    }
+
+
+def routing(results, min_structured):
+    """For each seat: the current model and the fastest eligible model of the same provider."""
+    eligible = [
+        r for r in results
+        if r["latency_ms_p95"] is not None and not r["error_rate"]
+        and (r["structured_ok_rate"] or 0) >= min_structured
+    ]
+    seats = {}
+    for r in results:
+        for seat in r["seats"]:
+            same_provider = [e for e in eligible if e["provider"] == r["provider"]]
+            best = min(same_provider, key=lambda e: (e["latency_ms_p95"], e["ttft_ms_p95"]), default=None)
+            seats[seat] = {
+                "current": f"{r['provider']}:{r['model']}",
+                "current_latency_ms_p95": r["latency_ms_p95"],
+                "fastest_eligible": f"{best['provider']}:{best['model']}" if best else None,
+                "fastest_latency_ms_p95": best["latency_ms_p95"] if best else None,
+            }
+    return dict(sorted(seats.items()))
+
+
+def list_models():
+    """Key check: lists the models each configured provider offers (all providers at once)."""
+    def fetch(provider):
+        pool = get_key_pool(provider)
+        if pool is None:
+            return provider, None, "no key configured"
+        key = pool.keys[0].value
+        try:
+            if provider == "openai":
+                from openai import OpenAI
+                names = [m.id for m in OpenAI(api_key=key).models.list().data]
+            elif provider == "groq":
+                from groq import Groq
+                names = [m.id for m in Groq(api_key=key).models.list().data]
+            elif provider == "anthropic":
+                import anthropic
+                names = [m.id for m in anthropic.Anthropic(api_key=key).models.list().data]
+            else:
+                import google.generativeai as genai
+                genai.configure(api_key=key)
+                names = [m.name for m in genai.list_models() if "generateContent" in m.supported_generation_methods]
+            return provider, sorted(names), None
+        except Exception as e:
+            return provider, None, str(e)[:200]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        for provider, names, error in pool.map(fetch, ["openai", "anthropic", "groq", "gemini"]):
+            if error:
+                print(f"❌ {provider}: {error}")
+            else:
+                print(f"✅ {provider} ({len(names)} models, {len(get_key_pool(provider))} key(s))")
+                for name in names:
+                    print(f"   - {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark LLM providers/models concurrently.")
+    parser.add_argument("--samples", type=int, default=5, help="samples per model and call type")
+    parser.add_argument("--concurrency", type=int, default=8, help="calls in flight at once")
+    parser.add_argument("--models", nargs="+", metavar="PROVIDER:MODEL", help="only these models")
+    parser.add_argument("--no-candidates", action="store_true", help="only the models in use")
+    parser.add_argument("--min-structured", type=float, default=0.9,
+                        help="structured-output success rate a routing candidate needs")
+    parser.add_argument("--out", type=Path, default=ROOT / "bench_providers.json")
+    parser.add_argument("--stub", action="store_true", help="no network, synthetic latencies")
+    parser.add_argument("--stub-scale", type=float, default=0.05,
+                        help="stub: fraction of the synthetic latency actually slept")
+    parser.add_argument("--list-models", action="store_true", help="check keys and list available models")
+    args = parser.parse_args()
+
+    if args.list_models:
+        list_models()
+        return
+
+    seats = collect_targets(args.models, with_candidates=not args.no_candidates)
+    probes = {}
+    for provider, model in seats:
+        probe = StubProbe(provider, model, args.stub_scale) if args.stub else LiveProbe(provider, model)
+        if probe.available():
+            probes[(provider, model)] = probe
+        else:
+            print(f"⏭️  {provider}:{model} skipped (no key configured)")
+    if not probes:
+        sys.exit("❌ Nothing to benchmark (no provider keys configured; try --stub).")
+
+    samples = {target: {"text": [], "vote": []} for target in probes}
+    lock = threading.Lock()
+    done = [0]
+    total = len(probes) * args.samples * 2
+
+    def recorder(target):
+        def record(kind, sample):
+            with lock:
+                samples[target][kind].append(sample)
+                done[0] += 1
+                print(f"\r  {done[0]}/{total} calls", end="", flush=True)
+        return record
+
+    # Interleave models so no provider gets all of its calls in one burst
+    jobs = [(target, kind) for _ in range(args.samples) for kind in ("text", "vote") for target in probes]
+    print(f"Benchmarking {len(probes)} models x {args.samples} samples ({'stub' if args.stub else 'live'}), "
+          f"{args.concurrency} in flight")
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for target, kind in jobs:
+            pool.submit(run_sample, probes[target], kind, recorder(target))
+    wall_clock = time.perf_counter() - started
+    print()
+
+    results = sorted(
+        (summarize(p, m, seats[(p, m)], samples[(p, m)]) for p, m in probes),
+        key=lambda r: (r["latency_ms_p95"] is None, r["latency_ms_p95"] or 0),
+    )
+
+    print(f"\n{'model':<42} {'ttft p50/p95':>14} {'lat p50/p95':>14} {'tok/s':>7} {'json':>6} {'err':>5}")
+    for r in results:
+        name = f"{r['provider']}:{r['model']}" + (" *" if r["seats"] else "")
+        ttft = f"{r['ttft_ms_p50']}/{r['ttft_ms_p95']}" if r["ttft_ms_p50"] is not None else "-"
+        latency = f"{r['latency_ms_p50']}/{r['latency_ms_p95']}" if r["latency_ms_p50"] is not None else "-"
+        structured = f"{r['structured_ok_rate']:.0%}" if r["structured_ok_rate"] is not None else "-"
+        print(f"{name:<42} {ttft:>14} {latency:>14} {r['tokens_per_second'] or '-':>7} {structured:>6} {r['error_rate']:>5.0%}")
+        for error in r["errors"]:
+            print(f"    ↳ {error}")
+    print("(* = used by a board seat; times in ms)")
+
+    report = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "mode": "stub" if args.stub else "live",
+        "samples": args.samples,
+        "concurrency": args.concurrency,
+        "wall_clock_seconds": round(wall_clock, 2),
+        "min_structured": args.min_structured,
+        "models": results,
+        "routing": routing(results, args.min_structured),
+    }
+    args.out.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\n✅ Results written to {args.out} ({wall_clock:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+Benchmarks website text extraction: old (full download + BeautifulSoup html.parser)
+vs new (streamed, byte-capped, early-stopping extractor in web_fetch.py).
+
+Each page body is downloaded once, then both extractors run on the same bytes so
+only CPU time and memory are compared. The new path reads 64 KB chunks and stops
+as the live fetcher would, so "bytes read" shows how much of the body it needs.
+
+    python scripts/bench_scrape.py
+    python scripts/bench_scrape.py https://example.com page_dump.html --repeat 10
+    python scripts/bench_scrape.py --check   # extraction cases only (offline)
+
+The default pages mix long articles with landing pages (hero sections, menus,
+cookie banners). The extraction cases in CHECKS run first, on every invocation.
+
+Needs httpx, plus beautifulsoup4 for the old path (pip install beautifulsoup4).
+"""
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from backend.app.services.web_fetch import HtmlTextStream, MAX_BYTES, USER_AGENT  # noqa: E402
+
+DEFAULT_PAGES = [
+    "https://en.wikipedia.org/wiki/Mediterranean_cuisine",
+    "https://en.wikipedia.org/wiki/Turkish_cuisine",
+    "https://www.python.org/",
+    "https://www.shopify.com/",
+    "https://www.hubspot.com/",
+    "https://www.tesla.com/",
+]
+CHUNK_SIZE = 65536
+
+# (name, html, text that must be kept, text that must be dropped)
+CHECKS = [
+    (
+        "hero banner is content",
+        '<title>Acme Foods</title><div class="hero-banner"><h1>Cold-pressed olive oil</h1>'
+        "<p>Family producer since 1952.</p></div><p>Shipping to 20 countries.</p>",
+        ["Cold-pressed olive oil", "Family producer since 1952.", "Shipping to 20 countries."],
+        [],
+    ),
+    (
+        "unclosed <li> in a menu list",
+        '<title>Acme Foods</title><ul><li class="menu-item">Home<li class="menu-item">Products'
+        "</ul><p>We press olives every autumn.<p>Export to 20 countries.",
+        ["We press olives every autumn.", "Export to 20 countries."],
+        [],
+    ),
+    (
+        "skipped <li> ends at its sibling",
+        '<ul><li class="social">Follow us on Twitter<li>Stone mills, no heat</ul>',
+        ["Stone mills, no heat"],
+        ["Follow us on Twitter"],
+    ),
+    (
+        "skipped list ends with its parent",
+        '<div><ul class="menu"><li>Home<li>About us</div><p>Harvested by hand in October.',
+        ["Harvested by hand in October."],
+        ["About us"],
+    ),
+]
+
+
+def load(source):
+    path = Path(source)
+    if path.exists():
+        return path.read_bytes()
+    import httpx
+    response = httpx.get(source, headers={"User-Agent": USER_AGENT}, follow_redirects=True, timeout=20)
+    response.raise_for_status()
+    return response.content
+
+
+def old_extract(body):
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(body, "html.parser")
+    for element in soup(["script", "style", "nav", "footer", "header", "noscript"]):
+        element.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = "\n".join(chunk for chunk in chunks if chunk)
+    return text[:4000], len(body)
+
+
+def new_extract(body):
+    stream = HtmlTextStream(max_chars=4000)
+    for start in range(0, len(body), CHUNK_SIZE):
+        if stream.feed(body[start:start + CHUNK_SIZE]) or stream.bytes_read >= MAX_BYTES:
+            break
+    return stream.close(), stream.bytes_read
+
+
+def run_checks():
+    """Prints one line per extraction case; returns the number of failures."""
+    failures = 0
+    for name, html, keep, drop in CHECKS:
+        text = new_extract(html.encode())[0]
+        missing = [t for t in keep if t not in text]
+        leaked = [t for t in drop if t in text]
+        failures += bool(missing or leaked)
+        status = "✅" if not (missing or leaked) else f"❌ missing {missing} kept {leaked}"
+        print(f"{name:40} {status}")
+    return failures
+
+
+def measure(func, body, repeat):
+    cpu_times = []
+    for _ in range(repeat):
+        started = time.process_time()
+        func(body)
+        cpu_times.append(time.process_time() - started)
+
+    tracemalloc.start()
+    text, bytes_read = func(body)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "cpu_ms": statistics.median(cpu_times) * 1000,
+        "peak_kb": peak / 1024,
+        "bytes_read": bytes_read,
+        "chars": len(text),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare old vs new website text extraction.")
+    parser.add_argument("pages", nargs="*", help="URLs or local .html files")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="only run the extraction cases")
+    args = parser.parse_args()
+
+    failures = run_checks()
+    if args.check:
+        sys.exit(1 if failures else 0)
+    print()
+
+    print(f"{'page':50} {'size':>9} | {'old cpu':>8} {'old mem':>9} | {'new cpu':>8} {'new mem':>9} {'new read':>9}")
+    for source in args.pages or DEFAULT_PAGES:
+        try:
+            body = load(source)
+        except Exception as e:
+            print(f"{source[:50]:50} ❌ {e}")
+            continue
+        old = measure(old_extract, body, args.repeat)
+        new = measure(new_extract, body, args.repeat)
+        print(
+            f"{source[-50:]:50} {len(body) / 1024:8.0f}K | "
+            f"{old['cpu_ms']:7.1f}ms {old['peak_kb']:8.0f}K | "
+            f"{new['cpu_ms']:7.1f}ms {new['peak_kb']:8.0f}K {new['bytes_read'] / 1024:8.0f}K"
+        )
+
+
+if __name__ == "__main__":
+    main()
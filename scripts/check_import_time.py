@@ -0,0 +1,93 @@
+"""
+Import-time regression check for the backend (cold start on Render).
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter, prints the
+slowest modules and fails (exit code 1) when:
+  - a module that must stay lazy is imported at startup (chromadb, provider SDKs,
+    duckduckgo_search, bs4, supabase), or
+  - the total import time of app.main exceeds the budget.
+
+    python scripts/check_import_time.py
+    python scripts/check_import_time.py --budget-ms 1500 --top 15
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Top-level packages that are only allowed to load on first use / in warm-up
+LAZY_MODULES = [
+    "chromadb",
+    "openai",
+    "groq",
+    "anthropic",
+    "google.generativeai",
+    "duckduckgo_search",
+    "bs4",
+    "supabase",
+]
+
+
+def measure():
+    env = dict(os.environ)
+    # Skip background warm-up and don't let a local .env change the result
+    env["WARMUP_ON_STARTUP"] = "0"
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-3000:])
+        raise SystemExit("❌ import app.main failed")
+
+    # Lines look like: "import time:   self [us] | cumulative | imported package"
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            parts = line[len("import time:"):].split("|")
+            self_us, cumulative_us, name = int(parts[0]), int(parts[1]), parts[2].strip()
+        except (ValueError, IndexError):
+            continue
+        modules[name] = (self_us, cumulative_us)
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fail if backend startup imports get slow or heavy.")
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="max cumulative import time of app.main")
+    parser.add_argument("--top", type=int, default=10, help="how many of the slowest modules to print")
+    args = parser.parse_args()
+
+    modules = measure()
+    total_ms = modules.get("app.main", (0, 0))[1] / 1000
+
+    print("Slowest imports (cumulative):")
+    top_level = sorted(modules.items(), key=lambda kv: kv[1][1], reverse=True)[: args.top]
+    for name, (_, cumulative) in top_level:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+
+    failures = []
+    for lazy in LAZY_MODULES:
+        if lazy in modules:
+            failures.append(f"{lazy} is imported at startup (should load on first use)")
+    if total_ms > args.budget_ms:
+        failures.append(f"import app.main took {total_ms:.0f} ms (budget {args.budget_ms:.0f} ms)")
+
+    print(f"\nimport app.main: {total_ms:.0f} ms")
+    if failures:
+        for failure in failures:
+            print(f"❌ {failure}")
+        sys.exit(1)
+    print("✅ Import time OK")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Precision / recall of the contradiction pre-filter (contradiction_filter.py).
+
+A labelled example is one repeat turn of a debater:
+
+    {"agent": "Sterling", "previous": ["..."], "statement": "...", "contradiction": true}
+
+The pre-filter should keep recall high (every real contradiction still reaches
+the LLM check) while flagging as few turns as possible (each flag is one LLM
+call). Reports precision, recall and flag rate, optionally over a threshold grid.
+
+    python scripts/eval_contradiction_filter.py                       # seed set
+    python scripts/eval_contradiction_filter.py --data turns.jsonl --errors
+    python scripts/eval_contradiction_filter.py --sweep
+    python scripts/eval_contradiction_filter.py --export turns.jsonl --conversations 300
+
+--export builds a set from past debates in Supabase: every repeat turn, labelled
+with the LLM check's verdict at the time (a "Çelişki Tespit Edildi" message for
+that member before the next turn). Debates that ran without the LLM check (fast
+profile) come out as negatives, so review the file before trusting its recall.
+Needs NEXT_PUBLIC_SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY (or NEXT_PUBLIC_SUPABASE_ANON_KEY) for --export and
+the provisioned embedding model (scripts/bench_embeddings.py --provision).
+"""
+import argparse
+import itertools
+import json
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from dotenv import load_dotenv  # noqa: E402
+
+load_dotenv(ROOT / ".env")
+
+from backend.app.services import contradiction_filter  # noqa: E402
+from backend.app.services.embeddings import get_engine  # noqa: E402
+
+DEFAULT_DATA = ROOT / "scripts" / "data" / "contradiction_turns.jsonl"
+CONTRADICTION_PREFIX = "🔍 **Çelişki Tespit Edildi!**"
+HISTORY = 3  # the live check compares with the member's last 3 statements
+
+
+def load_examples(paths):
+    examples = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            examples.extend(json.loads(line) for line in f if line.strip())
+    return examples
+
+
+def embed_examples(examples):
+    """Embeds every sentence of every example in one batched call; returns one vector list per example."""
+    engine = get_engine()
+    spans, texts = [], []
+    for e in examples:
+        new, prev = contradiction_filter.sentences(e["previous"], e["statement"])
+        spans.append((len(texts), len(texts) + len(new) + len(prev)))
+        texts.extend(new + prev)
+    vectors = engine.embed(texts)
+    return [vectors[start:end] for start, end in spans]
+
+
+def evaluate(examples, vectors):
+    counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+    results = []
+    for e, v in zip(examples, vectors):
+        result = contradiction_filter.assess(e["previous"], e["statement"], v)
+        key = ("t" if result["flag"] == e["contradiction"] else "f") + ("p" if result["flag"] else "n")
+        counts[key] += 1
+        results.append((e, result, key))
+    flagged = counts["tp"] + counts["fp"]
+    positives = counts["tp"] + counts["fn"]
+    metrics = {
+        **counts,
+        "precision": round(counts["tp"] / flagged, 3) if flagged else None,
+        "recall": round(counts["tp"] / positives, 3) if positives else None,
+        "flag_rate": round(flagged / len(examples), 3) if examples else None,
+    }
+    return metrics, results
+
+
+def set_thresholds(topic, pair, antonym):
+    contradiction_filter.TOPIC_SIMILARITY = topic
+    contradiction_filter.PAIR_SIMILARITY = pair
+    contradiction_filter.ANTONYM_SIMILARITY = antonym
+
+
+def sweep(examples, vectors):
+    rows = []
+    for topic, pair, antonym in itertools.product((0.3, 0.45, 0.6), (0.65, 0.75, 0.85), (0.5, 0.6, 0.7)):
+        set_thresholds(topic, pair, antonym)
+        metrics, _ = evaluate(examples, vectors)
+        rows.append(((topic, pair, antonym), metrics))
+    # Highest recall first, then fewest LLM calls
+    rows.sort(key=lambda r: (-(r[1]["recall"] or 0), r[1]["flag_rate"] or 0))
+    print(f"{'topic':>6} {'pair':>6} {'antonym':>8} {'recall':>7} {'precision':>10} {'flag_rate':>10}")
+    for (topic, pair, antonym), m in rows:
+        print(f"{topic:>6} {pair:>6} {antonym:>8} {m['recall']!s:>7} {m['precision']!s:>10} {m['flag_rate']!s:>10}")
+
+
+# --- export from past debates ---
+
+def export(path, conversations, org_id=None):
+    from backend.app.services.auth_service import get_db_client
+
+    client = get_db_client()
+    query = client.table("conversations").select("id").order("created_at", desc=True).limit(conversations)
+    if org_id:
+        query = query.eq("organization_id", org_id)
+    conv_ids = [c["id"] for c in query.execute().data or []]
+
+    written = 0
+    with open(path, "w", encoding="utf-8") as out:
+        for conv_id in conv_ids:
+            rows = client.table("messages").select("role, content, metadata") \
+                .eq("conversation_id", conv_id).order("created_at").execute().data or []
+            for example in examples_from_rows(rows):
+                out.write(json.dumps(example, ensure_ascii=False) + "\n")
+                written += 1
+    print(f"{written} labelled turns from {len(conv_ids)} conversations -> {path}")
+
+
+def examples_from_rows(rows):
+    history = {}
+    pending = None  # the last repeat turn, waiting for its verdict
+    for row in rows:
+        role, content = row["role"], row["content"] or ""
+        agent = (row.get("metadata") or {}).get("agent_name")
+        if role == "user":
+            if pending:
+                yield pending
+            history, pending = {}, None
+        elif role == "system" and pending and content.startswith(f"{CONTRADICTION_PREFIX} {pending['agent']}:"):
+            pending["contradiction"] = True
+        elif role == "assistant" and agent:
+            if pending:
+                yield pending
+                pending = None
+            if history.get(agent):
+                pending = {"agent": agent, "previous": history[agent][-HISTORY:], "statement": content,
+                           "contradiction": False, "source": "llm_verdict"}
+            history.setdefault(agent, []).append(content)
+    if pending:
+        yield pending
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data", action="append", help=f"labelled JSONL file(s) (default: {DEFAULT_DATA.relative_to(ROOT)})")
+    parser.add_argument("--sweep", action="store_true", help="evaluate a grid of similarity thresholds")
+    parser.add_argument("--errors", action="store_true", help="print missed and extra flags")
+    parser.add_argument("--export", help="write a labelled set from past debates to this file and exit")
+    parser.add_argument("--conversations", type=int, default=200, help="with --export: latest N conversations")
+    parser.add_argument("--org", help="with --export: only this organization")
+    args = parser.parse_args()
+
+    if args.export:
+        export(args.export, args.conversations, args.org)
+        return
+
+    examples = load_examples(args.data or [DEFAULT_DATA])
+    vectors = embed_examples(examples)
+    if args.sweep:
+        sweep(examples, vectors)
+        return
+
+    metrics, results = evaluate(examples, vectors)
+    print(f"{len(examples)} turns, {metrics['tp'] + metrics['fn']} contradictions")
+    print(f"thresholds: topic={contradiction_filter.TOPIC_SIMILARITY} pair={contradiction_filter.PAIR_SIMILARITY} "
+          f"antonym={contradiction_filter.ANTONYM_SIMILARITY}")
+    print(json.dumps(metrics, indent=2))
+    print(f"LLM contradiction checks: {metrics['tp'] + metrics['fp']} instead of {len(examples)}")
+    if args.errors:
+        for e, result, key in results:
+            if key in ("fn", "fp"):
+                label = "MISSED" if key == "fn" else "EXTRA "
+                print(f"{label} {e['agent']}: {e['statement'][:90]!r} {result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +0,0 @@
-import os
-from pathlib import Path
-from dotenv import load_dotenv
-import google.generativeai as genai
-
-# Load .env
-env_path = Path(__file__).resolve().parent / '.env'
-load_dotenv(dotenv_path=env_path)
-
-api_key = os.getenv("GEMINI_API_KEY")
-print(f"Loaded Key: {api_key[:5]}...{api_key[-5:] if api_key else 'None'}")
-
-if not api_key:
-    print("Error: GEMINI_API_KEY not found.")
-    exit()
-
-genai.configure(api_key=api_key)
-
-print("Listing models...")
-try:
-    for m in genai.list_models():
-        if 'generateContent' in m.supported_generation_methods:
-            print(f"Name: {m.name}")
-except Exception as e:
-    print(f"Error listing models: {e}")
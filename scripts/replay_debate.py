@@ -0,0 +1,90 @@
+"""
+Runs one full debate against a cassette and prints wall-clock / token numbers.
+
+Record once with real keys:
+    python scripts/replay_debate.py --mode record --cassette cassettes/pricing.jsonl.gz --topic "Fiyatları %10 artıralım mı?"
+
+Replay offline after every code change (no network, no API spend):
+    python scripts/replay_debate.py --mode replay --cassette cassettes/pricing.jsonl.gz --topic "Fiyatları %10 artıralım mı?"
+    python scripts/replay_debate.py --mode replay --cassette cassettes/pricing.jsonl.gz --topic "..." --latency-scale 0
+
+Web search and website scraping are not part of the cassette; pass --no-research
+to skip them (the run is then treated as a clarification follow-up).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+DEFAULT_COMPANY = {
+    "name": "Choice Foods",
+    "industry": "Food Wholesale",
+    "description": "A wholesale distributor of Mediterranean and Turkish food products."
+}
+
+
+async def run(args):
+    # Env must be set before the service is imported
+    os.environ["LLM_CASSETTE_MODE"] = args.mode
+    os.environ["LLM_CASSETTE_PATH"] = args.cassette
+    os.environ["LLM_CASSETTE_LATENCY_SCALE"] = str(args.latency_scale)
+    if args.strict:
+        os.environ["LLM_CASSETTE_STRICT"] = "1"
+
+    from backend.app.services.ai_service import simulate_debate_streaming
+    from backend.app.services.cassette import get_cassette
+
+    # Same seed on record and replay -> same turn order -> exact prompt matches
+    random.seed(args.seed)
+
+    company_info = json.loads(args.company) if args.company else DEFAULT_COMPANY
+    event_counts = {}
+    started = time.perf_counter()
+    async for event in simulate_debate_streaming(
+        args.topic, [], company_info,
+        language=args.language,
+        is_clarification_response=args.no_research
+    ):
+        event_counts[event.get("type")] = event_counts.get(event.get("type"), 0) + 1
+        if args.verbose and event.get("type") == "message":
+            print(f"[{event.get('role')}] {event.get('content', '')[:120]}")
+    wall_clock = time.perf_counter() - started
+
+    stats = get_cassette().get_stats()
+    result = {
+        "mode": args.mode,
+        "wall_clock_seconds": round(wall_clock, 3),
+        "llm_calls": stats["calls"],
+        "prompt_misses": stats["misses"],
+        "prompt_tokens": stats["prompt_tokens"],
+        "completion_tokens": stats["completion_tokens"],
+        "recorded_llm_latency_seconds": stats["latency"],
+        "events": event_counts,
+    }
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay a debate for offline perf regression runs.")
+    parser.add_argument("--mode", choices=["record", "replay"], default="replay")
+    parser.add_argument("--cassette", required=True)
+    parser.add_argument("--topic", required=True)
+    parser.add_argument("--company", help="company_info as a JSON string")
+    parser.add_argument("--language", default="tr")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--strict", action="store_true", help="fail on prompts that are not in the cassette")
+    parser.add_argument("--no-research", action="store_true", help="skip web search / website analysis")
+    parser.add_argument("--verbose", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()